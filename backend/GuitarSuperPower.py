@@ -4,89 +4,122 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import time
-from pynput import keyboard
-from pynput.keyboard import Key, Listener
+try:
+    from pynput import keyboard
+    from pynput.keyboard import Key, Listener
+except ImportError:  # no display, e.g. a headless box that only sends gesture events
+    keyboard = None
 import threading
+import argparse
+from dataclasses import dataclass
+
+from tracking.autotune import autotune, configure, sample_frames
+from tracking import metrics
+from tracking.events import GestureEventLog, GestureEventPublisher
+from tracking.landmarks import LandmarkRecorder
+from tracking.metrics import METRICS, MetricsExporters
+from tracking.gestures import StrumGesture
+from tracking.ownership import PlayerOwnership, largest_component
+from tracking.parallel import ParallelModels, SerialModels
+from tracking.pipeline import StageStats, run_pipelined, run_serial
+from tracking.render import FrameBuffers
+from tracking.roi import RoiModels
+from tracking.scheduler import ModelRate, ScheduledModels, extrapolate_pose
+from tracking.sources import open_source
 
 # Initialize MediaPipe solutions
 mp_selfie_segmentation = mp.solutions.selfie_segmentation
 mp_hands = mp.solutions.hands
 mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-
-# Initialize models with optimized settings for high FPS
-segmentation = mp_selfie_segmentation.SelfieSegmentation(model_selection=1)
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.3,
-    model_complexity=0
-)
-
-# Initialize pose detection for shoulder tracking
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.3
-)
-
-# Keyboard controller
-keyboard_controller = keyboard.Controller()
+
+# Model factories with optimized settings for high FPS
+def make_segmentation(model_selection=1):
+    return mp_selfie_segmentation.SelfieSegmentation(model_selection=model_selection)
+
+def make_hands(model_complexity=0):
+    return mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.3,
+        model_complexity=model_complexity
+    )
+
+# Pose detection for shoulder tracking
+def make_pose(model_complexity=1):
+    return mp_pose.Pose(
+        static_image_mode=False,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.3,
+        model_complexity=model_complexity
+    )
+
+MODEL_FACTORIES = {
+    "segmentation": make_segmentation,
+    "hands": make_hands,
+    "pose": make_pose,
+}
+
+# Model runner (SerialModels or ParallelModels), created in main()
+models = None
+
+# Gesture outputs, set up in main(): OS key injection and/or the Socket.IO event channel
+keyboard_controller = None
+event_publisher = None
+event_log = None  # optional GestureEventLog (also the event_publisher) for charts.judge
+
+# Optional LandmarkRecorder for offline tuning, set up in main()
+landmark_recorder = None
 
 # Global state for keyboard simulation
 spacebar_pressed = False
-last_gesture_time = 0
 gesture_cooldown = 0.1  # 100ms cooldown between gesture checks
+strum = StrumGesture(min_fingers=4, cooldown=gesture_cooldown)
 
-# Open webcam with optimized settings
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-cap.set(cv2.CAP_PROP_FPS, 30)
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-# Performance tracking
+# Performance tracking: the rate at which the preview is actually redrawn
 frame_count = 0
 fps_start_time = cv2.getTickCount()
+display_fps = 0.0
+
+WINDOW_NAME = "Gesture Tracker with Keyboard Simulation"
+
+# Per-stage timings, also exported through tracking.metrics; frame_to_gesture is
+# recorded for every spacebar press/release
+stats = StageStats(metrics=METRICS)
+
+# Preallocated images for the render step
+render_buffers = FrameBuffers()
 
 # Rainbow/neon color animation variables
 rainbow_start_time = time.time()
 rainbow_speed = 2.0  # Speed of color cycling
 
-def count_fingers_above_shoulders(hand_landmarks, pose_landmarks, frame_height, frame_width):
-    """Count fingers that are above the shoulder level"""
-    if not pose_landmarks or not hand_landmarks:
-        return 0
-    
-    # Get shoulder landmarks (left and right shoulder)
-    left_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_SHOULDER]
-    right_shoulder = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_SHOULDER]
-    
-    # Calculate average shoulder height
-    shoulder_y = (left_shoulder.y + right_shoulder.y) / 2
-    
-    # Count fingers above shoulder level
-    finger_tips = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky tips
-    fingers_above = 0
-    
-    for tip_idx in finger_tips:
-        finger_tip = hand_landmarks.landmark[tip_idx]
-        if finger_tip.y < shoulder_y:  # Above shoulder (y is smaller when higher)
-            fingers_above += 1
-    
-    return fingers_above
-
-def simulate_keyboard_input(should_press_spacebar):
+def simulate_keyboard_input(should_press_spacebar, capture_time=None):
     """Simulate keyboard input based on gesture detection"""
     global spacebar_pressed
     
     if should_press_spacebar and not spacebar_pressed:
-        keyboard_controller.press(Key.space)
+        if keyboard_controller is not None:
+            injected = time.perf_counter()
+            keyboard_controller.press(Key.space)
+            stats.add("key_injection", time.perf_counter() - injected)
+        METRICS.inc("gesture_events_total", gesture="strum", action="press")
+        if event_publisher is not None:
+            event_publisher.publish("strum", capture_time, action="press", key="space")
+        if capture_time is not None:
+            stats.add("frame_to_gesture", time.time() - capture_time)
         spacebar_pressed = True
         print("SPACEBAR PRESSED - Gesture detected!")
     elif not should_press_spacebar and spacebar_pressed:
-        keyboard_controller.release(Key.space)
+        if keyboard_controller is not None:
+            injected = time.perf_counter()
+            keyboard_controller.release(Key.space)
+            stats.add("key_injection", time.perf_counter() - injected)
+        METRICS.inc("gesture_events_total", gesture="strum", action="release")
+        if event_publisher is not None:
+            event_publisher.publish("strum", capture_time, action="release", key="space")
+        if capture_time is not None:
+            stats.add("frame_to_gesture", time.time() - capture_time)
         spacebar_pressed = False
         print("SPACEBAR RELEASED - Gesture ended!")
 
@@ -138,153 +171,118 @@ def get_neon_outline_color():
     
     return (b, g, r)  # BGR format for OpenCV
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+@dataclass
+class FrameState:
+    """Everything the render step needs from one tracked frame"""
+    pose_landmarks: object
+    hand_landmarks: list  # hands that belong to the tracked person
+    total_fingers_above_shoulders: int
+    gesture_detected: bool
+
+def track_frame(frame, capture_time=None):
+    """Run the models on a frame and drive the spacebar from the gesture
+
+    capture_time is the time.time() at which the frame was read; it timestamps
+    the gesture events sent over Socket.IO.
+    """
+    if capture_time is None:
+        capture_time = time.time()
+    if event_log is not None:
+        event_log.frame(capture_time)
 
     # Convert to RGB (MediaPipe expects RGB input)
     rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    # Process frame with segmentation model
-    segmentation_results = segmentation.process(rgb_frame)
-    
-    # Process frame with hand detection
-    hand_results = hands.process(rgb_frame)
-    
-    # Process frame with pose detection
-    pose_results = pose.process(rgb_frame)
+    # Process frame with segmentation, hand and pose models
+    results = models.process(rgb_frame)
+    segmentation_results = results["segmentation"]
+    hand_results = results["hands"]
+    pose_results = results["pose"]
 
     # Create base mask from body segmentation
+    masks_start = time.perf_counter()
     full_body_mask = segmentation_results.segmentation_mask > 0.5
     
     # Find the largest connected component (closest/most prominent person)
-    body_mask = np.zeros_like(full_body_mask, dtype=bool)
-    if np.any(full_body_mask):
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
-            full_body_mask.astype(np.uint8), connectivity=8
-        )
-        
-        if num_labels > 1:
-            largest_component = 1
-            largest_area = stats[1, cv2.CC_STAT_AREA]
-            
-            for i in range(2, num_labels):
-                if stats[i, cv2.CC_STAT_AREA] > largest_area:
-                    largest_area = stats[i, cv2.CC_STAT_AREA]
-                    largest_component = i
-            
-            body_mask = (labels == largest_component)
-        else:
-            body_mask = full_body_mask
-    
-    # Optimized hand mask creation - only for hands belonging to tracked person
-    hand_mask = np.zeros(frame.shape[:2], dtype=bool)
-    
-    # Gesture detection variables
-    total_fingers_above_shoulders = 0
-    gesture_detected = False
-    
-    if hand_results.multi_hand_landmarks:
-        h, w = frame.shape[:2]
-        for hand_landmarks in hand_results.multi_hand_landmarks:
-            # Get wrist position to check if hand belongs to tracked person
-            wrist = hand_landmarks.landmark[0]
-            wrist_x = int(wrist.x * w)
-            wrist_y = int(wrist.y * h)
-            
-            # Check if wrist is within the tracked person's body area
-            buffer_size = 50
-            wrist_in_person = False
-            
-            for dx in range(-buffer_size, buffer_size + 1, 10):
-                for dy in range(-buffer_size, buffer_size + 1, 10):
-                    check_x = max(0, min(w-1, wrist_x + dx))
-                    check_y = max(0, min(h-1, wrist_y + dy))
-                    if body_mask[check_y, check_x]:
-                        wrist_in_person = True
-                        break
-                if wrist_in_person:
-                    break
-            
-            # Only process hands that belong to the tracked person
-            if wrist_in_person:
-                # Count fingers above shoulders for gesture detection
-                fingers_above = count_fingers_above_shoulders(
-                    hand_landmarks, pose_results.pose_landmarks, h, w
-                )
-                total_fingers_above_shoulders += fingers_above
-                
-                # Create hand mask
-                key_points = [4, 8, 12, 16, 20]
-                hand_points = []
-                
-                for idx in key_points:
-                    landmark = hand_landmarks.landmark[idx]
-                    x = int(landmark.x * w)
-                    y = int(landmark.y * h)
-                    hand_points.append([x, y])
-                
-                hand_points.append([wrist_x, wrist_y])
-                
-                if len(hand_points) >= 3:
-                    hand_points = np.array(hand_points, dtype=np.int32)
-                    hull = cv2.convexHull(hand_points)
-                    
-                    temp_mask = np.zeros((h, w), dtype=np.uint8)
-                    cv2.fillPoly(temp_mask, [hull], 255)
-                    hand_mask = hand_mask | (temp_mask > 0)
+    body_mask = largest_component(full_body_mask)
     
-    # Check gesture condition: 2+ fingers above shoulders on each hand
-    if total_fingers_above_shoulders >= 4:  # At least 2 fingers per hand
-        gesture_detected = True
+    # Keep only hands whose wrist is on the tracked person; the render step reuses this
+    h, w = frame.shape[:2]
+    ownership = PlayerOwnership(body_mask, buffer_size=50)
+    owned_hands = ownership.owned_hands(hand_results.multi_hand_landmarks, w, h)
+    stats.add("masks", time.perf_counter() - masks_start)
     
-    # Simulate keyboard input with cooldown
-    current_time = time.time()
-    if current_time - last_gesture_time > gesture_cooldown:
-        simulate_keyboard_input(gesture_detected)
-        last_gesture_time = current_time
-    
-    # Create black background
-    output_frame = np.zeros_like(frame)
+    if landmark_recorder is not None:
+        landmark_recorder.append(capture_time, frame.shape, pose_results.pose_landmarks,
+                                 owned_hands, body_mask)
+
+    # Gesture condition: 2+ fingers above shoulders on each hand, checked with cooldown
+    action = strum.update(owned_hands, pose_results.pose_landmarks, time.time())
+    if action is not None:
+        simulate_keyboard_input(action == "press", capture_time)
+
+    return FrameState(
+        pose_landmarks=pose_results.pose_landmarks,
+        hand_landmarks=owned_hands,
+        total_fingers_above_shoulders=strum.fingers,
+        gesture_detected=strum.active,
+    )
+
+# Stickman connections (simplified skeleton), drawn once per displayed frame
+STICKMAN_CONNECTIONS = [
+    # Head to shoulders
+    (mp_pose.PoseLandmark.NOSE, mp_pose.PoseLandmark.LEFT_EAR),
+    (mp_pose.PoseLandmark.NOSE, mp_pose.PoseLandmark.RIGHT_EAR),
+    (mp_pose.PoseLandmark.LEFT_EAR, mp_pose.PoseLandmark.LEFT_SHOULDER),
+    (mp_pose.PoseLandmark.RIGHT_EAR, mp_pose.PoseLandmark.RIGHT_SHOULDER),
+
+    # Torso
+    (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.RIGHT_SHOULDER),
+    (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.LEFT_HIP),
+    (mp_pose.PoseLandmark.RIGHT_SHOULDER, mp_pose.PoseLandmark.RIGHT_HIP),
+    (mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.RIGHT_HIP),
+
+    # Arms
+    (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.LEFT_ELBOW),
+    (mp_pose.PoseLandmark.LEFT_ELBOW, mp_pose.PoseLandmark.LEFT_WRIST),
+    (mp_pose.PoseLandmark.RIGHT_SHOULDER, mp_pose.PoseLandmark.RIGHT_ELBOW),
+    (mp_pose.PoseLandmark.RIGHT_ELBOW, mp_pose.PoseLandmark.RIGHT_WRIST),
+
+    # Legs
+    (mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.LEFT_KNEE),
+    (mp_pose.PoseLandmark.LEFT_KNEE, mp_pose.PoseLandmark.LEFT_ANKLE),
+    (mp_pose.PoseLandmark.RIGHT_HIP, mp_pose.PoseLandmark.RIGHT_KNEE),
+    (mp_pose.PoseLandmark.RIGHT_KNEE, mp_pose.PoseLandmark.RIGHT_ANKLE),
+]
+
+STICKMAN_JOINTS = [
+    mp_pose.PoseLandmark.NOSE,
+    mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.RIGHT_SHOULDER,
+    mp_pose.PoseLandmark.LEFT_ELBOW, mp_pose.PoseLandmark.RIGHT_ELBOW,
+    mp_pose.PoseLandmark.LEFT_WRIST, mp_pose.PoseLandmark.RIGHT_WRIST,
+    mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.RIGHT_HIP,
+    mp_pose.PoseLandmark.LEFT_KNEE, mp_pose.PoseLandmark.RIGHT_KNEE,
+    mp_pose.PoseLandmark.LEFT_ANKLE, mp_pose.PoseLandmark.RIGHT_ANKLE
+]
+
+def draw_frame(frame, state):
+    """Draw the neon stickman, finger dots and status text for a tracked frame"""
+    global frame_count, fps_start_time, display_fps
+
+    # Create black background (reused every frame)
+    output_frame = render_buffers.zeros("output", frame.shape)
     
     # Draw stickman using pose landmarks
-    if pose_results.pose_landmarks:
+    if state.pose_landmarks:
         h, w = frame.shape[:2]
         rainbow_color = get_neon_person_color()
         
         # Get pose landmarks
-        landmarks = pose_results.pose_landmarks.landmark
+        landmarks = state.pose_landmarks.landmark
         
-        # Define stickman connections (simplified skeleton)
-        connections = [
-            # Head to shoulders
-            (mp_pose.PoseLandmark.NOSE, mp_pose.PoseLandmark.LEFT_EAR),
-            (mp_pose.PoseLandmark.NOSE, mp_pose.PoseLandmark.RIGHT_EAR),
-            (mp_pose.PoseLandmark.LEFT_EAR, mp_pose.PoseLandmark.LEFT_SHOULDER),
-            (mp_pose.PoseLandmark.RIGHT_EAR, mp_pose.PoseLandmark.RIGHT_SHOULDER),
-            
-            # Torso
-            (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.RIGHT_SHOULDER),
-            (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.LEFT_HIP),
-            (mp_pose.PoseLandmark.RIGHT_SHOULDER, mp_pose.PoseLandmark.RIGHT_HIP),
-            (mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.RIGHT_HIP),
-            
-            # Arms
-            (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.LEFT_ELBOW),
-            (mp_pose.PoseLandmark.LEFT_ELBOW, mp_pose.PoseLandmark.LEFT_WRIST),
-            (mp_pose.PoseLandmark.RIGHT_SHOULDER, mp_pose.PoseLandmark.RIGHT_ELBOW),
-            (mp_pose.PoseLandmark.RIGHT_ELBOW, mp_pose.PoseLandmark.RIGHT_WRIST),
-            
-            # Legs
-            (mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.LEFT_KNEE),
-            (mp_pose.PoseLandmark.LEFT_KNEE, mp_pose.PoseLandmark.LEFT_ANKLE),
-            (mp_pose.PoseLandmark.RIGHT_HIP, mp_pose.PoseLandmark.RIGHT_KNEE),
-            (mp_pose.PoseLandmark.RIGHT_KNEE, mp_pose.PoseLandmark.RIGHT_ANKLE),
-        ]
         
         # Draw stickman lines
-        for connection in connections:
+        for connection in STICKMAN_CONNECTIONS:
             start_landmark = landmarks[connection[0]]
             end_landmark = landmarks[connection[1]]
             
@@ -298,17 +296,8 @@ while cap.isOpened():
             cv2.line(output_frame, (start_x, start_y), (end_x, end_y), rainbow_color, 8)
         
         # Draw joints as circles
-        joint_landmarks = [
-            mp_pose.PoseLandmark.NOSE,
-            mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.RIGHT_SHOULDER,
-            mp_pose.PoseLandmark.LEFT_ELBOW, mp_pose.PoseLandmark.RIGHT_ELBOW,
-            mp_pose.PoseLandmark.LEFT_WRIST, mp_pose.PoseLandmark.RIGHT_WRIST,
-            mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.RIGHT_HIP,
-            mp_pose.PoseLandmark.LEFT_KNEE, mp_pose.PoseLandmark.RIGHT_KNEE,
-            mp_pose.PoseLandmark.LEFT_ANKLE, mp_pose.PoseLandmark.RIGHT_ANKLE
-        ]
         
-        for joint in joint_landmarks:
+        for joint in STICKMAN_JOINTS:
             landmark = landmarks[joint]
             x = int(landmark.x * w)
             y = int(landmark.y * h)
@@ -317,87 +306,178 @@ while cap.isOpened():
             cv2.circle(output_frame, (x, y), 6, (255, 255, 255), 2)
     
     # Draw hand landmarks with individual finger colors
-    if hand_results.multi_hand_landmarks:
+    if state.hand_landmarks:
         h, w = frame.shape[:2]
-        for hand_landmarks in hand_results.multi_hand_landmarks:
+        for hand_landmarks in state.hand_landmarks:
             wrist = hand_landmarks.landmark[0]
             wrist_x = int(wrist.x * w)
             wrist_y = int(wrist.y * h)
+
+            # Draw individual finger points with different colors
+            finger_colors = [
+                (0, 255, 0),    # Thumb - Green
+                (255, 0, 0),    # Index - Blue  
+                (0, 0, 255),    # Middle - Red
+                (255, 255, 0),  # Ring - Cyan
+                (255, 0, 255)   # Pinky - Magenta
+            ]
             
-            buffer_size = 50
-            wrist_in_person = False
+            finger_points = [
+                [4], [8], [12], [16], [20]  # Thumb, Index, Middle, Ring, Pinky tips
+            ]
             
-            for dx in range(-buffer_size, buffer_size + 1, 10):
-                for dy in range(-buffer_size, buffer_size + 1, 10):
-                    check_x = max(0, min(w-1, wrist_x + dx))
-                    check_y = max(0, min(h-1, wrist_y + dy))
-                    if body_mask[check_y, check_x]:
-                        wrist_in_person = True
-                        break
-                if wrist_in_person:
-                    break
+            # Draw wrist point
+            cv2.circle(output_frame, (wrist_x, wrist_y), 4, (255, 255, 255), -1)
             
-            if wrist_in_person:
-                # Draw individual finger points with different colors
-                finger_colors = [
-                    (0, 255, 0),    # Thumb - Green
-                    (255, 0, 0),    # Index - Blue  
-                    (0, 0, 255),    # Middle - Red
-                    (255, 255, 0),  # Ring - Cyan
-                    (255, 0, 255)   # Pinky - Magenta
-                ]
-                
-                finger_points = [
-                    [4], [8], [12], [16], [20]  # Thumb, Index, Middle, Ring, Pinky tips
-                ]
-                
-                # Draw wrist point
-                cv2.circle(output_frame, (wrist_x, wrist_y), 4, (255, 255, 255), -1)
-                
-                # Draw each finger tip with different colors
-                for finger_idx, finger_tips in enumerate(finger_points):
-                    color = finger_colors[finger_idx]
-                    for tip_idx in finger_tips:
-                        landmark = hand_landmarks.landmark[tip_idx]
-                        x = int(landmark.x * w)
-                        y = int(landmark.y * h)
-                        cv2.circle(output_frame, (x, y), 4, color, -1)
-    
-    # Draw pose landmarks for shoulder reference
-    if pose_results.pose_landmarks:
-        mp_drawing.draw_landmarks(
-            output_frame, pose_results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-            mp_drawing.DrawingSpec(color=(0, 255, 255), thickness=2, circle_radius=2),
-            mp_drawing.DrawingSpec(color=(0, 255, 255), thickness=2)
-        )
+            # Draw each finger tip with different colors
+            for finger_idx, finger_tips in enumerate(finger_points):
+                color = finger_colors[finger_idx]
+                for tip_idx in finger_tips:
+                    landmark = hand_landmarks.landmark[tip_idx]
+                    x = int(landmark.x * w)
+                    y = int(landmark.y * h)
+                    cv2.circle(output_frame, (x, y), 4, color, -1)
     
     # Display gesture status
-    status_text = "GESTURE ACTIVE" if gesture_detected else "NO GESTURE"
-    status_color = (0, 255, 0) if gesture_detected else (0, 0, 255)
+    status_text = "GESTURE ACTIVE" if state.gesture_detected else "NO GESTURE"
+    status_color = (0, 255, 0) if state.gesture_detected else (0, 0, 255)
     cv2.putText(output_frame, status_text, (10, 60), 
                cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
     
     # Display finger count
-    cv2.putText(output_frame, f"Fingers above shoulders: {total_fingers_above_shoulders}", 
+    cv2.putText(output_frame, f"Fingers above shoulders: {state.total_fingers_above_shoulders}", 
                (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     
-    # Calculate and display FPS
+    # Calculate and display the redraw rate
     frame_count += 1
     if frame_count % 30 == 0:
         fps_end_time = cv2.getTickCount()
-        fps = 30.0 / ((fps_end_time - fps_start_time) / cv2.getTickFrequency())
+        display_fps = 30.0 / ((fps_end_time - fps_start_time) / cv2.getTickFrequency())
         fps_start_time = fps_end_time
-        cv2.putText(output_frame, f"FPS: {fps:.1f}", (10, 30), 
+    if display_fps:
+        cv2.putText(output_frame, f"FPS: {display_fps:.1f}", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-    # Show the result
-    cv2.imshow("Gesture Tracker with Keyboard Simulation", output_frame)
+    return output_frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Guitar gesture tracker with keyboard simulation")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture, inference and render on separate threads")
+    parser.add_argument("--parallel-models", action="store_true",
+                        help="run segmentation, hands and pose concurrently, one worker each")
+    parser.add_argument("--segmentation-every", type=int, default=1, metavar="N",
+                        help="run selfie segmentation only every Nth frame")
+    parser.add_argument("--pose-hz", type=float, default=0.0, metavar="HZ",
+                        help="run pose at most HZ times per second, extrapolating in between")
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="run every model on each frame while the frame difference exceeds this")
+    parser.add_argument("--roi", action="store_true",
+                        help="run hands and pose on a padded crop around the player")
+    parser.add_argument("--autotune", action="store_true",
+                        help="pick the most accurate model variants that reach --target-fps "
+                             "on this machine (cached after the first run)")
+    parser.add_argument("--target-fps", type=float, default=30.0,
+                        help="frame rate --autotune aims for")
+    parser.add_argument("--retune", action="store_true",
+                        help="ignore the cached --autotune result and measure again")
+    parser.add_argument("--output", choices=("keys", "socket", "both", "none"), default="keys",
+                        help="press the spacebar, send gesture events over Socket.IO, both, or neither")
+    parser.add_argument("--server", default="http://localhost:3001",
+                        help="backend URL for --output socket/both")
+    parser.add_argument("--source", default="0",
+                        help="camera index, recorded video file or .npy frame dump")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="replay recordings as fast as possible instead of at their frame rate")
+    parser.add_argument("--headless", action="store_true",
+                        help="track without drawing or opening a window")
+    parser.add_argument("--display-fps", type=float, default=30.0,
+                        help="redraw the preview window at most this often; tracking and "
+                             "key events never wait for it")
+    parser.add_argument("--record-landmarks", metavar="DIR",
+                        help="record per-frame landmarks to DIR (a .lmk session) for "
+                             "python -m tracking.tune_gestures")
+    parser.add_argument("--record-events", metavar="PATH",
+                        help="write every gesture event of this run to PATH (JSON lines) for "
+                             "python -m charts.judge")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="write every per-stage timing sample to PATH on exit")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    global models, keyboard_controller, event_publisher, event_log, stats, landmark_recorder
+    if args.output in ("keys", "both"):
+        if keyboard is None:
+            parser.error("pynput is unavailable here; use --output socket")
+        keyboard_controller = keyboard.Controller()
+    if args.output in ("socket", "both"):
+        event_publisher = GestureEventPublisher(args.server, source="guitar")
+    if args.record_events:
+        event_log = event_publisher = GestureEventLog(args.record_events, source="guitar",
+                                                      forward=event_publisher)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    if args.stats_json:
+        stats = StageStats(window=None, metrics=METRICS)
+
+    factories = MODEL_FACTORIES
+    parallel = args.parallel_models
+    if args.autotune:
+        tuning = autotune(MODEL_FACTORIES, sample_frames(args.source),
+                          target_fps=args.target_fps, retune=args.retune)
+        print(f"[autotune] using {tuning.describe()}")
+        factories = configure(MODEL_FACTORIES, tuning.options)
+        parallel = parallel or tuning.parallel
+
+    if parallel:
+        models = ParallelModels(factories, stats=stats)
+    else:
+        models = SerialModels(factories, stats=stats)
+
+    if args.roi:
+        models = RoiModels(models, roi_names=("hands", "pose"))
+
+    if args.segmentation_every > 1 or args.pose_hz > 0:
+        models = ScheduledModels(
+            models,
+            rates={
+                "segmentation": ModelRate(every=args.segmentation_every),
+                "pose": ModelRate(hz=args.pose_hz),
+            },
+            extrapolators={"pose": extrapolate_pose},
+            motion_threshold=args.motion_threshold,
+        )
+
+    if args.record_landmarks:
+        landmark_recorder = LandmarkRecorder(args.record_landmarks, tracker="guitar")
+
+    exporters = MetricsExporters(args, tracker="guitar")
+    cap = open_source(args.source, realtime=not args.unthrottled)
+    show = not args.headless
+    start = time.perf_counter()
+    try:
+        if args.pipelined:
+            run_pipelined(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                          display_fps=args.display_fps)
+            print(f"[pipeline] final: {stats.format()}")
+        else:
+            run_serial(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                       display_fps=args.display_fps)
+    finally:
+        elapsed = time.perf_counter() - start
+        # Clean up
+        if spacebar_pressed:
+            simulate_keyboard_input(False)
+        if event_publisher is not None:
+            event_publisher.close()
+        cap.release()
+        models.close()
+        exporters.close()
+        if landmark_recorder is not None:
+            landmark_recorder.close()
+        if show:
+            cv2.destroyAllWindows()
+        if args.stats_json:
+            stats.dump(args.stats_json, tracker="guitar", source=args.source, seconds=elapsed)
 
-# Clean up
-if spacebar_pressed:
-    keyboard_controller.release(Key.space)
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#Multi-player gesture tracker: one camera, one process, one instrument per player
+
+import cv2
+import numpy as np
+import time
+try:
+    from pynput import keyboard
+except ImportError:  # no display, e.g. a headless box that only sends gesture events
+    keyboard = None
+import argparse
+from dataclasses import dataclass
+
+from tracking.engine import (MODEL_FACTORIES, RECOGNIZERS, SKELETON_CONNECTIONS,
+                             GestureOutput, Observation, load_plugins)
+from tracking import metrics
+from tracking.events import GestureEventPublisher
+from tracking.metrics import METRICS, MetricsExporters
+from tracking.ownership import PlayerOwnership
+from tracking.parallel import ParallelModels, SerialModels
+from tracking.pipeline import StageStats, run_pipelined, run_serial
+from tracking.players import PlayerTracker
+from tracking.render import FrameBuffers
+from tracking.roi import map_landmarks_to_frame
+from tracking.sources import open_source
+
+WINDOW_NAME = "Band Tracker"
+
+PLAYER_COLORS = [(255, 0, 255), (0, 255, 255), (0, 255, 0), (255, 128, 0)]
+
+
+class Player:
+    """One player slot: a recognizer from the engine registry fed from this player's crop"""
+
+    def __init__(self, slot, recognizer):
+        self.slot = slot
+        self.recognizer = recognizer
+        # Segmentation runs once on the full frame; the rest run per player crop
+        self.models = tuple(model for model in recognizer.models if model != "segmentation")
+
+    def model_name(self, model):
+        return f"{model}{self.slot}"
+
+    def status(self):
+        return f"P{self.slot + 1} {self.recognizer.status()}"
+
+
+@dataclass
+class PlayerView:
+    """What the render step draws for one player"""
+    player: Player
+    box: tuple
+    pose_landmarks: object
+    hands: list
+
+
+# Set up in main()
+models = None
+players = []
+player_tracker = PlayerTracker()
+stats = StageStats(metrics=METRICS)
+render_buffers = FrameBuffers()
+
+
+def track_frame(frame, capture_time=None):
+    """Segment the frame once, then run every player's models on their own crop in one batch"""
+    if capture_time is None:
+        capture_time = time.time()
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w = frame.shape[:2]
+
+    # Crop players where the previous frames found them; segmentation runs on the
+    # full frame in the same batch and places the crops for the next frame
+    names = ["segmentation"]
+    inputs = {}
+    boxes = player_tracker.crop_boxes()
+    for slot, box in boxes.items():
+        player = players[slot]
+        x0, y0, x1, y1 = box
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        for model in player.models:
+            names.append(player.model_name(model))
+            inputs[player.model_name(model)] = crop
+
+    results = models.process(rgb_frame, names=names, inputs=inputs)
+
+    masks_start = time.perf_counter()
+    regions = player_tracker.update(results["segmentation"].segmentation_mask > 0.5)
+    region_masks = {region.player_id: region.mask for region in regions}
+    stats.add("masks", time.perf_counter() - masks_start)
+
+    views = []
+    for player in players:
+        box = boxes.get(player.slot)
+        pose_landmarks = None
+        hands = []
+        if box is not None:
+            if "pose" in player.models:
+                pose_landmarks = results[player.model_name("pose")].pose_landmarks
+                if pose_landmarks is not None:
+                    map_landmarks_to_frame(pose_landmarks, box, w, h)
+            if "hands" in player.models:
+                multi_hand_landmarks = results[player.model_name("hands")].multi_hand_landmarks or []
+                for hand_landmarks in multi_hand_landmarks:
+                    map_landmarks_to_frame(hand_landmarks, box, w, h)
+                mask = region_masks.get(player.slot)
+                if mask is not None:
+                    hands = PlayerOwnership(mask).owned_hands(multi_hand_landmarks, w, h)
+
+        player.recognizer.update(Observation(capture_time=capture_time, width=w, height=h,
+                                             pose_landmarks=pose_landmarks, hands=hands,
+                                             body_mask=region_masks.get(player.slot)))
+        views.append(PlayerView(player, box, pose_landmarks, hands))
+    return views
+
+
+def draw_frame(frame, views):
+    """Draw every player's skeleton, crop box and status in their own color"""
+    h, w = frame.shape[:2]
+    output_frame = render_buffers.zeros("output", frame.shape)
+
+    for row, view in enumerate(views):
+        color = PLAYER_COLORS[view.player.slot % len(PLAYER_COLORS)]
+        if view.box is not None:
+            x0, y0, x1, y1 = view.box
+            cv2.rectangle(output_frame, (x0, y0), (x1, y1), color, 1)
+        if view.pose_landmarks is not None:
+            lm = view.pose_landmarks.landmark
+            for a, b in SKELETON_CONNECTIONS:
+                cv2.line(output_frame, (int(lm[a].x * w), int(lm[a].y * h)),
+                         (int(lm[b].x * w), int(lm[b].y * h)), color, 6)
+        for hand_landmarks in view.hands:
+            for tip_idx in (4, 8, 12, 16, 20):
+                landmark = hand_landmarks.landmark[tip_idx]
+                cv2.circle(output_frame, (int(landmark.x * w), int(landmark.y * h)), 4,
+                           (255, 255, 255), -1)
+        cv2.putText(output_frame, view.player.status(), (10, 30 + 30 * row),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+    return output_frame
+
+
+def main():
+    global models, players, stats
+
+    parser = argparse.ArgumentParser(description="Multi-player guitar/drums gesture tracker")
+    parser.add_argument("--players", default="guitar,drums",
+                        help="comma-separated instrument per player, left to right "
+                             "(any registered recognizer, e.g. guitar or drums)")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="import MODULE to register extra recognizers (repeatable)")
+    parser.add_argument("--output", choices=("keys", "socket", "both", "none"), default="socket",
+                        help="press keys, send per-player gesture events over Socket.IO, "
+                             "both, or neither")
+    parser.add_argument("--server", default="http://localhost:3001",
+                        help="backend URL for --output socket/both")
+    parser.add_argument("--parallel-models", action="store_true",
+                        help="run every player's models concurrently, one worker each")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture, inference and render on separate threads")
+    parser.add_argument("--source", default="0",
+                        help="camera index, recorded video file or .npy frame dump")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="replay recordings as fast as possible instead of at their frame rate")
+    parser.add_argument("--headless", action="store_true",
+                        help="track without drawing or opening a window")
+    parser.add_argument("--display-fps", type=float, default=30.0,
+                        help="redraw the preview window at most this often; tracking and "
+                             "key events never wait for it")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="write every per-stage timing sample to PATH on exit")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    load_plugins(args.plugin)
+    instruments = [name.strip() for name in args.players.split(",") if name.strip()]
+    for instrument in instruments:
+        if instrument not in RECOGNIZERS:
+            parser.error(f"unknown instrument {instrument!r}")
+
+    keyboard_controller = None
+    if args.output in ("keys", "both"):
+        if keyboard is None:
+            parser.error("pynput is unavailable here; use --output socket")
+        keyboard_controller = keyboard.Controller()
+
+    if args.stats_json:
+        stats = StageStats(window=None, metrics=METRICS)
+
+    for slot, instrument in enumerate(instruments):
+        publisher = None
+        if args.output in ("socket", "both"):
+            publisher = GestureEventPublisher(args.server, source=f"player{slot + 1}-{instrument}")
+        output = GestureOutput(keyboard_controller, publisher, stats, label=f"P{slot + 1}",
+                               player=slot + 1)
+        # Frames are not flipped here, so hands keep MediaPipe's names
+        players.append(Player(slot, RECOGNIZERS[instrument](output, mirrored=False)))
+    player_tracker.max_players = len(players)
+
+    factories = {"segmentation": MODEL_FACTORIES["segmentation"]}
+    for player in players:
+        for model in player.models:
+            factories[player.model_name(model)] = MODEL_FACTORIES[model]
+    runner_class = ParallelModels if args.parallel_models else SerialModels
+    models = runner_class(factories, stats=stats)
+
+    exporters = MetricsExporters(args, tracker="band")
+    cap = open_source(args.source, realtime=not args.unthrottled)
+    show = not args.headless
+    start = time.perf_counter()
+    try:
+        if args.pipelined:
+            run_pipelined(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                          display_fps=args.display_fps)
+        else:
+            run_serial(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                       display_fps=args.display_fps)
+    finally:
+        elapsed = time.perf_counter() - start
+        for player in players:
+            player.recognizer.close()
+            player.recognizer.output.close()
+        cap.release()
+        models.close()
+        exporters.close()
+        if show:
+            cv2.destroyAllWindows()
+        if args.stats_json:
+            stats.dump(args.stats_json, tracker="band", source=args.source, seconds=elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Reading, indexing and generating .chart files on the Python side"""
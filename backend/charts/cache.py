@@ -0,0 +1,180 @@
+"""mtime-keyed binary cache of parsed charts
+
+Parsing is fast, but a library of thousands of charts still adds up, so every parsed
+chart is saved once in a flat binary file together with its summary:
+
+    ~/.cache/giutasr/charts/<hash of the chart path>.chartbin
+
+An entry is valid while the chart's mtime and size match the ones stored with it.
+Listing a library reads only each entry's small header; loading a chart reads one
+file and skips the text parse.
+
+List a library (parsing only new or changed charts) from the backend directory with:
+
+    python -m charts.cache uploads/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from charts.chart import Chart, read_chart
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "giutasr", "charts")
+CACHE_VERSION = 1
+CHART_EXTENSION = ".chart"
+ENTRY_EXTENSION = ".chartbin"
+
+
+def find_charts(paths):
+    """Expand files and directories into a sorted list of .chart files"""
+    charts = []
+    for path in paths:
+        if os.path.isdir(path):
+            charts.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                          if name.lower().endswith(CHART_EXTENSION))
+        else:
+            charts.append(path)
+    return charts
+
+
+def _descr(dtype):
+    return np.lib.format.dtype_to_descr(np.dtype(dtype))
+
+
+class ChartCache:
+    """Loads charts through the binary cache, re-parsing only new or modified files
+
+    An entry is an 8-byte header length, a JSON header (source mtime/size, [Song]
+    values, summary and the layout of every array) and the arrays' raw bytes, each
+    8-byte aligned. summary() reads only the header; load() reads the file once and
+    maps every array onto that buffer without copying.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{key}{ENTRY_EXTENSION}")
+
+    def _header(self, f, stat):
+        """The entry's header if it matches the chart on disk, else None"""
+        try:
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+        except ValueError:
+            return None
+        if (header.get("version") != CACHE_VERSION or header.get("mtime_ns") != stat.st_mtime_ns
+                or header.get("size") != stat.st_size):
+            return None
+        return header
+
+    def load(self, path):
+        """Parsed Chart for path"""
+        stat = os.stat(path)
+        try:
+            with open(self._entry_path(path), "rb") as f:
+                header = self._header(f, stat)
+                if header is not None:
+                    data = bytearray(header["data_bytes"])
+                    f.readinto(data)
+        except OSError:
+            header = None
+        if header is None:
+            self.misses += 1
+            chart = read_chart(path)
+            self._save(path, stat, chart)
+            return chart
+
+        self.hits += 1
+        arrays = {
+            name: np.frombuffer(data, np.lib.format.descr_to_dtype(descr), count, offset)
+            for name, (descr, count, offset) in header["arrays"].items()
+        }
+        return Chart(
+            song=header["song"], resolution=header["resolution"], offset=header["offset"],
+            tempos=arrays.pop("tempos"), time_signatures=arrays.pop("time_signatures"),
+            events=arrays.pop("events"), event_texts=header["event_texts"],
+            tracks={name[len("track:"):]: array for name, array in arrays.items()
+                    if name.startswith("track:")},
+            specials={name[len("special:"):]: array for name, array in arrays.items()
+                      if name.startswith("special:")},
+        )
+
+    def summary(self, path):
+        """Chart.summary() for path, from the cache when it is up to date"""
+        stat = os.stat(path)
+        try:
+            with open(self._entry_path(path), "rb") as f:
+                header = self._header(f, stat)
+        except OSError:
+            header = None
+        if header is None:
+            return self.load(path).summary()
+        self.hits += 1
+        return header["summary"]
+
+    def _save(self, path, stat, chart):
+        arrays = {"tempos": chart.tempos, "time_signatures": chart.time_signatures,
+                  "events": chart.events}
+        arrays.update({f"track:{name}": notes for name, notes in chart.tracks.items()})
+        arrays.update({f"special:{name}": special for name, special in chart.specials.items()})
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = (_descr(array.dtype), len(array), offset)
+            offset += -(-array.nbytes // 8) * 8
+        header = json.dumps({
+            "version": CACHE_VERSION, "source": os.path.abspath(path),
+            "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+            "song": chart.song, "resolution": chart.resolution, "offset": chart.offset,
+            "event_texts": chart.event_texts, "summary": chart.summary(),
+            "arrays": layout, "data_bytes": offset,
+        }).encode("utf-8")
+        header += b" " * (-(len(header) + 8) % 8)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(path)
+        # Written aside and renamed, so a reader never sees a half-written entry
+        partial = f"{entry_path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for array in arrays.values():
+                data = np.ascontiguousarray(array).tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+        os.replace(partial, entry_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List .chart files through the binary cache")
+    parser.add_argument("paths", nargs="+", help=".chart files or directories of them")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--json", action="store_true", help="print the summaries as JSON")
+    args = parser.parse_args()
+
+    cache = ChartCache(args.cache_dir)
+    start = time.perf_counter()
+    summaries = {path: cache.summary(path) for path in find_charts(args.paths)}
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for path, summary in summaries.items():
+            notes = summary["note_counts"].get("ExpertSingle", 0)
+            print(f"{summary['length_ms'] / 1000.0:7.1f}s {summary['bpm']:7.2f} BPM "
+                  f"{notes:5d} notes  {summary['name']} - {summary['artist']}  "
+                  f"({os.path.basename(path)})")
+    print(f"{len(summaries)} charts in {elapsed * 1000.0:.1f} ms "
+          f"({cache.hits} cached, {cache.misses} parsed)")
+
+
+if __name__ == "__main__":
+    main()
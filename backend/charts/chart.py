@@ -0,0 +1,253 @@
+"""Single-pass .chart parser into NumPy structured arrays
+
+A .chart file is a list of [Section] blocks of "key = value" lines:
+
+    [Song]          Name = "...", Resolution = 192, Offset = 0, ...
+    [SyncTrack]     0 = TS 4, 0 = B 120000 (BPM * 1000), ...
+    [Events]        0 = E "section Intro", ...
+    [ExpertSingle]  768 = N 0 192 (fret, sustain in ticks), 768 = S 2 384, ...
+
+The file is read line by line once. Every difficulty section becomes a structured
+array of notes with their tick, fret and sustain, plus the same times in
+milliseconds from the tempo map. The parser accepts the sloppy layouts the chart
+generator has produced, e.g. "}[SyncTrack]" on one line, stray braces, duplicate
+notes and CRLF line endings with a BOM.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+NOTE_DTYPE = np.dtype([("tick", np.int64), ("fret", np.int16), ("sustain", np.int64),
+                       ("ms", np.float64), ("sustain_ms", np.float64)])
+SPECIAL_DTYPE = np.dtype([("tick", np.int64), ("kind", np.int16), ("length", np.int64)])
+TEMPO_DTYPE = np.dtype([("tick", np.int64), ("bpm", np.float64), ("ms", np.float64)])
+TIME_SIGNATURE_DTYPE = np.dtype([("tick", np.int64), ("numerator", np.int16),
+                                 ("denominator", np.int16)])
+EVENT_DTYPE = np.dtype([("tick", np.int64), ("ms", np.float64)])
+
+DEFAULT_RESOLUTION = 192
+DEFAULT_BPM = 120.0
+
+# Fret numbers 0-4 are the five lanes, 7 is an open note; 5 (forced) and 6 (tap) are
+# flags on the notes at the same tick rather than notes of their own
+NOTE_FLAGS = (5, 6)
+
+
+@dataclass
+class Chart:
+    """A parsed chart; note times are milliseconds from the start of the audio"""
+    song: dict  # [Song] values, quotes stripped
+    resolution: int  # ticks per quarter note
+    offset: float  # seconds the audio is shifted against the chart
+    tempos: np.ndarray  # TEMPO_DTYPE
+    time_signatures: np.ndarray  # TIME_SIGNATURE_DTYPE
+    events: np.ndarray  # EVENT_DTYPE, one row per [Events] text
+    event_texts: list  # the event texts, in the same order
+    tracks: dict = field(default_factory=dict)  # section name -> NOTE_DTYPE
+    specials: dict = field(default_factory=dict)  # section name -> SPECIAL_DTYPE (star power)
+
+    def tick_to_ms(self, ticks):
+        """Milliseconds for ticks (scalar or array) following the tempo map"""
+        return tick_to_ms(ticks, self.tempos, self.resolution) + self.offset * 1000.0
+
+    def notes(self, section="ExpertSingle"):
+        """Notes of one difficulty section, without the forced/tap flag rows"""
+        notes = self.tracks.get(section)
+        if notes is None:
+            return np.empty(0, NOTE_DTYPE)
+        return notes[~np.isin(notes["fret"], NOTE_FLAGS)]
+
+    def note_counts(self):
+        """{section: number of notes}, chords counted once per tick"""
+        return {section: int(len(np.unique(self.notes(section)["tick"])))
+                for section in self.tracks}
+
+    @property
+    def length_ms(self):
+        """End of the last note or sustain in any section"""
+        ends = [float((notes["ms"] + notes["sustain_ms"]).max())
+                for notes in self.tracks.values() if len(notes)]
+        return max(ends, default=0.0)
+
+    def summary(self):
+        """Small JSON-able description for listings"""
+        return {
+            "name": self.song.get("Name", ""),
+            "artist": self.song.get("Artist", ""),
+            "charter": self.song.get("Charter", ""),
+            "genre": self.song.get("Genre", ""),
+            "resolution": self.resolution,
+            "bpm": float(self.tempos["bpm"][0]) if len(self.tempos) else DEFAULT_BPM,
+            "length_ms": self.length_ms,
+            "note_counts": self.note_counts(),
+        }
+
+
+def tick_to_ms(ticks, tempos, resolution):
+    """Vectorized tick -> ms through a TEMPO_DTYPE map whose "ms" column is filled in"""
+    ticks = np.asarray(ticks, dtype=np.float64)
+    index = np.maximum(np.searchsorted(tempos["tick"], ticks, side="right") - 1, 0)
+    tempo = tempos[index]
+    return tempo["ms"] + (ticks - tempo["tick"]) * 60000.0 / (tempo["bpm"] * resolution)
+
+
+def ms_to_tick(ms, tempos, resolution):
+    """Inverse of tick_to_ms: fractional ticks for times in milliseconds"""
+    ms = np.asarray(ms, dtype=np.float64)
+    index = np.maximum(np.searchsorted(tempos["ms"], ms, side="right") - 1, 0)
+    tempo = tempos[index]
+    return tempo["tick"] + (ms - tempo["ms"]) * tempo["bpm"] * resolution / 60000.0
+
+
+def tempo_map(rows, resolution):
+    """TEMPO_DTYPE from (tick, bpm) rows, starting at tick 0, with cumulative ms"""
+    tempos = np.array(sorted(rows), dtype=[("tick", np.int64), ("bpm", np.float64)])
+    if not len(tempos) or tempos["tick"][0] != 0:
+        tempos = np.concatenate([np.array([(0, DEFAULT_BPM)], tempos.dtype), tempos])
+    out = np.empty(len(tempos), TEMPO_DTYPE)
+    out["tick"] = tempos["tick"]
+    out["bpm"] = tempos["bpm"]
+    ms_per_tick = 60000.0 / (tempos["bpm"][:-1] * resolution)
+    out["ms"][0] = 0.0
+    np.cumsum(np.diff(tempos["tick"]) * ms_per_tick, out=out["ms"][1:])
+    return out
+
+
+def _unique_sorted(array, keys):
+    """Sort rows by keys and drop exact key duplicates, keeping the first"""
+    if not len(array):
+        return array
+    array = array[np.lexsort([array[key] for key in reversed(keys)])]
+    keep = np.ones(len(array), dtype=bool)
+    keep[1:] = np.any([array[key][1:] != array[key][:-1] for key in keys], axis=0)
+    return array[keep]
+
+
+def _lines(text_or_lines):
+    """Logical lines, with "}[Section]" and similar run-ons split apart"""
+    for raw in text_or_lines:
+        line = raw.strip()
+        while line.startswith("}") and len(line) > 1:
+            yield "}"
+            line = line[1:].lstrip()
+        if line:
+            yield line
+
+
+def parse_chart(lines):
+    """Parse an iterable of lines (e.g. an open file) into a Chart"""
+    song = {}
+    tempo_rows, signature_rows = [], []
+    event_rows, event_texts = [], []
+    notes, specials = {}, {}
+    section = None
+
+    for line in _lines(lines):
+        first = line[0]
+        if first == "[":
+            section = line[1:line.index("]")] if "]" in line else line[1:]
+            continue
+        if first in "{}":
+            continue
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+
+        if section == "Song":
+            song[key] = value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+            continue
+        parts = value.split(None, 1)
+        if not parts or not key.isdigit():
+            continue
+        tick = int(key)
+        kind = parts[0]
+        rest = parts[1] if len(parts) > 1 else ""
+
+        if section == "SyncTrack":
+            if kind == "B":
+                tempo_rows.append((tick, int(rest) / 1000.0))
+            elif kind == "TS":
+                numbers = rest.split()
+                signature_rows.append((tick, int(numbers[0]),
+                                       2 ** int(numbers[1]) if len(numbers) > 1 else 4))
+        elif section == "Events":
+            if kind == "E":
+                event_rows.append(tick)
+                event_texts.append(rest.strip('"'))
+        elif section is not None and kind in ("N", "S"):
+            numbers = rest.split()
+            if len(numbers) < 2:
+                continue
+            rows = (notes if kind == "N" else specials).setdefault(section, [])
+            rows.append((tick, int(numbers[0]), int(numbers[1])))
+
+    resolution = int(song.get("Resolution", DEFAULT_RESOLUTION))
+    offset = float(song.get("Offset", 0) or 0)
+    tempos = tempo_map(tempo_rows, resolution)
+
+    chart = Chart(
+        song=song, resolution=resolution, offset=offset, tempos=tempos,
+        time_signatures=np.array(signature_rows or [(0, 4, 4)], TIME_SIGNATURE_DTYPE),
+        events=np.empty(len(event_rows), EVENT_DTYPE), event_texts=event_texts,
+    )
+    chart.events["tick"] = event_rows
+    chart.events["ms"] = chart.tick_to_ms(chart.events["tick"])
+    for name, rows in notes.items():
+        track = np.zeros(len(rows), NOTE_DTYPE)
+        raw = np.array(rows, dtype=np.int64)
+        track["tick"], track["fret"], track["sustain"] = raw[:, 0], raw[:, 1], raw[:, 2]
+        track = _unique_sorted(track, ("tick", "fret"))
+        track["ms"] = chart.tick_to_ms(track["tick"])
+        track["sustain_ms"] = chart.tick_to_ms(track["tick"] + track["sustain"]) - track["ms"]
+        chart.tracks[name] = track
+    for name, rows in specials.items():
+        chart.specials[name] = _unique_sorted(np.array(rows, SPECIAL_DTYPE), ("tick", "kind"))
+    return chart
+
+
+def read_chart(path):
+    """Parse a .chart file; tolerates a UTF-8 BOM and undecodable bytes"""
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        return parse_chart(f)
+
+
+# [Song] keys written without quotes, as Clone Hero writes them
+UNQUOTED_SONG_KEYS = ("Offset", "Resolution", "Player2", "Difficulty", "PreviewStart",
+                      "PreviewEnd")
+
+
+def format_chart(chart):
+    """.chart text for a Chart; only tick, fret and sustain of the notes are used"""
+    lines = ["[Song]", "{"]
+    song = {**chart.song, "Resolution": str(chart.resolution)}
+    for key, value in song.items():
+        lines.append(f"  {key} = {value}" if key in UNQUOTED_SONG_KEYS else f'  {key} = "{value}"')
+    lines += ["}", "[SyncTrack]", "{"]
+    rows = [(int(tick), f"TS {numerator}" if denominator == 4
+             else f"TS {numerator} {int(np.log2(denominator))}")
+            for tick, numerator, denominator in chart.time_signatures]
+    rows += [(int(tick), f"B {int(round(bpm * 1000.0))}") for tick, bpm, _ in chart.tempos]
+    # Time signatures before tempos at the same tick, like every chart editor
+    lines += [f"  {tick} = {text}" for tick, text in sorted(rows, key=lambda row: row[0])]
+    lines += ["}", "[Events]", "{"]
+    lines += [f'  {int(tick)} = E "{text}"'
+              for tick, text in zip(chart.events["tick"], chart.event_texts)]
+    lines.append("}")
+    for section, notes in chart.tracks.items():
+        lines += [f"[{section}]", "{"]
+        rows = [(int(tick), f"N {fret} {sustain}") for tick, fret, sustain
+                in zip(notes["tick"], notes["fret"], notes["sustain"])]
+        special = chart.specials.get(section)
+        if special is not None:
+            rows += [(int(tick), f"S {kind} {length}") for tick, kind, length in special]
+        lines += [f"  {tick} = {text}" for tick, text in sorted(rows, key=lambda row: row[0])]
+        lines.append("}")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def write_chart(chart, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(format_chart(chart))
@@ -0,0 +1,432 @@
+"""Generate .chart files from audio with onset detection and beat tracking, on the CPU
+
+    audio --ffmpeg--> mono float32 chunks --STFT--> spectral flux, centroid, RMS
+          --> onsets (adaptive threshold) and beats (windowed autocorrelation tempo +
+              dynamic programming) --> tempo map (B events) --> notes per difficulty
+
+The audio is decoded by an ffmpeg subprocess (uncompressed .wav files are read
+directly) and analysed chunk by chunk, so only a few seconds of samples and the
+small per-frame feature arrays are ever in memory. Every analysis step is vectorized
+NumPy except the beat tracker's dynamic program, a short loop over frames.
+
+Beats are detected, not assumed: the tempo map has a B event wherever the beat
+period drifts more than TEMPO_TOLERANCE from a constant tempo, so notes land on the
+music rather than on a fixed grid. Notes are the detected onsets snapped to a
+difficulty-dependent grid; the lane follows the onset's brightness (spectral
+centroid) and notes followed by a long, still-sounding gap are sustained.
+
+From the backend directory, chart a batch of songs with one process per core:
+
+    python -m charts.generate songs/*.mp3 -o uploads/
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import subprocess
+import time
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from charts.chart import (NOTE_DTYPE, TIME_SIGNATURE_DTYPE, Chart, EVENT_DTYPE, ms_to_tick,
+                          tempo_map, write_chart)
+
+SAMPLE_RATE = 22050
+CHUNK_SECONDS = 10.0
+RESOLUTION = 192  # the game assumes 192 ticks per beat
+
+MIN_BPM, MAX_BPM = 60.0, 200.0
+PREFERRED_BPM = 120.0  # centre of the tempo prior, in log2 octaves
+BEAT_TIGHTNESS = 100.0  # how strongly the beat tracker keeps a steady period
+TEMPO_TOLERANCE = 0.015  # seconds a beat may stray from its tempo segment
+
+# Grid in ticks, share of the onsets kept (strongest first) and lanes per difficulty
+DIFFICULTIES = {
+    "ExpertSingle": (RESOLUTION // 4, 1.0, 4),
+    "HardSingle": (RESOLUTION // 2, 0.75, 4),
+    "MediumSingle": (RESOLUTION, 0.5, 3),
+    "EasySingle": (RESOLUTION * 2, 0.35, 3),
+}
+SUSTAIN_MIN_GAP = 2 * RESOLUTION  # sustain notes followed by at least two silent beats ...
+SUSTAIN_LEVEL = 0.5  # ... whose level half a beat later is still this share of the attack
+
+
+def _read_wav(path, chunk_frames):
+    """(sample rate, iterator of mono float32 chunks) of a PCM .wav file"""
+    reader = wave.open(path, "rb")
+    rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+
+    def chunks():
+        with reader:
+            while True:
+                data = reader.readframes(chunk_frames)
+                if not data:
+                    break
+                if width == 3:  # 24-bit: widen to 32-bit before decoding
+                    raw = np.frombuffer(data, np.uint8).reshape(-1, 3)
+                    data = np.pad(raw, ((0, 0), (1, 0))).tobytes()
+                    samples = np.frombuffer(data, "<i4").astype(np.float32) / 2.0 ** 31
+                elif width == 1:
+                    samples = (np.frombuffer(data, np.uint8).astype(np.float32) - 128.0) / 128.0
+                else:
+                    dtype = {2: "<i2", 4: "<i4"}[width]
+                    samples = np.frombuffer(data, dtype).astype(np.float32) / 2.0 ** (8 * width - 1)
+                yield samples.reshape(-1, channels).mean(axis=1)
+
+    return rate, chunks()
+
+
+def _read_ffmpeg(path, rate, chunk_frames):
+    command = ["ffmpeg", "-v", "error", "-nostdin", "-i", path,
+               "-f", "f32le", "-ac", "1", "-ar", str(rate), "pipe:1"]
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg is needed to decode {path}; install it or convert to .wav")
+
+    def chunks():
+        try:
+            while True:
+                data = process.stdout.read(4 * chunk_frames)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) // 4 * 4], np.float32)
+        finally:
+            process.stdout.close()
+            error = process.stderr.read().decode("utf-8", "replace").strip()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg could not decode {path}: {error}")
+
+    return rate, chunks()
+
+
+def open_audio(path, sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    """(sample rate, iterator of mono float32 chunks of about chunk_seconds)"""
+    if path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as reader:
+                rate = reader.getframerate()
+            return _read_wav(path, int(rate * chunk_seconds))
+        except wave.Error:
+            pass  # compressed or float .wav: let ffmpeg decode it
+    return _read_ffmpeg(path, sample_rate, int(sample_rate * chunk_seconds))
+
+
+class OnsetAnalyzer:
+    """Streaming STFT features: feed() chunks of samples, then read the per-frame arrays
+
+    flux is the half-wave rectified increase of the log-compressed spectrum (the onset
+    strength), centroid the spectral centroid in Hz and rms the frame level. Frames
+    are about 46 ms long with a hop of a quarter of that at any sample rate.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.n_fft = 2 ** int(round(np.log2(sample_rate * 0.046)))
+        self.hop = self.n_fft // 4
+        self.fps = sample_rate / self.hop
+        self._window = np.hanning(self.n_fft).astype(np.float32)
+        self._freqs = np.fft.rfftfreq(self.n_fft, 1.0 / sample_rate).astype(np.float32)
+        self._pending = np.zeros(0, np.float32)  # samples not yet covered by a whole frame
+        self._previous = None  # last frame's log spectrum
+        self._flux, self._centroid, self._rms = [], [], []
+
+    def feed(self, samples):
+        samples = np.concatenate([self._pending, np.asarray(samples, np.float32)])
+        count = (len(samples) - self.n_fft) // self.hop + 1 if len(samples) >= self.n_fft else 0
+        if count <= 0:
+            self._pending = samples
+            return
+        frames = sliding_window_view(samples, self.n_fft)[::self.hop][:count] * self._window
+        self._pending = samples[count * self.hop:]
+
+        magnitude = np.abs(np.fft.rfft(frames, axis=1)).astype(np.float32)
+        log_spectrum = np.log1p(100.0 * magnitude)
+        previous = self._previous if self._previous is not None else log_spectrum[:1]
+        rise = np.diff(np.concatenate([previous, log_spectrum]), axis=0)
+        self._previous = log_spectrum[-1:]
+
+        self._flux.append(np.maximum(rise, 0.0).sum(axis=1))
+        self._centroid.append((magnitude @ self._freqs) / (magnitude.sum(axis=1) + 1e-9))
+        self._rms.append(np.sqrt((frames * frames).mean(axis=1)))
+
+    def features(self):
+        """(flux, centroid, rms) arrays over every frame fed so far"""
+        join = lambda parts: np.concatenate(parts) if parts else np.zeros(0, np.float32)
+        return join(self._flux), join(self._centroid), join(self._rms)
+
+    def frame_times(self, frames):
+        """Seconds at the centre of frame indexes"""
+        return (np.asarray(frames) * self.hop + self.n_fft / 2) / self.sample_rate
+
+
+def pick_onsets(flux, fps, wait=0.05, mean_window=0.1, delta=0.07):
+    """Frame indexes of onsets: local maxima of the flux above its local mean + delta"""
+    envelope = flux / max(float(np.percentile(flux, 99)), 1e-9)
+    peak_radius = max(1, int(round(0.03 * fps)))
+    mean_radius = max(1, int(round(mean_window * fps)))
+    local_max = sliding_window_view(np.pad(envelope, peak_radius, mode="edge"),
+                                    2 * peak_radius + 1).max(axis=1)
+    padded = np.pad(envelope, mean_radius, mode="edge")
+    local_mean = sliding_window_view(padded, 2 * mean_radius + 1).mean(axis=1)
+    candidates = np.flatnonzero((envelope >= local_max) & (envelope > local_mean + delta))
+
+    # Keep onsets at least `wait` apart, the first of a cluster winning
+    onsets, last = [], -np.inf
+    min_gap = wait * fps
+    for frame in candidates:
+        if frame - last >= min_gap:
+            onsets.append(frame)
+            last = frame
+    onsets = np.array(onsets, dtype=np.int64)
+    return onsets, envelope[onsets]
+
+
+def _autocorrelation(envelope):
+    envelope = envelope - envelope.mean()
+    size = 1 << int(np.ceil(np.log2(2 * len(envelope))))
+    spectrum = np.fft.rfft(envelope, size)
+    return np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(envelope)]
+
+
+def estimate_period(flux, fps, around=None, octaves=1.0):
+    """Beat period in frames from the onset envelope's autocorrelation
+
+    The candidates are weighted by a log-normal prior, `octaves` wide, centred on
+    PREFERRED_BPM or on the period `around`.
+    """
+    autocorrelation = _autocorrelation(flux)
+    lags = np.arange(int(fps * 60.0 / MAX_BPM), int(fps * 60.0 / MIN_BPM) + 1)
+    lags = lags[lags < len(flux) - 1]
+    if not len(lags):
+        return around or fps * 60.0 / PREFERRED_BPM
+    centre = around or fps * 60.0 / PREFERRED_BPM
+    weights = np.exp(-0.5 * (np.log2(lags / centre) / octaves) ** 2)
+    best = int(np.argmax(autocorrelation[lags] * weights))
+    lag = float(lags[best])
+    if 0 < best < len(lags) - 1:  # parabolic refinement between lags
+        a, b, c = autocorrelation[lags[best - 1:best + 2]]
+        if a - 2 * b + c < 0:
+            lag += 0.5 * (a - c) / (a - 2 * b + c)
+    return lag
+
+
+def local_periods(flux, fps, window=8.0, hop=2.0):
+    """Beat period in frames at every frame, from overlapping windows
+
+    Each window's estimate is drawn towards the song's overall period, so a window
+    does not jump to double or half time, and the estimates are median-smoothed.
+    """
+    overall = estimate_period(flux, fps)
+    size, step = int(window * fps), int(hop * fps)
+    if len(flux) <= size:
+        return np.full(len(flux), overall)
+    starts = np.arange(0, len(flux) - size + 1, step)
+    periods = np.array([estimate_period(flux[start:start + size], fps, overall, 0.5)
+                        for start in starts])
+    if len(periods) >= 5:
+        periods = np.median(sliding_window_view(np.pad(periods, 2, mode="edge"), 5), axis=1)
+    return np.interp(np.arange(len(flux)), starts + size / 2, periods)
+
+
+def track_beats(flux, periods):
+    """Beat frame indexes by dynamic programming (Ellis 2007) around per-frame periods"""
+    envelope = flux / max(float(flux.std()), 1e-9)
+    shortest = max(1, int(round(periods.min() / 2)))
+    longest = int(round(2 * periods.max()))
+    distances = np.arange(longest, shortest - 1, -1)  # oldest candidate first
+    log_distances = np.log(distances)
+    score = envelope.copy()
+    backlink = np.full(len(envelope), -1, dtype=np.int64)
+    for t in range(shortest, len(envelope)):
+        start = t - longest
+        penalty = -BEAT_TIGHTNESS * (log_distances[max(-start, 0):] - np.log(periods[t])) ** 2
+        candidates = score[max(start, 0):t - shortest + 1] + penalty
+        best = int(np.argmax(candidates))
+        if candidates[best] > 0:
+            score[t] = envelope[t] + candidates[best]
+            backlink[t] = max(start, 0) + best
+
+    # Follow the links back from the best-scoring frame of the last period
+    tail = max(len(score) - longest, 0)
+    beat = tail + int(np.argmax(score[tail:])) if len(score) else -1
+    beats = []
+    while beat >= 0:
+        beats.append(beat)
+        beat = backlink[beat]
+    return np.array(beats[::-1], dtype=np.int64)
+
+
+def fit_tempo(beat_times, tolerance=TEMPO_TOLERANCE, resolution=RESOLUTION):
+    """Tempo map rows [(tick, bpm), ...] putting every beat within tolerance of its tick
+
+    Beats are grouped greedily into constant-tempo segments; each segment starts
+    where the previous one ended, so the map is continuous. The audio before the
+    first beat becomes a lead-in of whole beats.
+    """
+    if len(beat_times) < 2:
+        return [(0, PREFERRED_BPM)]
+    first_period = float(beat_times[1] - beat_times[0])
+    lead_beats = max(1, int(round(beat_times[0] / first_period))) if beat_times[0] > 0 else 0
+    rows = [(0, 60.0 * lead_beats / beat_times[0])] if beat_times[0] > 0 else []
+
+    start, start_time = 0, float(beat_times[0])
+    while start < len(beat_times) - 1:
+        end, period = start + 1, float(beat_times[start + 1] - start_time)
+        while end + 1 < len(beat_times):
+            counts = np.arange(1, end + 2 - start)
+            offsets = beat_times[start + 1:end + 2] - start_time
+            candidate = float(offsets @ counts / (counts @ counts))  # slope through start
+            if np.abs(offsets - candidate * counts).max() > tolerance:
+                break
+            end, period = end + 1, candidate
+        rows.append(((lead_beats + start) * resolution, 60.0 / period))
+        start_time += period * (end - start)
+        start = end
+    # Drop segments that did not change the tempo noticeably
+    merged = [rows[0]]
+    for tick, bpm in rows[1:]:
+        if abs(bpm - merged[-1][1]) >= 0.01:
+            merged.append((tick, bpm))
+    return merged
+
+
+def chart_notes(onset_times, strengths, centroids, rms_at, tempos, resolution=RESOLUTION):
+    """{section: NOTE_DTYPE array} from onsets, per the DIFFICULTIES table
+
+    rms_at(seconds) returns the audio level at those times, for sustains.
+    """
+    ticks = ms_to_tick(onset_times * 1000.0, tempos, resolution)
+    # Lanes by brightness, split at the quartiles of this song's onsets
+    bounds = np.quantile(centroids, [0.25, 0.5, 0.75]) if len(centroids) else np.zeros(3)
+    lane_quarter = np.searchsorted(bounds, centroids)
+    tracks = {}
+    for section, (grid, keep, lanes) in DIFFICULTIES.items():
+        snapped = (np.round(ticks / grid) * grid).astype(np.int64)
+        # Strongest onset per grid slot, then the strongest `keep` share of those
+        order = np.lexsort((-strengths, snapped))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = snapped[order][1:] != snapped[order][:-1]
+        chosen = order[first]
+        if keep < 1.0 and len(chosen):
+            chosen = chosen[strengths[chosen] >= np.quantile(strengths[chosen], 1.0 - keep)]
+        chosen = chosen[np.argsort(snapped[chosen], kind="stable")]
+
+        notes = np.zeros(len(chosen), NOTE_DTYPE)
+        notes["tick"] = snapped[chosen]
+        notes["fret"] = lane_quarter[chosen] * lanes // 4
+        gaps = np.diff(notes["tick"], append=notes["tick"][-1:] + SUSTAIN_MIN_GAP)
+        attack = rms_at(onset_times[chosen])
+        later = rms_at(onset_times[chosen] + 30.0 / tempos["bpm"][
+            np.maximum(np.searchsorted(tempos["tick"], notes["tick"], side="right") - 1, 0)])
+        sustained = (gaps >= SUSTAIN_MIN_GAP) & (later >= SUSTAIN_LEVEL * attack)
+        notes["sustain"] = np.where(sustained, gaps - grid, 0)
+        tracks[section] = notes
+    return tracks
+
+
+def analyze(path, sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    """Stream the audio through an OnsetAnalyzer; returns the analyzer"""
+    rate, chunks = open_audio(path, sample_rate, chunk_seconds)
+    analyzer = OnsetAnalyzer(rate)
+    for chunk in chunks:
+        analyzer.feed(chunk)
+    return analyzer
+
+
+def generate_chart(path, name=None, artist="Unknown Artist", genre="Unknown"):
+    """Chart for one audio file"""
+    analyzer = analyze(path)
+    flux, centroid, rms = analyzer.features()
+    if len(flux) < 2:
+        raise RuntimeError(f"{path}: no audio")
+    onsets, strengths = pick_onsets(flux, analyzer.fps)
+    beats = track_beats(flux, local_periods(flux, analyzer.fps))
+    tempos = tempo_map(fit_tempo(analyzer.frame_times(beats)), RESOLUTION)
+
+    def rms_at(seconds):
+        frames = np.round((np.asarray(seconds) * analyzer.sample_rate - analyzer.n_fft / 2)
+                          / analyzer.hop).astype(np.int64)
+        return rms[np.clip(frames, 0, len(rms) - 1)]
+
+    song = {
+        "Name": name or os.path.splitext(os.path.basename(path))[0],
+        "Artist": artist,
+        "Charter": "Onset analysis",
+        "Offset": "0",
+        "Resolution": str(RESOLUTION),
+        "Player2": "bass",
+        "Genre": genre,
+        "MediaType": "CD",
+        "MusicStream": os.path.basename(path),
+    }
+    chart = Chart(song=song, resolution=RESOLUTION, offset=0.0, tempos=tempos,
+                  time_signatures=np.array([(0, 4, 4)], TIME_SIGNATURE_DTYPE),
+                  events=np.zeros(0, EVENT_DTYPE), event_texts=[])
+    tracks = chart_notes(analyzer.frame_times(onsets), strengths, centroid[onsets], rms_at,
+                         tempos)
+    for section, notes in tracks.items():
+        notes["ms"] = chart.tick_to_ms(notes["tick"])
+        notes["sustain_ms"] = chart.tick_to_ms(notes["tick"] + notes["sustain"]) - notes["ms"]
+        chart.tracks[section] = notes
+    return chart
+
+
+def _generate_one(job):
+    """Worker: chart one song into out_dir; returns a result dict, never raises"""
+    path, out_dir = job
+    start = time.perf_counter()
+    try:
+        chart = generate_chart(path)
+        out_path = os.path.join(out_dir or os.path.dirname(path),
+                                f"{os.path.splitext(os.path.basename(path))[0]}.chart")
+        write_chart(chart, out_path)
+        return {"audio": path, "chart": out_path, "seconds": time.perf_counter() - start,
+                **chart.summary(), "tempo_changes": len(chart.tempos) - 1}
+    except Exception as error:  # one bad file must not sink the batch
+        return {"audio": path, "error": str(error)}
+
+
+def generate_charts(paths, out_dir=None, workers=None):
+    """Chart several songs in a process pool; yields one result dict per song as done"""
+    jobs = [(path, out_dir) for path in paths]
+    if workers == 1 or len(jobs) <= 1:
+        yield from map(_generate_one, jobs)
+        return
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = [pool.submit(_generate_one, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate .chart files from audio files")
+    parser.add_argument("audio", nargs="+", help="audio files (anything ffmpeg decodes)")
+    parser.add_argument("-o", "--out-dir",
+                        help="directory for the charts (default: next to each audio file)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="songs analysed in parallel (default: one per core)")
+    args = parser.parse_args()
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    failed = 0
+    for result in generate_charts(args.audio, args.out_dir, args.workers):
+        if "error" in result:
+            failed += 1
+            print(f"FAILED {result['audio']}: {result['error']}")
+            continue
+        counts = " ".join(f"{section[:-len('Single')].lower()}={count}"
+                          for section, count in result["note_counts"].items())
+        print(f"{result['chart']}: {result['bpm']:.1f} BPM, {result['tempo_changes']} tempo "
+              f"changes, {result['length_ms'] / 1000.0:.0f}s, notes {counts} "
+              f"({result['seconds']:.1f}s)")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
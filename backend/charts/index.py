@@ -0,0 +1,245 @@
+"""Persistent SQLite index of a chart library, updated incrementally
+
+Listing a library should not mean reading every chart. The index keeps one row per
+chart with its [Song] metadata, its length from the real tempo map and, per
+difficulty section, its note count and density (notes per second). update() stats
+the library (one os.scandir per directory) and parses only charts whose mtime or
+size changed since they were indexed; deleted charts are dropped. Listing and
+filtering are then indexed queries:
+
+    python -m charts.index uploads/                        # update, then list
+    python -m charts.index uploads/ --genre rock --max-density 3 --json
+    python -m charts.index uploads/ --watch 2              # keep it up to date
+
+The index lives in ~/.cache/giutasr/charts.sqlite unless --db says otherwise.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from charts.cache import CHART_EXTENSION
+from charts.chart import read_chart
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".cache", "giutasr", "charts.sqlite")
+DEFAULT_SECTION = "ExpertSingle"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS charts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    name TEXT COLLATE NOCASE,
+    artist TEXT COLLATE NOCASE,
+    charter TEXT COLLATE NOCASE,
+    genre TEXT COLLATE NOCASE,
+    resolution INTEGER,
+    bpm REAL,
+    length_ms REAL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    chart_id INTEGER NOT NULL REFERENCES charts(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    notes INTEGER NOT NULL,
+    density REAL NOT NULL,
+    PRIMARY KEY (chart_id, section)
+);
+CREATE INDEX IF NOT EXISTS charts_name ON charts(name);
+CREATE INDEX IF NOT EXISTS charts_artist ON charts(artist);
+CREATE INDEX IF NOT EXISTS charts_genre ON charts(genre);
+CREATE INDEX IF NOT EXISTS charts_length ON charts(length_ms);
+CREATE INDEX IF NOT EXISTS sections_density ON sections(section, density);
+"""
+
+# Difficulty buckets of GET /api/charts, by expert note count
+DIFFICULTY_NOTES = (50, 100, 200, 300)
+
+
+def _scan(directory):
+    """{path: (mtime_ns, size)} of the .chart files directly in directory"""
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(CHART_EXTENSION) and entry.is_file():
+                stat = entry.stat()
+                found[os.path.abspath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+class ChartIndex:
+    """The chart table of one SQLite file; update() it, then query() it"""
+
+    def __init__(self, path=DEFAULT_DB):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")  # readers never wait for an update
+        self.db.executescript(SCHEMA)
+
+    def update(self, directory):
+        """Re-index new and modified charts in directory and forget deleted ones
+
+        Returns (added or changed, removed) counts. Charts that fail to parse are
+        indexed without metadata so they are not retried until they change.
+        """
+        directory = os.path.abspath(directory)
+        on_disk = _scan(directory)
+        indexed = {
+            row["path"]: (row["mtime_ns"], row["size"])
+            for row in self.db.execute(
+                "SELECT path, mtime_ns, size FROM charts WHERE path >= ? AND path < ?",
+                (directory + os.sep, directory + chr(ord(os.sep) + 1)))
+            if os.path.dirname(row["path"]) == directory
+        }
+        changed = [path for path, key in on_disk.items() if indexed.get(path) != key]
+        removed = [path for path in indexed if path not in on_disk]
+
+        with self.db:
+            self.db.executemany("DELETE FROM charts WHERE path = ?",
+                                [(path,) for path in removed])
+            for path in changed:
+                self._index(path, *on_disk[path])
+        return len(changed), len(removed)
+
+    def _index(self, path, mtime_ns, size):
+        try:
+            chart = read_chart(path)
+        except (OSError, ValueError) as error:
+            print(f"[charts] cannot parse {path}: {error}")
+            chart = None
+        song = chart.song if chart is not None else {}
+        self.db.execute("DELETE FROM charts WHERE path = ?", (path,))
+        cursor = self.db.execute(
+            "INSERT INTO charts (path, filename, mtime_ns, size, name, artist, charter, genre,"
+            " resolution, bpm, length_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, os.path.basename(path), mtime_ns, size, song.get("Name"), song.get("Artist"),
+             song.get("Charter"), song.get("Genre"),
+             chart.resolution if chart is not None else None,
+             float(chart.tempos["bpm"][0]) if chart is not None else None,
+             chart.length_ms if chart is not None else None))
+        if chart is None:
+            return
+        seconds = chart.length_ms / 1000.0
+        self.db.executemany(
+            "INSERT INTO sections (chart_id, section, notes, density) VALUES (?, ?, ?, ?)",
+            [(cursor.lastrowid, section, notes, notes / seconds if seconds > 0 else 0.0)
+             for section, notes in chart.note_counts().items()])
+
+    def query(self, name=None, artist=None, genre=None, min_length=None, max_length=None,
+              section=DEFAULT_SECTION, min_density=None, max_density=None, limit=None):
+        """Charts matching every given filter, as dicts, ordered by name
+
+        name matches as a case-insensitive prefix, artist and genre exactly (case
+        insensitive); lengths are in seconds. notes and density are those of section.
+        """
+        where, params = [], [section]
+        if name:
+            where.append("c.name LIKE ? ESCAPE '\\'")
+            params.append(name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                          + "%")
+        for column, value in (("artist", artist), ("genre", genre)):
+            if value:
+                where.append(f"c.{column} = ?")
+                params.append(value)
+        for clause, value in (("c.length_ms >= ?", min_length), ("c.length_ms <= ?", max_length)):
+            if value is not None:
+                where.append(clause)
+                params.append(value * 1000.0)
+        for clause, value in (("s.density >= ?", min_density), ("s.density <= ?", max_density)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = ("SELECT c.*, COALESCE(s.notes, 0) AS notes, COALESCE(s.density, 0) AS density"
+               " FROM charts c LEFT JOIN sections s ON s.chart_id = c.id AND s.section = ?")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.name"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def sections(self, chart_id):
+        """{section: (notes, density)} of one chart"""
+        return {row["section"]: (row["notes"], row["density"]) for row in self.db.execute(
+            "SELECT section, notes, density FROM sections WHERE chart_id = ?", (chart_id,))}
+
+    def close(self):
+        self.db.close()
+
+
+def api_record(row):
+    """A query() row in the shape GET /api/charts returns"""
+    difficulty = 1 + sum(row["notes"] >= bound for bound in DIFFICULTY_NOTES)
+    return {
+        "filename": row["filename"],
+        "songName": row["name"] or "Unknown Song",
+        "artist": row["artist"] or "Unknown Artist",
+        "difficulty": difficulty,
+        "length": int((row["length_ms"] or 0) // 1000),
+        "genre": row["genre"] or "Unknown",
+        "aiGenerated": row["charter"] == "Gemini",
+        "notes": row["notes"],
+        "density": round(row["density"], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a chart directory and query it")
+    parser.add_argument("directory", help="directory of .chart files, e.g. uploads/")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite index file")
+    parser.add_argument("--name", help="song name prefix")
+    parser.add_argument("--artist")
+    parser.add_argument("--genre")
+    parser.add_argument("--min-length", type=float, metavar="SECONDS")
+    parser.add_argument("--max-length", type=float, metavar="SECONDS")
+    parser.add_argument("--section", default=DEFAULT_SECTION,
+                        help="difficulty section the note filters apply to")
+    parser.add_argument("--min-density", type=float, metavar="NOTES_PER_S")
+    parser.add_argument("--max-density", type=float, metavar="NOTES_PER_S")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--json", action="store_true",
+                        help="print the matches like GET /api/charts does")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep re-checking the directory every SECONDS instead of listing")
+    args = parser.parse_args()
+
+    index = ChartIndex(args.db)
+    try:
+        while True:
+            start = time.perf_counter()
+            changed, removed = index.update(args.directory)
+            if not args.watch:
+                break
+            if changed or removed:
+                print(f"[charts] {changed} indexed, {removed} removed "
+                      f"in {(time.perf_counter() - start) * 1000.0:.1f} ms")
+            time.sleep(args.watch)
+        updated = time.perf_counter()
+        rows = index.query(args.name, args.artist, args.genre, args.min_length, args.max_length,
+                           args.section, args.min_density, args.max_density, args.limit)
+        queried = time.perf_counter()
+    except KeyboardInterrupt:
+        return
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps([api_record(row) for row in rows], indent=2))
+        return
+    for row in rows:
+        print(f"{(row['length_ms'] or 0) / 1000.0:7.1f}s {row['notes']:5d} notes "
+              f"{row['density']:5.2f}/s  {row['name']} - {row['artist']} [{row['genre']}]  "
+              f"({row['filename']})")
+    print(f"{len(rows)} charts; update {(updated - start) * 1000.0:.1f} ms "
+          f"({changed} indexed, {removed} removed), query {(queried - updated) * 1000.0:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
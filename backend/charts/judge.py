@@ -0,0 +1,197 @@
+"""Score recorded gesture events against the notes of a chart
+
+A run is a JSON-lines event log written by the trackers' --record-events, one file per
+run. It starts with the capture time of the first tracked frame, which is taken as the start of the
+song. Every "press" or "hit" event is one gesture, timed by its hitTime (drums, the
+sub-frame time of the crossing) or else its captureTime. Notes come from one difficulty
+section, with a chord counted once, and their times come from the [SyncTrack] tempo map.
+
+Each note is matched to the nearest unused gesture within +-window ms. The gesture times
+are a sorted array, so the candidates for every note are found with searchsorted. When
+two notes want the same gesture the closer one keeps it and the other tries again with
+what is left. Offsets are gesture minus note time, so positive means late:
+
+    python -m charts.judge "uploads/Cruel Summer.chart" runs/*.jsonl --window 100
+
+The report gives the hit rate, the mean and standard deviation (jitter) of the offsets,
+and their median as the systematic latency, per run and pooled over all runs.
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+from charts.cache import ChartCache
+
+DEFAULT_SECTION = "ExpertSingle"
+DEFAULT_WINDOW_MS = 100.0
+GESTURE_ACTIONS = ("press", "hit")  # a strum release is not a new gesture
+
+
+@dataclass
+class Run:
+    """One recorded run: gesture times in ms from the song start, sorted"""
+    path: str
+    times: np.ndarray
+
+
+@dataclass
+class Score:
+    notes: int
+    gestures: int
+    offsets: np.ndarray  # ms, gesture minus note, one per matched note
+
+    @property
+    def hits(self):
+        return len(self.offsets)
+
+    def summary(self):
+        """JSON-able metrics; offset statistics are None without any hit"""
+        offsets = self.offsets
+        hit = len(offsets) > 0
+        return {
+            "notes": self.notes,
+            "gestures": self.gestures,
+            "hits": self.hits,
+            "misses": self.notes - self.hits,
+            "extra": self.gestures - self.hits,
+            "hit_rate": self.hits / self.notes if self.notes else 0.0,
+            "mean_ms": float(offsets.mean()) if hit else None,
+            "jitter_ms": float(offsets.std()) if hit else None,
+            "latency_ms": float(np.median(offsets)) if hit else None,
+            "p95_abs_ms": float(np.percentile(np.abs(offsets), 95)) if hit else None,
+        }
+
+
+def note_times(chart, section=DEFAULT_SECTION):
+    """Sorted times (ms) of a section's notes, one per tick so chords count once"""
+    return chart.tick_to_ms(np.unique(chart.notes(section)["tick"]))
+
+
+def read_run(path, source=None, gesture=None, song_start=0.0):
+    """Gesture times of an event log, in ms after the song started
+
+    source and gesture keep only the events of one instrument or gesture; song_start is
+    how long after the first frame the song began.
+    """
+    # Only start lines and gesture lines are parsed, all in one json.loads call
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f if '"start"' in line or '"press"' in line or '"hit"' in line]
+    starts = {}
+    times = []
+    for record in json.loads("[" + ",".join(lines) + "]"):
+        if source is not None and record.get("source") != source:
+            continue
+        if "start" in record:
+            if record.get("source") in starts:
+                raise ValueError(f"{path}: more than one run of {record.get('source')!r}; "
+                                 "record each run to its own file")
+            starts[record.get("source")] = record["start"]
+        elif (record.get("action") in GESTURE_ACTIONS
+              and (gesture is None or record.get("gesture") == gesture)):
+            times.append(record.get("hitTime", record["captureTime"]))
+    if not starts:
+        raise ValueError(f"{path}: no start line; was it written with --record-events?")
+    # Instruments tracked together share the first frame, so their starts agree
+    start = min(starts.values())
+    times = np.sort(np.asarray(times, dtype=np.float64)) - start - song_start
+    return Run(path, times)
+
+
+def match(notes, gestures, window=DEFAULT_WINDOW_MS):
+    """(note indexes, gesture indexes) of the one-to-one nearest matches within window
+
+    Both arrays must be sorted. Every round, each unmatched note picks the nearer of the
+    free gestures on either side of it; conflicts go to the closest note, and the losers
+    retry in the next round without the gestures already taken.
+    """
+    note_ids = np.arange(len(notes))
+    free = np.arange(len(gestures))
+    matched_notes = []
+    matched_gestures = []
+    while len(note_ids) and len(free):
+        times = gestures[free]
+        right = np.searchsorted(times, notes[note_ids])
+        left = np.maximum(right - 1, 0)
+        right = np.minimum(right, len(times) - 1)
+        left_gap = np.abs(times[left] - notes[note_ids])
+        right_gap = np.abs(times[right] - notes[note_ids])
+        nearest = np.where(right_gap < left_gap, right, left)
+        gap = np.minimum(left_gap, right_gap)
+        within = gap <= window
+        if not within.any():
+            break
+        candidates, nearest, gap = note_ids[within], nearest[within], gap[within]
+        # Closest claim first, then the first claim on every gesture wins
+        order = np.argsort(gap, kind="stable")
+        _, first = np.unique(nearest[order], return_index=True)
+        won = order[first]
+        matched_notes.append(candidates[won])
+        matched_gestures.append(free[nearest[won]])
+        note_ids = np.setdiff1d(note_ids, candidates[won], assume_unique=True)
+        free = np.delete(free, nearest[won])
+    if not matched_notes:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    note_index = np.concatenate(matched_notes)
+    order = np.argsort(note_index)
+    return note_index[order], np.concatenate(matched_gestures)[order]
+
+
+def score(notes, gestures, window=DEFAULT_WINDOW_MS):
+    """Score of sorted gesture times against sorted note times"""
+    note_index, gesture_index = match(notes, gestures, window)
+    return Score(len(notes), len(gestures), gestures[gesture_index] - notes[note_index])
+
+
+def pooled(scores):
+    """One Score over several runs of the same chart"""
+    return Score(sum(s.notes for s in scores), sum(s.gestures for s in scores),
+                 np.concatenate([s.offsets for s in scores] or [np.empty(0)]))
+
+
+def _format(summary):
+    line = (f"{summary['hits']:5d}/{summary['notes']:<5d} hit {summary['hit_rate'] * 100.0:5.1f}%"
+            f"  {summary['extra']:4d} extra")
+    if summary["hits"]:
+        line += (f"  latency {summary['latency_ms']:+6.1f} ms  mean {summary['mean_ms']:+6.1f} ms"
+                 f"  jitter {summary['jitter_ms']:5.1f} ms  p95 |off| {summary['p95_abs_ms']:5.1f} ms")
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score recorded gesture runs against a chart")
+    parser.add_argument("chart", help=".chart file the runs played along to")
+    parser.add_argument("runs", nargs="+", help="event logs written by --record-events")
+    parser.add_argument("--section", default=DEFAULT_SECTION,
+                        help="difficulty section to score against, e.g. ExpertDrums")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW_MS, metavar="MS",
+                        help="largest |gesture - note| that still counts as a hit")
+    parser.add_argument("--source", help="only score this instrument's events, e.g. drums")
+    parser.add_argument("--gesture", help="only score this gesture, e.g. strum")
+    parser.add_argument("--song-start", type=float, default=0.0, metavar="MS",
+                        help="how long after the first tracked frame the song started")
+    parser.add_argument("--json", action="store_true", help="print the scores as JSON")
+    args = parser.parse_args()
+
+    notes = note_times(ChartCache().load(args.chart), args.section)
+    if not len(notes):
+        parser.error(f"{args.chart} has no notes in [{args.section}]")
+    runs = [read_run(path, args.source, args.gesture, args.song_start) for path in args.runs]
+    scores = [score(notes, run.times, args.window) for run in runs]
+    total = pooled(scores).summary()
+
+    if args.json:
+        print(json.dumps({"chart": args.chart, "section": args.section, "window_ms": args.window,
+                          "runs": {run.path: s.summary() for run, s in zip(runs, scores)},
+                          "pooled": total}, indent=2))
+        return
+    if len(runs) <= 20:
+        for run, s in zip(runs, scores):
+            print(f"{_format(s.summary())}  {run.path}")
+    print(f"{_format(total)}  pooled over {len(runs)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Lets pytest import the backend packages (charts, tracking) when run from any directory:
+#     python -m pytest backend/tests
@@ -3,25 +3,66 @@ import mediapipe as mp
 import numpy as np
 import time
 import colorsys
-import pyautogui
+try:
+    import pyautogui
+except Exception:  # no display, e.g. a headless box that only sends gesture events
+    pyautogui = None
+import argparse
+from dataclasses import dataclass
+
+from tracking.autotune import autotune, configure, sample_frames
+from tracking import metrics
+from tracking.events import GestureEventLog, GestureEventPublisher
+from tracking.filters import OneEuroFilter
+from tracking.gestures import DrumGesture
+from tracking.landmarks import LandmarkRecorder
+from tracking.metrics import METRICS, MetricsExporters
+from tracking.parallel import ParallelModels, SerialModels
+from tracking.pipeline import StageStats, run_serial
+from tracking.render import FrameBuffers, binary_mask, blend_trail, flash_white
+from tracking.roi import RoiModels
+from tracking.sources import open_source
 
 # --- Setup MediaPipe ---
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose()
+mp_selfie_segmentation = mp.solutions.selfie_segmentation
 
-cap = cv2.VideoCapture(0)
+def make_segmentation(model_selection=1):
+    return mp_selfie_segmentation.SelfieSegmentation(model_selection=model_selection)
 
-mp_selfie_segmentation = mp.solutions.selfie_segmentation
-segment = mp_selfie_segmentation.SelfieSegmentation(model_selection=1)
+MODEL_FACTORIES = {
+    "pose": mp_pose.Pose,
+    "segmentation": make_segmentation,
+}
+
+# Model runner, created in main()
+models = None
+
+# --- Gesture outputs, set up in main() ---
+press_keys = False
+event_publisher = None
+event_log = None  # optional GestureEventLog (also the event_publisher) for charts.judge
+landmark_recorder = None  # optional LandmarkRecorder for offline tuning
+
+# Per-stage timings, also exported through tracking.metrics; frame_to_gesture is
+# recorded for every drum hit
+stats = StageStats(metrics=METRICS)
+
+WINDOW_NAME = "Psychedelic Stick Figure + Head"
 
 # --- Detection thresholds ---
 HIT_THRESHOLD = 40
 RESET_THRESHOLD = 20
+LEAD_TIME = 0.025  # fire this long before the wrist is due to cross HIT_THRESHOLD
 
-left_hand_down = False
-right_hand_down = False
+drum = DrumGesture(hit_threshold=HIT_THRESHOLD, reset_threshold=RESET_THRESHOLD,
+                   smoother=OneEuroFilter(), lead_time=LEAD_TIME)
+DRUM_KEYS = {"right": 'l', "left": 'a'}
 
 # --- Visual state ---
+# Reused every frame so steady-state frames allocate nothing
+track_buffers = FrameBuffers()
+render_buffers = FrameBuffers()
 prev_frame = None
 flash_timer = 0
 FLASH_DURATION = 0.08  # very brief flash
@@ -40,49 +81,70 @@ SKELETON_CONNECTIONS = [
 # Basic face landmarks we care about (nose, eyes, ears)
 FACE_POINTS = [0, 1, 2, 3, 4]
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-    frame = cv2.flip(frame, 1)
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    results = pose.process(rgb)
+@dataclass
+class DrumState:
+    """Everything the render step needs from one tracked frame"""
+    pose_landmarks: object
+    segmentation_mask: object
+    rel_left: float
+    rel_right: float
+
+
+def send_hit(key, hit, capture_time):
+    """Deliver a drum hit as a key press and/or a Socket.IO gesture event"""
+    if press_keys:
+        injected = time.perf_counter()
+        pyautogui.press(key)
+        stats.add("key_injection", time.perf_counter() - injected)
+    METRICS.inc("gesture_events_total", gesture="drum", action="hit")
+    if event_publisher is not None:
+        event_publisher.publish("drum", capture_time, action="hit", key=key, hand=hit.hand,
+                                hitTime=hit.time * 1000.0, predicted=hit.predicted)
+    stats.add("frame_to_gesture", time.time() - capture_time)
+
+
+def track_frame(frame, capture_time=None):
+    """Run the models on a (mirrored) frame and fire drum hits"""
+    global flash_timer
+
+    if capture_time is None:
+        capture_time = time.time()
+    if event_log is not None:
+        event_log.frame(capture_time)
+    frame = cv2.flip(frame, 1, dst=track_buffers.get("flipped", frame.shape))
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=track_buffers.get("rgb", frame.shape))
+
+    model_results = models.process(rgb)
+    results = model_results["pose"]
+
+    if landmark_recorder is not None:
+        landmark_recorder.append(capture_time, frame.shape, results.pose_landmarks, (),
+                                 model_results["segmentation"].segmentation_mask)
+
+    # --- Drum hit logic: wrist y minus shoulder y, in pixels ---
+    for hit in drum.update(results.pose_landmarks, frame.shape[0], capture_time):
+        send_hit(DRUM_KEYS[hit.hand], hit, capture_time)
+        flash_timer = time.time()
+        print(f"{hit.hand} hit{' (predicted)' if hit.predicted else ''}")
+
+    return DrumState(
+        pose_landmarks=results.pose_landmarks,
+        segmentation_mask=model_results["segmentation"].segmentation_mask,
+        rel_left=drum.rel_left,
+        rel_right=drum.rel_right,
+    )
+
+
+def draw_frame(frame, state):
+    """Draw the psychedelic stick figure, trails, hit flash and outline"""
+    global prev_frame
 
     h, w = frame.shape[:2]
-    output_frame = np.zeros_like(frame)
-    rel_left, rel_right = 0, 0
-
-    if results.pose_landmarks:
-        lm = results.pose_landmarks.landmark
-
-        
-
-        # Wrist/shoulder positions
-        left_shoulder_y = lm[11].y * h
-        right_shoulder_y = lm[12].y * h
-        left_wrist_y = lm[15].y * h
-        right_wrist_y = lm[16].y * h
-
-        rel_left = left_wrist_y - left_shoulder_y
-        rel_right = right_wrist_y - right_shoulder_y
-
-        # --- Drum hit logic ---
-        if not left_hand_down and rel_left > HIT_THRESHOLD:
-            pyautogui.press('l')
-            left_hand_down = True
-            flash_timer = time.time()
-            print("right hit")
-        elif left_hand_down and rel_left < RESET_THRESHOLD:
-            left_hand_down = False
-
-        if not right_hand_down and rel_right > HIT_THRESHOLD:
-            pyautogui.press('a')
-            right_hand_down = True
-            flash_timer = time.time()
-            print("left hit")
-        elif right_hand_down and rel_right < RESET_THRESHOLD:
-            right_hand_down = False
+    output_frame = render_buffers.zeros("output", frame.shape)
+
+    if state.pose_landmarks:
+        lm = state.pose_landmarks.landmark
 
         # --- Psychedelic color ---
         hue = (time.time() * 0.5) % 1.0
@@ -106,37 +168,129 @@ while True:
 
     # --- Motion trails ---
     if prev_frame is not None:
-        output_frame = cv2.addWeighted(output_frame, 0.7, prev_frame, 0.3, 0)
-    prev_frame = output_frame.copy()
+        blend_trail(output_frame, prev_frame, keep=0.7)
+    else:
+        prev_frame = render_buffers.get("trail", output_frame.shape)
+        np.copyto(prev_frame, output_frame)
 
     # --- Full screen flash ---
     now = time.time()
     if now - flash_timer < FLASH_DURATION:
-        white_overlay = np.full_like(output_frame, 255)
         alpha = 1 - ((now - flash_timer) / FLASH_DURATION)
-        output_frame = cv2.addWeighted(white_overlay, alpha, output_frame, 1 - alpha, 0)
+        flash_white(output_frame, alpha)
 
-    seg_results = segment.process(rgb)
-
-    if seg_results.segmentation_mask is not None:
-        mask = seg_results.segmentation_mask
+    if state.segmentation_mask is not None:
+        mask = state.segmentation_mask
         # Threshold to get binary mask
-        binary_mask = (mask > 0.5).astype(np.uint8) * 255
+        person_mask = binary_mask(mask, 0.5, render_buffers.get("mask", mask.shape))
 
         # Find contours of person
-        contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(person_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         # Draw thick white outline
         cv2.drawContours(output_frame, contours, -1, (255, 255, 255), 5)
 
     # Debug text
-    cv2.putText(output_frame, f"L:{rel_left:.1f} R:{rel_right:.1f}",
+    cv2.putText(output_frame, f"L:{state.rel_left:.1f} R:{state.rel_right:.1f}",
                 (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
                 (255, 255, 255), 2)
 
-    cv2.imshow("Psychedelic Stick Figure + Head", output_frame)
+    return output_frame
+
+
+def main():
+    global models, press_keys, event_publisher, event_log, stats, landmark_recorder
+
+    parser = argparse.ArgumentParser(description="Drum gesture tracker")
+    parser.add_argument("--roi", action="store_true",
+                        help="run pose on a padded crop around the player")
+    parser.add_argument("--lead-ms", type=float, default=LEAD_TIME * 1000.0,
+                        help="fire a hit up to this long before the wrist crosses the threshold "
+                             "(0 = only on crossing)")
+    parser.add_argument("--no-smoothing", action="store_true",
+                        help="use raw landmarks instead of One-Euro filtered ones")
+    parser.add_argument("--autotune", action="store_true",
+                        help="pick the most accurate model variants that reach --target-fps "
+                             "on this machine (cached after the first run)")
+    parser.add_argument("--target-fps", type=float, default=30.0,
+                        help="frame rate --autotune aims for")
+    parser.add_argument("--retune", action="store_true",
+                        help="ignore the cached --autotune result and measure again")
+    parser.add_argument("--output", choices=("keys", "socket", "both", "none"), default="keys",
+                        help="press keys, send gesture events over Socket.IO, both, or neither")
+    parser.add_argument("--server", default="http://localhost:3001",
+                        help="backend URL for --output socket/both")
+    parser.add_argument("--source", default="0",
+                        help="camera index, recorded video file or .npy frame dump")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="replay recordings as fast as possible instead of at their frame rate")
+    parser.add_argument("--headless", action="store_true",
+                        help="track without drawing or opening a window")
+    parser.add_argument("--display-fps", type=float, default=30.0,
+                        help="redraw the preview window at most this often; tracking and "
+                             "key events never wait for it")
+    parser.add_argument("--record-landmarks", metavar="DIR",
+                        help="record per-frame landmarks to DIR (a .lmk session) for "
+                             "python -m tracking.tune_gestures")
+    parser.add_argument("--record-events", metavar="PATH",
+                        help="write every gesture event of this run to PATH (JSON lines) for "
+                             "python -m charts.judge")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="write every per-stage timing sample to PATH on exit")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    drum.lead_time = args.lead_ms / 1000.0
+    if args.no_smoothing:
+        drum.smoother = None
+
+    press_keys = args.output in ("keys", "both")
+    if press_keys and pyautogui is None:
+        parser.error("pyautogui is unavailable here; use --output socket")
+    if args.output in ("socket", "both"):
+        event_publisher = GestureEventPublisher(args.server, source="drums")
+    if args.record_events:
+        event_log = event_publisher = GestureEventLog(args.record_events, source="drums",
+                                                      forward=event_publisher)
+
+    if args.stats_json:
+        stats = StageStats(window=None, metrics=METRICS)
+
+    if args.autotune:
+        tuning = autotune(MODEL_FACTORIES, sample_frames(args.source),
+                          target_fps=args.target_fps, retune=args.retune)
+        print(f"[autotune] using {tuning.describe()}")
+        runner_class = ParallelModels if tuning.parallel else SerialModels
+        models = runner_class(configure(MODEL_FACTORIES, tuning.options), stats=stats)
+    else:
+        models = SerialModels(MODEL_FACTORIES, stats=stats)
+    if args.roi:
+        models = RoiModels(models, roi_names=("pose",))
+
+    if args.record_landmarks:
+        # Frames are flipped before tracking, so record them as mirrored
+        landmark_recorder = LandmarkRecorder(args.record_landmarks, mirrored=True,
+                                             tracker="drums")
+
+    exporters = MetricsExporters(args, tracker="drums")
+    cap = open_source(args.source, realtime=not args.unthrottled)
+    start = time.perf_counter()
+    try:
+        run_serial(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=not args.headless,
+                   display_fps=args.display_fps)
+    finally:
+        elapsed = time.perf_counter() - start
+        cap.release()
+        models.close()
+        exporters.close()
+        if landmark_recorder is not None:
+            landmark_recorder.close()
+        if event_publisher is not None:
+            event_publisher.close()
+        if not args.headless:
+            cv2.destroyAllWindows()
+        if args.stats_json:
+            stats.dump(args.stats_json, tracker="drums", source=args.source, seconds=elapsed)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
 
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from charts.chart import format_chart, ms_to_tick, parse_chart, tempo_map, tick_to_ms
+
+CHART = """[Song]
+{
+  Name = "Tempo Test"
+  Offset = 0.5
+  Resolution = 192
+}
+[SyncTrack]
+{
+  0 = TS 4
+  0 = B 120000
+  768 = B 60000
+  1152 = B 240000
+}
+[Events]
+{
+  768 = E "section Verse"
+}
+[ExpertSingle]
+{
+  0 = N 0 0
+  0 = N 1 0
+  0 = N 5 0
+  384 = N 2 192
+  960 = N 3 0
+  1152 = N 0 384
+}
+"""
+
+
+def test_tick_to_ms_follows_tempo_changes():
+    tempos = tempo_map([(0, 120.0), (768, 60.0), (1152, 240.0)], 192)
+    # 120 bpm: 250 ms per beat for 4 beats, then 60 bpm: 1000 ms per beat for 2 beats
+    assert tempos["ms"].tolist() == [0.0, 2000.0, 4000.0]
+    ticks = np.array([0, 192, 768, 960, 1152, 1344])
+    expected = [0.0, 500.0, 2000.0, 3000.0, 4000.0, 4250.0]
+    assert tick_to_ms(ticks, tempos, 192).tolist() == pytest.approx(expected)
+    assert ms_to_tick(expected, tempos, 192).tolist() == pytest.approx(ticks.tolist())
+
+
+def test_tempo_map_defaults_to_120_bpm_from_tick_zero():
+    tempos = tempo_map([(384, 60.0)], 192)
+    assert tempos["tick"].tolist() == [0, 384]
+    assert tempos["ms"].tolist() == [0.0, 1000.0]
+
+
+def test_parse_chart_times_notes_and_sustains():
+    chart = parse_chart(CHART.splitlines())
+    assert chart.resolution == 192
+    assert chart.offset == 0.5
+    notes = chart.notes()
+    # The forced flag (fret 5) is dropped, the chord at tick 0 keeps both frets
+    assert notes["tick"].tolist() == [0, 0, 384, 960, 1152]
+    assert notes["ms"].tolist() == pytest.approx([500.0, 500.0, 1500.0, 3500.0, 4500.0])
+    # One beat at 120 bpm, and two beats at 240 bpm
+    assert notes["sustain_ms"][2] == pytest.approx(500.0)
+    assert notes["sustain_ms"][4] == pytest.approx(500.0)
+    assert chart.events["ms"].tolist() == pytest.approx([2500.0])
+    assert chart.note_counts() == {"ExpertSingle": 4}
+
+
+def test_format_chart_round_trips():
+    chart = parse_chart(CHART.splitlines())
+    again = parse_chart(format_chart(chart).splitlines())
+    assert again.song == chart.song
+    assert np.array_equal(again.tempos, chart.tempos)
+    assert np.array_equal(again.tracks["ExpertSingle"], chart.tracks["ExpertSingle"])
+    assert again.event_texts == chart.event_texts
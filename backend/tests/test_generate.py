@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from charts.chart import tempo_map, tick_to_ms
+from charts.generate import PREFERRED_BPM, RESOLUTION, TEMPO_TOLERANCE, fit_tempo
+
+
+def _beat_errors(beat_times, rows):
+    """Seconds between each beat and the time of its tick in the fitted tempo map"""
+    # The audio before the first beat is a lead-in of whole beats of the first period
+    lead_beats = max(1, round(beat_times[0] / (beat_times[1] - beat_times[0])))
+    ticks = RESOLUTION * (lead_beats + np.arange(len(beat_times)))
+    ms = tick_to_ms(ticks, tempo_map(rows, RESOLUTION), RESOLUTION)
+    return np.abs(ms / 1000.0 - beat_times)
+
+
+def test_steady_beats_give_one_tempo_with_a_lead_in():
+    beats = 0.5 + 0.5 * np.arange(40)  # 120 bpm, first beat after a one-beat lead-in
+    rows = fit_tempo(beats)
+    assert len(rows) == 1
+    assert rows[0][0] == 0 and rows[0][1] == pytest.approx(120.0)
+    assert _beat_errors(beats, rows).max() < 1e-9
+
+
+def test_tempo_change_starts_a_new_segment():
+    slow = 60.0 / 100.0 * np.arange(1, 33)  # 100 bpm from 0.6 s
+    fast = slow[-1] + 60.0 / 130.0 * np.arange(1, 33)  # then 130 bpm
+    beats = np.concatenate([slow, fast])
+    rows = fit_tempo(beats)
+    bpms = [bpm for _, bpm in rows]
+    assert bpms[0] == pytest.approx(100.0)
+    assert bpms[-1] == pytest.approx(130.0)
+    # The change lands on the beat where it happened
+    assert rows[-1][0] == len(slow) * RESOLUTION
+    assert _beat_errors(beats, rows).max() < 1e-6
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_every_beat_stays_within_tolerance(seed):
+    rng = np.random.default_rng(seed)
+    periods = 60.0 / rng.uniform(80.0, 160.0) + rng.normal(0.0, 0.004, 120)
+    beats = 1.0 + np.cumsum(periods)
+    rows = fit_tempo(beats)
+    ticks = [tick for tick, _ in rows]
+    assert ticks == sorted(set(ticks))
+    assert _beat_errors(beats, rows).max() <= TEMPO_TOLERANCE + 1e-9
+
+
+def test_too_few_beats_fall_back_to_the_preferred_tempo():
+    assert fit_tempo(np.array([1.0])) == [(0, PREFERRED_BPM)]
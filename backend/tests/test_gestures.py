@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from tracking.filters import OneEuroFilter
+from tracking.gestures import (LEFT_SHOULDER, LEFT_WRIST, RIGHT_SHOULDER, RIGHT_WRIST,
+                               DrumGesture, _time_to_reach)
+
+HEIGHT = 480.0
+FPS = 30.0
+SHOULDER_Y = 0.3
+
+
+def _pose(rel_left, rel_right=0.0):
+    """Pose whose wrists sit rel px below their shoulders"""
+    landmark = [SimpleNamespace(x=0.5, y=0.5) for _ in range(33)]
+    landmark[LEFT_SHOULDER].y = landmark[RIGHT_SHOULDER].y = SHOULDER_Y
+    landmark[LEFT_WRIST].y = SHOULDER_Y + rel_left / HEIGHT
+    landmark[RIGHT_WRIST].y = SHOULDER_Y + rel_right / HEIGHT
+    return SimpleNamespace(landmark=landmark)
+
+
+def _play(drum, rels):
+    """Feed the left wrist heights at FPS; returns [(frame index, hit), ...]"""
+    hits = []
+    for index, rel in enumerate(rels):
+        hits.extend((index, hit) for hit in drum.update(_pose(rel), HEIGHT, index / FPS))
+    return hits
+
+
+def test_one_euro_smooths_jitter_at_rest_and_tracks_a_ramp():
+    rng = np.random.default_rng(0)
+    times = np.arange(300) / FPS
+    noisy = 100.0 + rng.normal(0.0, 2.0, len(times))
+    still = OneEuroFilter()
+    smoothed = np.array([still(value, t) for value, t in zip(noisy, times)])
+    assert smoothed[60:].std() < 0.7 * noisy[60:].std()
+
+    ramp = OneEuroFilter()
+    for t in times:
+        value = ramp(500.0 * t, t)
+    # A fast stroke passes with little lag; the velocity is taken against the filtered
+    # value, as in the reference filter, so it reads somewhat high during the lag
+    assert 500.0 * times[-1] - value < 5.0
+    assert ramp.velocity == pytest.approx(500.0, rel=0.2)
+
+
+def test_hit_time_is_interpolated_between_frames():
+    drum = DrumGesture(hit_threshold=40, reset_threshold=20, mirrored=False)
+    # 1000 px/s downwards: the wrist crosses 40 px at 0.04 s, between frames 1 and 2
+    hits = _play(drum, [0.0, 1000.0 / FPS, 2000.0 / FPS])
+    assert len(hits) == 1
+    index, hit = hits[0]
+    assert index == 2 and hit.hand == "left" and not hit.predicted
+    assert hit.time == pytest.approx(0.04)
+
+
+def test_fast_stroke_fires_early_once_with_the_crossing_time():
+    drum = DrumGesture(hit_threshold=40, reset_threshold=20, mirrored=False, lead_time=0.025)
+    step = 1000.0 / FPS
+    rels = [-100.0, -100.0 + step, -100.0 + 2 * step, 0.0, step, 2 * step, 3 * step]
+    hits = _play(drum, rels)
+    assert len(hits) == 1  # the real crossing on the next frame does not fire again
+    index, hit = hits[0]
+    assert index == 4 and hit.predicted
+    assert hit.time == pytest.approx(4 / FPS + (40.0 - step) / 1000.0)
+
+
+def test_braking_stroke_is_not_predicted():
+    drum = DrumGesture(hit_threshold=40, reset_threshold=20, mirrored=False, lead_time=0.025)
+    # 750 px/s slowing to 400 px/s at 25 px: at that deceleration it stops before 40 px
+    assert _play(drum, [-13.33, 11.67, 25.0]) == []
+
+
+def test_hit_rearms_only_above_the_reset_threshold():
+    drum = DrumGesture(hit_threshold=40, reset_threshold=20, mirrored=False)
+    hits = _play(drum, [0.0, 50.0, 30.0, 50.0, 10.0, 50.0])
+    assert [index for index, _ in hits] == [1, 5]
+
+
+def test_mirrored_frames_swap_hand_names():
+    drum = DrumGesture(mirrored=True)
+    assert drum.update(_pose(0.0), HEIGHT, 0.0) == []
+    assert [hit.hand for hit in drum.update(_pose(50.0), HEIGHT, 1 / FPS)] == ["right"]
+
+
+def test_time_to_reach():
+    assert _time_to_reach(10.0, 100.0, 0.0) == pytest.approx(0.1)
+    # 10 = 0 * t + 0.5 * 2000 * t^2
+    assert _time_to_reach(10.0, 0.0, 2000.0) == pytest.approx(0.1)
+    assert _time_to_reach(10.0, 100.0, -1000.0) is None
@@ -0,0 +1,106 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from charts.judge import match, read_run, score
+from tracking.events import GestureEventLog
+
+
+def _random_run(rng, notes=300, latency=30.0, jitter=25.0):
+    note_times = np.sort(rng.uniform(0, 60000, notes))
+    kept = note_times[rng.random(notes) > 0.15]
+    gestures = kept + rng.normal(latency, jitter, len(kept))
+    extra = rng.uniform(0, 60000, notes // 10)
+    return note_times, np.sort(np.concatenate([gestures, extra]))
+
+
+def test_match_known_pairs():
+    notes = np.array([0.0, 100.0, 200.0])
+    gestures = np.array([10.0, 95.0, 400.0])
+    note_index, gesture_index = match(notes, gestures, window=50.0)
+    assert note_index.tolist() == [0, 1]
+    assert gesture_index.tolist() == [0, 1]
+
+
+def test_closest_note_wins_a_conflict():
+    # Both notes want gesture 0; the loser has nothing else in the window
+    note_index, gesture_index = match(np.array([0.0, 30.0]), np.array([20.0]), window=50.0)
+    assert note_index.tolist() == [1]
+    assert gesture_index.tolist() == [0]
+
+
+def test_loser_of_a_conflict_takes_its_next_gesture():
+    note_index, gesture_index = match(np.array([0.0, 30.0]), np.array([-40.0, 20.0]), window=50.0)
+    assert note_index.tolist() == [0, 1]
+    assert gesture_index.tolist() == [0, 1]
+
+
+def test_empty_inputs():
+    for notes, gestures in ((np.empty(0), np.array([1.0])), (np.array([1.0]), np.empty(0))):
+        note_index, gesture_index = match(notes, gestures)
+        assert len(note_index) == len(gesture_index) == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_match_is_one_to_one_within_window_and_maximal(seed):
+    rng = np.random.default_rng(seed)
+    notes, gestures = _random_run(rng)
+    window = 80.0
+    note_index, gesture_index = match(notes, gestures, window)
+
+    assert len(np.unique(note_index)) == len(note_index)
+    assert len(np.unique(gesture_index)) == len(gesture_index)
+    assert np.all(np.abs(gestures[gesture_index] - notes[note_index]) <= window)
+
+    # No unmatched note and unmatched gesture are left that could still be paired
+    free_notes = np.setdiff1d(np.arange(len(notes)), note_index)
+    free_gestures = np.setdiff1d(np.arange(len(gestures)), gesture_index)
+    if len(free_notes) and len(free_gestures):
+        gaps = np.abs(notes[free_notes][:, None] - gestures[free_gestures][None, :])
+        assert gaps.min() > window
+
+
+def test_score_recovers_latency_and_jitter():
+    rng = np.random.default_rng(0)
+    notes = np.arange(0.0, 120000.0, 400.0)
+    gestures = notes + rng.normal(40.0, 10.0, len(notes))
+    summary = score(notes, gestures).summary()
+    assert summary["hit_rate"] == 1.0
+    assert summary["latency_ms"] == pytest.approx(40.0, abs=2.0)
+    assert summary["jitter_ms"] == pytest.approx(10.0, abs=2.0)
+
+
+def test_scores_thousands_of_runs_quickly():
+    rng = np.random.default_rng(1)
+    runs = [_random_run(rng, notes=1000) for _ in range(2000)]
+    start = time.perf_counter()
+    for notes, gestures in runs:
+        score(notes, gestures)
+    # About 1 s on one core; the bound only catches a fall back to per-note Python loops
+    assert time.perf_counter() - start < 20.0
+
+
+def test_event_log_round_trip(tmp_path):
+    path = tmp_path / "run.jsonl"
+    for _ in range(2):  # a second run replaces the first
+        guitar = GestureEventLog(path, source="guitar")
+        drums = GestureEventLog(path, source="drums")
+        guitar.frame(1000.0)
+        drums.frame(1000.0)
+        guitar.publish("strum", 1000.5, action="press", key="space")
+        guitar.publish("strum", 1000.6, action="release", key="space")
+        drums.publish("drum", 1000.7, action="hit", key="l", hitTime=1000690.0)
+        guitar.close()
+        drums.close()
+    assert read_run(path).times.tolist() == pytest.approx([500.0, 690.0])
+    assert read_run(path, source="drums").times.tolist() == pytest.approx([690.0])
+
+
+def test_read_run_rejects_merged_runs(tmp_path):
+    path = tmp_path / "merged.jsonl"
+    lines = [{"source": "guitar", "start": 0.0}, {"source": "guitar", "start": 5000.0}]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    with pytest.raises(ValueError, match="more than one run"):
+        read_run(path)
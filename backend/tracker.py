@@ -0,0 +1,215 @@
+#Unified gesture tracker: one camera and one set of models shared by every instrument
+
+import cv2
+import time
+try:
+    from pynput import keyboard
+except ImportError:  # no display, e.g. a headless box that only sends gesture events
+    keyboard = None
+import argparse
+
+from tracking.autotune import autotune, sample_frames
+from tracking.engine import (RECOGNIZERS, GestureOutput, TrackerEngine, load_plugins,
+                             required_factories)
+from tracking import metrics
+from tracking.events import GestureEventLog, GestureEventPublisher
+from tracking.landmarks import LandmarkRecorder
+from tracking.multicam import MultiCameraEngine, SyncedCameras
+from tracking.metrics import METRICS, MetricsExporters
+from tracking.parallel import ParallelModels, SerialModels
+from tracking.pipeline import StageStats, run_pipelined, run_serial
+from tracking.roi import RoiModels
+from tracking.service import TrackerService
+from tracking.sources import open_source
+
+WINDOW_NAME = "Gesture Tracker"
+
+# Created in main()
+engine = None
+event_logs = []  # GestureEventLogs of --record-events, one per instrument
+stats = StageStats(metrics=METRICS)
+
+
+def track_frame(frame, capture_time=None):
+    if capture_time is None:
+        capture_time = time.time()
+    for event_log in event_logs:
+        event_log.frame(capture_time)
+    return engine.track_frame(frame, capture_time)
+
+
+def draw_frame(frame, observation):
+    return engine.draw_frame(frame, observation)
+
+
+def main():
+    global engine, stats, event_logs
+
+    parser = argparse.ArgumentParser(description="Unified guitar/drums gesture tracker")
+    parser.add_argument("--instruments", default="guitar,drums",
+                        help="comma-separated recognizers to run on the shared models")
+    parser.add_argument("--plugin", action="append", default=[], metavar="MODULE",
+                        help="import MODULE to register extra recognizers (repeatable)")
+    parser.add_argument("--no-mirror", dest="mirror", action="store_false",
+                        help="use the camera image as is instead of mirroring it")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture, inference and render on separate threads")
+    parser.add_argument("--parallel-models", action="store_true",
+                        help="run the shared models concurrently, one worker each")
+    parser.add_argument("--service", action="store_true",
+                        help="run capture, each model and rendering in separate processes "
+                             "sharing frames through shared memory")
+    parser.add_argument("--roi", action="store_true",
+                        help="run hands and pose on a padded crop around the player")
+    parser.add_argument("--autotune", action="store_true",
+                        help="pick the most accurate model variants that reach --target-fps "
+                             "on this machine (cached after the first run)")
+    parser.add_argument("--target-fps", type=float, default=30.0,
+                        help="frame rate --autotune aims for")
+    parser.add_argument("--retune", action="store_true",
+                        help="ignore the cached --autotune result and measure again")
+    parser.add_argument("--output", choices=("keys", "socket", "both", "none"), default="keys",
+                        help="press keys, send gesture events over Socket.IO, both, or neither")
+    parser.add_argument("--server", default="http://localhost:3001",
+                        help="backend URL for --output socket/both")
+    parser.add_argument("--source", default="0",
+                        help="camera index, recorded video file or .npy frame dump")
+    parser.add_argument("--cameras", metavar="SOURCES",
+                        help="comma-separated sources (camera indexes or recordings) to track "
+                             "together and fuse; the first one is the primary view")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="replay recordings as fast as possible instead of at their frame rate")
+    parser.add_argument("--headless", action="store_true",
+                        help="track without drawing or opening a window")
+    parser.add_argument("--display-fps", "--render-fps", type=float, default=30.0,
+                        help="redraw the preview window at most this often; tracking and "
+                             "key events never wait for it")
+    parser.add_argument("--record-landmarks", metavar="DIR",
+                        help="record per-frame landmarks to DIR (a .lmk session) for "
+                             "python -m tracking.tune_gestures")
+    parser.add_argument("--record-events", metavar="PATH",
+                        help="write every gesture event of this run to PATH (JSON lines) for "
+                             "python -m charts.judge")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="write every per-stage timing sample to PATH on exit")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    cameras = [spec.strip() for spec in (args.cameras or "").split(",") if spec.strip()]
+    if cameras and (args.roi or args.parallel_models):
+        parser.error("--cameras runs one worker process per camera; drop --roi/--parallel-models")
+    if args.service and (cameras or args.roi or args.parallel_models or args.pipelined):
+        parser.error("--service runs every model in its own process; "
+                     "drop --cameras/--roi/--parallel-models/--pipelined")
+    if args.service and args.record_events:
+        parser.error("--record-events needs the in-process tracker; drop --service")
+
+    load_plugins(args.plugin)
+    instruments = [name.strip() for name in args.instruments.split(",") if name.strip()]
+    for instrument in instruments:
+        if instrument not in RECOGNIZERS:
+            parser.error(f"unknown instrument {instrument!r} (known: {', '.join(RECOGNIZERS)})")
+
+    keyboard_controller = None
+    if args.output in ("keys", "both"):
+        if keyboard is None:
+            parser.error("pynput is unavailable here; use --output socket")
+        keyboard_controller = keyboard.Controller()
+
+    if args.stats_json:
+        stats = StageStats(window=None, metrics=METRICS)
+
+    recognizers = []
+    for instrument in instruments:
+        publisher = None
+        if args.output in ("socket", "both"):
+            publisher = GestureEventPublisher(args.server, source=instrument)
+        if args.record_events:
+            publisher = GestureEventLog(args.record_events, source=instrument, forward=publisher)
+            event_logs.append(publisher)
+        output = GestureOutput(keyboard_controller, publisher, stats, label=instrument)
+        recognizers.append(RECOGNIZERS[instrument](output, mirrored=args.mirror))
+
+    model_options = None
+    parallel = args.parallel_models
+    if args.autotune:
+        tuning = autotune(required_factories(recognizers),
+                          sample_frames(cameras[0] if cameras else args.source),
+                          target_fps=args.target_fps, retune=args.retune)
+        print(f"[autotune] using {tuning.describe()}")
+        model_options = tuning.options
+        parallel = parallel or tuning.parallel
+
+    runner_class = ParallelModels if parallel else SerialModels
+    runner_factory = lambda factories: runner_class(factories, stats=stats)
+    wrap_runner = None
+    if args.roi:
+        wrap_runner = lambda runner: RoiModels(runner, roi_names=("hands", "pose"))
+    recorder = None
+    if args.record_landmarks:
+        recorder = LandmarkRecorder(args.record_landmarks, mirrored=args.mirror,
+                                    tracker="+".join(instruments))
+    if args.service:
+        service = TrackerService(recognizers, args.source, mirror=args.mirror,
+                                 model_options=model_options, stats=stats, recorder=recorder,
+                                 realtime=not args.unthrottled, lockstep=args.unthrottled,
+                                 show=not args.headless, render_fps=args.display_fps,
+                                 window_name=WINDOW_NAME)
+        print(f"Tracking {', '.join(instruments)} with model processes: "
+              f"{', '.join(service.names)}")
+        run_service(service, args, instruments)
+        return
+    if cameras:
+        engine = MultiCameraEngine(recognizers, len(cameras), mirror=args.mirror,
+                                   model_options=model_options, stats=stats, recorder=recorder)
+    else:
+        engine = TrackerEngine(recognizers, runner_factory, wrap_runner, mirror=args.mirror,
+                               model_options=model_options, stats=stats, recorder=recorder)
+    print(f"Tracking {', '.join(instruments)} with models: {', '.join(engine.models.names)}")
+
+    exporters = MetricsExporters(args, tracker="+".join(instruments))
+    if cameras:
+        # Recordings replayed unthrottled advance together frame by frame
+        cap = SyncedCameras([open_source(spec, realtime=not args.unthrottled) for spec in cameras],
+                            lockstep=args.unthrottled, stats=stats)
+    else:
+        cap = open_source(args.source, realtime=not args.unthrottled)
+    show = not args.headless
+    start = time.perf_counter()
+    try:
+        if args.pipelined:
+            run_pipelined(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                          display_fps=args.display_fps)
+        else:
+            run_serial(cap, track_frame, draw_frame, WINDOW_NAME, stats=stats, show=show,
+                       display_fps=args.display_fps)
+    finally:
+        elapsed = time.perf_counter() - start
+        cap.release()
+        engine.close()
+        exporters.close()
+        if show:
+            cv2.destroyAllWindows()
+        if args.stats_json:
+            stats.dump(args.stats_json, tracker="+".join(instruments),
+                       source=args.cameras or args.source,
+                       seconds=elapsed)
+
+
+def run_service(service, args, instruments):
+    exporters = MetricsExporters(args, tracker="+".join(instruments))
+    METRICS.counter_func("dropped_frames_total", lambda: service.dropped, queue="ring")
+    start = time.perf_counter()
+    try:
+        service.run()
+    finally:
+        elapsed = time.perf_counter() - start
+        service.close()
+        exporters.close()
+        if args.stats_json:
+            stats.dump(args.stats_json, tracker="+".join(instruments), source=args.source,
+                       seconds=elapsed)
+
+
+if __name__ == "__main__":
+    main()
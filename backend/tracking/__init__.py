@@ -0,0 +1 @@
+"""Shared building blocks for the OpenCV/MediaPipe gesture trackers"""
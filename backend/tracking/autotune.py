@@ -0,0 +1,214 @@
+"""Pick the most accurate model variants that still run at the target frame rate
+
+At startup the tuner times every variant of every model the tracker uses on a few
+frames from its own source, predicts the frame time of each combination, serial and
+in parallel, and keeps the most accurate one that fits in the frame budget after a
+short confirmation run. The choice is cached per machine, so later starts are instant:
+
+    ~/.cache/giutasr/autotune.json
+
+The legacy MediaPipe solutions run on TFLite's XNNPACK CPU delegate with their own
+thread pools and expose neither thread counts nor quantized graphs. The knobs tuned
+here are therefore the model variants (pose/hands complexity, segmentation model)
+and whether the models run serially or one worker each (tracking.parallel).
+"""
+
+import functools
+import itertools
+import json
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass
+
+import cv2
+import mediapipe as mp
+
+from tracking.parallel import ParallelModels, SerialModels
+from tracking.sources import open_source
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "giutasr", "autotune.json")
+
+# Options for each model, least to most accurate
+VARIANTS = {
+    "pose": [{"model_complexity": 0}, {"model_complexity": 1}, {"model_complexity": 2}],
+    "hands": [{"model_complexity": 0}, {"model_complexity": 1}],
+    # model_selection=1 is the lighter landscape model, 0 the general one
+    "segmentation": [{"model_selection": 1}, {"model_selection": 0}],
+}
+
+# Parallel workers cost some dispatch overhead on top of the slowest model
+PARALLEL_OVERHEAD = 1.15
+
+
+@dataclass
+class Tuning:
+    options: dict  # model name -> keyword arguments for its factory
+    parallel: bool  # run the models with ParallelModels
+    frame_time: float  # measured seconds of inference per frame
+    target_fps: float
+    cached: bool = False
+
+    def describe(self):
+        models = ", ".join(
+            f"{name}({', '.join(f'{k}={v}' for k, v in options.items())})"
+            for name, options in self.options.items()
+        )
+        runner = "parallel" if self.parallel else "serial"
+        return (f"{models}, {runner}: {1.0 / self.frame_time:.1f} fps "
+                f"(target {self.target_fps:g}{', cached' if self.cached else ''})")
+
+
+def configure(factories, options):
+    """Bind tuned options to the factories they belong to"""
+    return {
+        name: functools.partial(factory, **options.get(name, {}))
+        for name, factory in factories.items()
+    }
+
+
+def machine_key():
+    """Identifies the host and the MediaPipe build, so a fleet can share one cache file"""
+    return "|".join([
+        platform.node(), platform.machine(), platform.processor() or "?",
+        f"{os.cpu_count()}cpu", f"mediapipe-{mp.__version__}",
+    ])
+
+
+def sample_frames(spec, count=20):
+    """Read a few RGB frames from a source for timing (reopened, so playback is unaffected)"""
+    cap = open_source(spec, realtime=False)
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        cap.release()
+    if not frames:
+        raise RuntimeError(f"could not read any frames from {spec!r} to tune on")
+    return frames
+
+
+def _time_runner(runner, frames, budget, warmup=2):
+    """Mean seconds per frame of runner.process over the frames, within budget seconds"""
+    for frame in frames[:warmup]:
+        runner.process(frame)
+    count = 0
+    start = time.perf_counter()
+    for frame in itertools.cycle(frames):
+        runner.process(frame)
+        count += 1
+        if time.perf_counter() - start >= budget:
+            break
+    return (time.perf_counter() - start) / count
+
+
+class _Single:
+    """Adapts one MediaPipe solution to the runner interface for timing"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def process(self, rgb_frame):
+        return self.model.process(rgb_frame)
+
+
+def _time_variant(factory, options, frames, budget, log=print):
+    """Seconds per frame of one variant, or None if it cannot be built here"""
+    try:
+        model = factory(**options)
+    except Exception as error:
+        # e.g. the lite/heavy pose graphs are downloaded on first use
+        log(f"[autotune] skipping {options}: {error}")
+        return None
+    try:
+        return _time_runner(_Single(model), frames, budget)
+    finally:
+        model.close()
+
+
+def _candidates(timings, names):
+    """Every combination of variants with its predicted frame time, best first"""
+    can_parallel = len(names) > 1 and (os.cpu_count() or 1) > 1
+    candidates = []
+    usable = [[i for i, t in enumerate(timings[name]) if t is not None] for name in names]
+    for choice in itertools.product(*usable):
+        times = [timings[name][index] for name, index in zip(names, choice)]
+        options = {name: VARIANTS[name][index] for name, index in zip(names, choice)}
+        accuracy = sum(choice)
+        candidates.append((accuracy, sum(times), False, options))
+        if can_parallel:
+            candidates.append((accuracy, max(times) * PARALLEL_OVERHEAD, True, options))
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+    return candidates
+
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def autotune(factories, frames, target_fps=30.0, seconds=6.0, headroom=0.8,
+             cache_path=DEFAULT_CACHE, retune=False, log=print):
+    """Choose options for each factory and a runner that sustain target_fps
+
+    factories maps a model name ("pose", "hands", "segmentation") to a callable taking
+    that model's options as keyword arguments. headroom is the share of the frame
+    budget inference may use; the rest is left for capture, gestures and drawing.
+    """
+    names = [name for name in factories if name in VARIANTS]
+    h, w = frames[0].shape[:2]
+    key = f"{machine_key()}|{','.join(sorted(names))}|{w}x{h}|{target_fps:g}"
+
+    cache = _load_cache(cache_path)
+    if not retune and key in cache:
+        return Tuning(**{**cache[key], "cached": True})
+
+    budget = headroom / target_fps
+    per_variant = seconds / sum(len(VARIANTS[name]) for name in names)
+    timings = {}
+    for name in names:
+        timings[name] = [
+            _time_variant(factories[name], options, frames, per_variant, log)
+            for options in VARIANTS[name]
+        ]
+        log(f"[autotune] {name}: " + ", ".join(
+            f"{options} {t * 1000:.1f} ms" for options, t in zip(VARIANTS[name], timings[name])
+            if t is not None
+        ))
+
+    for name in names:
+        if all(t is None for t in timings[name]):
+            raise RuntimeError(f"autotune: no {name} variant could be built here "
+                               f"(tried {VARIANTS[name]}); run without --autotune")
+    candidates = _candidates(timings, names)
+    fitting = [candidate for candidate in candidates if candidate[1] <= budget]
+    fastest = min(candidates, key=lambda candidate: candidate[1])
+    tuning = None
+    # Predictions ignore contention between models, so confirm the best few for real
+    tries = fitting[:3]
+    if fastest not in tries:
+        tries.append(fastest)
+    for accuracy, predicted, parallel, options in tries:
+        runner_class = ParallelModels if parallel else SerialModels
+        runner = runner_class(configure(factories, options))
+        try:
+            frame_time = _time_runner(runner, frames, max(per_variant, 1.0))
+        finally:
+            runner.close()
+        tuning = Tuning(options, parallel, frame_time, target_fps)
+        log(f"[autotune] tried {tuning.describe()}")
+        if frame_time <= budget:
+            break
+
+    cache[key] = {k: v for k, v in asdict(tuning).items() if k != "cached"}
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    return tuning
@@ -0,0 +1,117 @@
+"""End-to-end latency benchmark: replay recorded sessions through the trackers headless
+
+Run from the backend directory (no camera or display needed):
+
+    python -m tracking.bench_latency sessions/ --tracker both --unthrottled
+    python -m tracking.bench_latency strum.mp4 --tracker guitar -- --pipelined --roi
+
+Each (tracker, session) pair runs in a fresh process with --headless --output none,
+so model state never leaks between sessions. Arguments after "--" go to the tracker.
+The report gives per-stage p50/p95/p99 timings, throughput, and the frame-to-gesture
+time (camera read to key/event emission) pooled over all sessions.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from tracking.pipeline import percentiles
+from tracking.sources import find_sessions
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACKER_SCRIPTS = {
+    "guitar": os.path.join(BACKEND_DIR, "GuitarSuperPower.py"),
+    "drums": os.path.join(BACKEND_DIR, "drums.py"),
+    "unified": os.path.join(BACKEND_DIR, "tracker.py"),
+}
+
+
+def run_session(tracker, session, unthrottled, tracker_args):
+    """Run one tracker over one recording and return its stats JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, "stats.json")
+        command = [
+            sys.executable, TRACKER_SCRIPTS[tracker],
+            "--source", session, "--headless", "--output", "none",
+            "--stats-json", stats_path, *tracker_args,
+        ]
+        if unthrottled:
+            command.append("--unthrottled")
+        process = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            # Pass on the tracker's own traceback, not just the exit status
+            raise RuntimeError(f"{tracker} tracker failed on {session} "
+                               f"(exit status {process.returncode}):\n{process.stderr.strip()}")
+        with open(stats_path) as f:
+            return json.load(f)
+
+
+def summarize(runs):
+    """Pool the samples of several runs into per-stage percentiles and throughput"""
+    pooled = {}
+    frames = 0
+    seconds = 0.0
+    for run in runs:
+        for stage, samples in run["stages"].items():
+            pooled.setdefault(stage, []).extend(samples)
+        frames += len(run["stages"].get("inference", []))
+        seconds += run["seconds"]
+    return {
+        "sessions": len(runs),
+        "frames": frames,
+        "fps": frames / seconds if seconds else 0.0,
+        "stages": {stage: percentiles(samples) for stage, samples in pooled.items()},
+    }
+
+
+def print_report(tracker, summary):
+    print(f"\n{tracker}: {summary['sessions']} sessions, {summary['frames']} frames, "
+          f"{summary['fps']:.1f} frames/s")
+    print(f"  {'stage':18}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for stage, report in summary["stages"].items():
+        if not report["count"]:
+            continue
+        print(f"  {stage:18}{report['count']:>8}{report['mean']:>9.2f}{report['p50']:>9.2f}"
+              f"{report['p95']:>9.2f}{report['p99']:>9.2f}")
+
+
+def main():
+    argv = sys.argv[1:]
+    tracker_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, tracker_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="+", help="recordings or directories of recordings")
+    parser.add_argument("--tracker", choices=("guitar", "drums", "unified", "both"), default="both")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="replay as fast as possible instead of at the recorded frame rate")
+    parser.add_argument("--json", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    sessions = find_sessions(args.sessions)
+    if not sessions:
+        parser.error("no recorded sessions found")
+    trackers = ("guitar", "drums") if args.tracker == "both" else (args.tracker,)
+
+    summaries = {}
+    for tracker in trackers:
+        runs = []
+        for session in sessions:
+            print(f"{tracker}: {session}", file=sys.stderr)
+            runs.append(run_session(tracker, session, args.unthrottled, tracker_args))
+        summaries[tracker] = summarize(runs)
+        print_report(tracker, summaries[tracker])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
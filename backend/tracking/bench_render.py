@@ -0,0 +1,141 @@
+"""Benchmark the render path: allocations and GC pauses per frame, before and after
+
+Run from the backend directory:
+
+    python -m tracking.bench_render --frames 500
+
+Both variants draw the same synthetic drum/guitar overlay (skeleton, motion trail and hit
+flash) without any camera or MediaPipe models. "legacy" reproduces the old per-frame
+np.zeros_like / np.full_like / .copy() code; "buffered" uses tracking.render. Neither
+draws the per-hand hull masks the trackers used to fill and never read, so the
+comparison measures only the buffer reuse.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from tracking.render import FrameBuffers, blend_trail, flash_white
+
+SKELETON = [(0, 1), (0, 2), (2, 4), (1, 3), (3, 5), (0, 6), (1, 7), (6, 7)]
+
+
+class GcPauses:
+    """Collects the duration of every garbage collection while installed"""
+
+    def __init__(self):
+        self.pauses = []
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.pauses.append(time.perf_counter() - self._start)
+            self._start = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def synthetic_scene(rng, w, h):
+    joints = rng.uniform((0.2 * w, 0.2 * h), (0.8 * w, 0.8 * h), size=(8, 2)).astype(np.int32)
+    return joints
+
+
+def render_legacy(frame, joints, state, flash_alpha):
+    output_frame = np.zeros_like(frame)
+    for a, b in SKELETON:
+        cv2.line(output_frame, tuple(joints[a]), tuple(joints[b]), (0, 255, 255), 6)
+    if state.get("prev") is not None:
+        output_frame = cv2.addWeighted(output_frame, 0.7, state["prev"], 0.3, 0)
+    state["prev"] = output_frame.copy()
+    if flash_alpha > 0:
+        white_overlay = np.full_like(output_frame, 255)
+        output_frame = cv2.addWeighted(white_overlay, flash_alpha, output_frame, 1 - flash_alpha, 0)
+    return output_frame
+
+
+def render_buffered(frame, joints, state, flash_alpha):
+    buffers = state.setdefault("buffers", FrameBuffers())
+    output_frame = buffers.zeros("output", frame.shape)
+    for a, b in SKELETON:
+        cv2.line(output_frame, tuple(joints[a]), tuple(joints[b]), (0, 255, 255), 6)
+    if state.get("prev") is not None:
+        blend_trail(output_frame, state["prev"], keep=0.7)
+    else:
+        state["prev"] = buffers.get("trail", output_frame.shape)
+        np.copyto(state["prev"], output_frame)
+    if flash_alpha > 0:
+        flash_white(output_frame, flash_alpha)
+    return output_frame
+
+
+def run(render, frames, w, h, warmup=20):
+    rng = np.random.default_rng(0)
+    scenes = [synthetic_scene(rng, w, h) for _ in range(64)]
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    state = {}
+
+    for i in range(warmup):
+        joints = scenes[i % len(scenes)]
+        render(frame, joints, state, 0.5)
+
+    transient = []
+    tracemalloc.start()
+    with GcPauses() as gc_pauses:
+        start = time.perf_counter()
+        for i in range(frames):
+            joints = scenes[i % len(scenes)]
+            flash_alpha = 0.5 if i % 10 == 0 else 0.0
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            render(frame, joints, state, flash_alpha)
+            _, peak = tracemalloc.get_traced_memory()
+            transient.append(peak - before)
+        elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    transient = np.array(transient, dtype=np.float64)
+    pauses = np.array(gc_pauses.pauses or [0.0]) * 1000.0
+    return {
+        "ms/frame": elapsed / frames * 1000.0,
+        "alloc KiB/frame": transient.mean() / 1024.0,
+        "frames allocating": int(np.count_nonzero(transient > 4096)),
+        "gc runs": len(gc_pauses.pauses),
+        "gc max ms": float(pauses.max()),
+        "gc total ms": float(pauses.sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    results = {
+        "legacy": run(render_legacy, args.frames, args.width, args.height),
+        "buffered": run(render_buffered, args.frames, args.width, args.height),
+    }
+    columns = list(results["legacy"])
+    print(f"{'':10}" + "".join(f"{column:>20}" for column in columns))
+    for name, row in results.items():
+        cells = (
+            f"{row[column]:>20.2f}" if isinstance(row[column], float) else f"{row[column]:>20}"
+            for column in columns
+        )
+        print(f"{name:10}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
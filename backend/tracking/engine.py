@@ -0,0 +1,332 @@
+"""One camera, one set of models, any number of instrument recognizers
+
+The engine captures once and runs each MediaPipe model at most once per frame. It then
+hands the shared result to every recognizer as an Observation. Recognizers are plugins:
+subclass Recognizer, declare the models you need, and decorate the class with
+@register_recognizer. Adding an instrument then costs no extra inference:
+
+    from tracking.engine import Recognizer, register_recognizer
+
+    @register_recognizer
+    class CowbellRecognizer(Recognizer):
+        name = "cowbell"
+        models = ("pose",)
+
+        def update(self, observation):
+            if observation.pose_landmarks and ...:
+                self.emit("cowbell", "hit", "c", observation.capture_time)
+
+Load a plugin module with `python tracker.py --plugin my_plugins.cowbell
+--instruments guitar,cowbell`.
+"""
+
+import importlib
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import mediapipe as mp
+
+from tracking.autotune import configure
+from tracking.filters import OneEuroFilter
+from tracking.gestures import DrumGesture, StrumGesture
+from tracking.metrics import METRICS
+from tracking.ownership import PlayerOwnership, largest_component
+from tracking.render import FrameBuffers
+
+mp_selfie_segmentation = mp.solutions.selfie_segmentation
+mp_hands = mp.solutions.hands
+mp_pose = mp.solutions.pose
+
+
+def make_segmentation(model_selection=1):
+    return mp_selfie_segmentation.SelfieSegmentation(model_selection=model_selection)
+
+
+def make_hands(model_complexity=0):
+    return mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.3,
+        model_complexity=model_complexity,
+    )
+
+
+def make_pose(model_complexity=1):
+    return mp_pose.Pose(
+        static_image_mode=False,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.3,
+        model_complexity=model_complexity,
+    )
+
+
+MODEL_FACTORIES = {
+    "segmentation": make_segmentation,
+    "hands": make_hands,
+    "pose": make_pose,
+}
+
+
+@dataclass
+class Observation:
+    """One frame's shared model output, handed to every recognizer"""
+    capture_time: float  # time.time() when the frame was read
+    width: int
+    height: int
+    pose_landmarks: object = None
+    hands: list = field(default_factory=list)  # hands owned by the tracked player
+    body_mask: object = None  # largest person component, when segmentation ran
+
+
+class GestureOutput:
+    """Delivers a recognizer's events as key presses and/or Socket.IO gesture events
+
+    fields are added to every published event, e.g. player=1 in band.py; label, when
+    set, prints each event to the console.
+    """
+
+    def __init__(self, keyboard_controller=None, publisher=None, stats=None, label=None,
+                 **fields):
+        self.keyboard_controller = keyboard_controller
+        self.publisher = publisher
+        self.stats = stats
+        self.label = label
+        self.fields = fields
+
+    def emit(self, gesture, action, key, capture_time, **fields):
+        """action is "press", "release" or "hit" (a press immediately followed by a release)"""
+        if self.keyboard_controller is not None:
+            from pynput.keyboard import Key
+            pynput_key = Key.space if key == "space" else key
+            injected = time.perf_counter()
+            if action in ("press", "hit"):
+                self.keyboard_controller.press(pynput_key)
+            if action in ("release", "hit"):
+                self.keyboard_controller.release(pynput_key)
+            if self.stats is not None:
+                self.stats.add("key_injection", time.perf_counter() - injected)
+        METRICS.inc("gesture_events_total", gesture=gesture, action=action)
+        if self.publisher is not None:
+            self.publisher.publish(gesture, capture_time, action=action, key=key,
+                                   **self.fields, **fields)
+        if self.stats is not None and capture_time is not None:
+            self.stats.add("frame_to_gesture", time.time() - capture_time)
+        if self.label is not None:
+            print(f"{self.label} {gesture} {action} ({key})")
+
+    def close(self):
+        if self.publisher is not None:
+            self.publisher.close()
+
+
+class Recognizer:
+    """Base class for instrument plugins
+
+    name identifies the instrument on the command line and as the Socket.IO source.
+    models lists the shared models it reads ("segmentation", "hands", "pose").
+    mirrored tells it whether frames are flipped, so left and right can be named from
+    the player's point of view.
+    """
+
+    name = ""
+    models = ()
+
+    def __init__(self, output, mirrored=True):
+        self.output = output
+        self.mirrored = mirrored
+
+    def emit(self, gesture, action, key, capture_time, **fields):
+        self.output.emit(gesture, action, key, capture_time, **fields)
+
+    def update(self, observation):
+        """Advance the gesture state for one frame and emit any events"""
+        raise NotImplementedError
+
+    def status(self):
+        """One line of text for the preview window"""
+        return self.name
+
+    def draw(self, output_frame, observation):
+        """Optional instrument-specific overlay"""
+
+    def close(self):
+        """Release anything still held down"""
+
+
+RECOGNIZERS = {}
+
+
+def register_recognizer(cls):
+    """Class decorator that makes a Recognizer available by its name"""
+    RECOGNIZERS[cls.name] = cls
+    return cls
+
+
+def load_plugins(module_names):
+    """Import plugin modules so their @register_recognizer classes are registered"""
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+
+@register_recognizer
+class StrumRecognizer(Recognizer):
+    """Guitar: enough fingertips above the shoulders holds the spacebar"""
+
+    name = "guitar"
+    models = ("segmentation", "hands", "pose")
+
+    def __init__(self, output, mirrored=True, min_fingers=4, cooldown=0.1):
+        super().__init__(output, mirrored)
+        self.gesture = StrumGesture(min_fingers=min_fingers, cooldown=cooldown)
+
+    def update(self, observation):
+        action = self.gesture.update(observation.hands, observation.pose_landmarks, time.time())
+        if action is not None:
+            self.emit("strum", action, "space", observation.capture_time)
+
+    def status(self):
+        state = "STRUM" if self.gesture.active else "-"
+        return f"guitar: {state} ({self.gesture.fingers} fingers above shoulders)"
+
+    def draw(self, output_frame, observation):
+        finger_colors = [(0, 255, 0), (255, 0, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)]
+        for hand_landmarks in observation.hands:
+            for color, tip_idx in zip(finger_colors, (4, 8, 12, 16, 20)):
+                landmark = hand_landmarks.landmark[tip_idx]
+                center = (int(landmark.x * observation.width), int(landmark.y * observation.height))
+                cv2.circle(output_frame, center, 4, color, -1)
+
+    def close(self):
+        if self.gesture.pressed:
+            self.gesture.pressed = False
+            self.emit("strum", "release", "space", None)
+
+
+@register_recognizer
+class DrumRecognizer(Recognizer):
+    """Drums: a wrist dropping below its shoulder taps 'l' (right stick) or 'a' (left stick)"""
+
+    name = "drums"
+    models = ("pose",)
+    keys = {"right": "l", "left": "a"}
+
+    def __init__(self, output, mirrored=True, hit_threshold=40, reset_threshold=20,
+                 lead_time=0.025):
+        super().__init__(output, mirrored)
+        self.gesture = DrumGesture(hit_threshold, reset_threshold, mirrored=mirrored,
+                                   smoother=OneEuroFilter(), lead_time=lead_time)
+
+    def update(self, observation):
+        hits = self.gesture.update(observation.pose_landmarks, observation.height,
+                                   observation.capture_time)
+        for hit in hits:
+            self.emit("drum", "hit", self.keys[hit.hand], observation.capture_time,
+                      hand=hit.hand, hitTime=hit.time * 1000.0, predicted=hit.predicted)
+
+    def status(self):
+        return f"drums: L:{self.gesture.rel_left:.1f} R:{self.gesture.rel_right:.1f}"
+
+
+SKELETON_CONNECTIONS = [
+    (11, 12), (11, 13), (13, 15), (12, 14), (14, 16),
+    (11, 23), (12, 24), (23, 24), (23, 25), (25, 27), (24, 26), (26, 28),
+]
+
+
+def required_factories(recognizers):
+    """Factories of the shared models the recognizers need, each built once"""
+    needed = {model for recognizer in recognizers for model in recognizer.models}
+    # Ownership of hands needs the body mask
+    if "hands" in needed:
+        needed.add("segmentation")
+    return {name: factory for name, factory in MODEL_FACTORIES.items() if name in needed}
+
+
+class TrackerEngine:
+    """Runs the shared models once per frame and feeds every recognizer
+
+    runner_factory builds the model runner (SerialModels, ParallelModels, ...) from the
+    factories of the models the recognizers need; wrap_runner may add ROI cropping or
+    scheduling on top. model_options are per-model factory options, e.g. from
+    tracking.autotune. With mirror=True frames are flipped first, like drums.py. A
+    tracking.landmarks.LandmarkRecorder saves every Observation for offline tuning.
+    """
+
+    def __init__(self, recognizers, runner_factory, wrap_runner=None, mirror=True,
+                 model_options=None, stats=None, recorder=None):
+        self.recognizers = recognizers
+        self.mirror = mirror
+        self.stats = stats
+        self.recorder = recorder
+        factories = required_factories(recognizers)
+        if model_options:
+            factories = configure(factories, model_options)
+        self.models = runner_factory(factories)
+        if wrap_runner is not None:
+            self.models = wrap_runner(self.models)
+        self.track_buffers = FrameBuffers()
+        self.render_buffers = FrameBuffers()
+
+    def track_frame(self, frame, capture_time=None):
+        """Run each model once and update every recognizer; returns the Observation"""
+        if capture_time is None:
+            capture_time = time.time()
+        observation = self.observe(frame, capture_time)
+        if self.recorder is not None:
+            self.recorder.append(capture_time, (observation.height, observation.width),
+                                 observation.pose_landmarks, observation.hands,
+                                 observation.body_mask)
+        for recognizer in self.recognizers:
+            recognizer.update(observation)
+        return observation
+
+    def observe(self, frame, capture_time):
+        """Run the shared models on one frame and build its Observation"""
+        if self.mirror:
+            frame = cv2.flip(frame, 1, dst=self.track_buffers.get("flipped", frame.shape))
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB,
+                                 dst=self.track_buffers.get("rgb", frame.shape))
+        results = self.models.process(rgb_frame)
+
+        h, w = frame.shape[:2]
+        observation = Observation(capture_time=capture_time, width=w, height=h)
+        masks_start = time.perf_counter()
+        if "pose" in results:
+            observation.pose_landmarks = results["pose"].pose_landmarks
+        if "segmentation" in results:
+            observation.body_mask = largest_component(
+                results["segmentation"].segmentation_mask > 0.5
+            )
+        if "hands" in results:
+            ownership = PlayerOwnership(observation.body_mask, buffer_size=50)
+            observation.hands = ownership.owned_hands(results["hands"].multi_hand_landmarks, w, h)
+        if self.stats is not None:
+            self.stats.add("masks", time.perf_counter() - masks_start)
+        return observation
+
+    def draw_frame(self, frame, observation):
+        """Skeleton, recognizer overlays and one status line per recognizer"""
+        output_frame = self.render_buffers.zeros("output", frame.shape)
+        w, h = observation.width, observation.height
+
+        if observation.pose_landmarks:
+            lm = observation.pose_landmarks.landmark
+            for a, b in SKELETON_CONNECTIONS:
+                cv2.line(output_frame, (int(lm[a].x * w), int(lm[a].y * h)),
+                         (int(lm[b].x * w), int(lm[b].y * h)), (0, 255, 255), 6)
+
+        for row, recognizer in enumerate(self.recognizers):
+            recognizer.draw(output_frame, observation)
+            cv2.putText(output_frame, recognizer.status(), (10, 30 + 30 * row),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        return output_frame
+
+    def close(self):
+        for recognizer in self.recognizers:
+            recognizer.close()
+            recognizer.output.close()
+        self.models.close()
+        if self.recorder is not None:
+            self.recorder.close()
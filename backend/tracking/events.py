@@ -0,0 +1,212 @@
+"""Publish timestamped gesture events to the backend over Socket.IO
+
+Events go out on the existing `gesture-data` event, which server.js relays to every
+other client as `gesture-update`. Each emit carries a batch:
+
+    {"source": "guitar", "events": [
+        {"seq": 12, "gesture": "strum", "action": "press", "key": "space",
+         "captureTime": 1718000000123.4, "sentTime": 1718000000131.9}, ...]}
+
+captureTime is when the camera frame that produced the event was read and sentTime is
+when it left the tracker, both in Unix epoch milliseconds, so the game can compensate
+for tracking latency. seq increases by one per event; gaps mean events were dropped.
+
+GestureEventLog writes the same events to a JSON-lines file, one event per line after a
+{"source": ..., "start": ms} line holding the capture time of the first tracked frame,
+so a recorded run can be scored against a chart with `python -m charts.judge`.
+"""
+
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+from tracking.metrics import METRICS
+
+
+class GestureEventPublisher:
+    """Persistent Socket.IO connection that sends gesture events from a background thread
+
+    publish() never blocks the tracking loop. Events wait in a bounded queue that drops
+    the oldest entry when full (backpressure when the server is slow or unreachable),
+    and everything queued while the previous emit was in flight goes out as one batch.
+    """
+
+    def __init__(self, url, source, max_queue=256, max_batch=32, reconnect_delay=1.0, client=None):
+        self.url = url
+        self.source = source
+        self.max_batch = max_batch
+        self.reconnect_delay = reconnect_delay
+        self.dropped = 0
+        self.sent = 0
+        self._client = client or _make_client()
+        self._seq = itertools.count(1)
+        self._queue = collections.deque()
+        self._max_queue = max_queue
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="gesture-events", daemon=True)
+        self._thread.start()
+        METRICS.counter_func("gesture_events_dropped_total", lambda: self.dropped, source=source)
+
+    def publish(self, gesture, capture_time=None, **fields):
+        """Queue one event; capture_time is the time.time() the source frame was read"""
+        now = time.time()
+        event = {
+            "seq": next(self._seq),
+            "gesture": gesture,
+            **fields,
+            "captureTime": (capture_time if capture_time is not None else now) * 1000.0,
+        }
+        with self._cond:
+            if len(self._queue) >= self._max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify()
+        return event
+
+    def _connect(self):
+        warned = False
+        while not self._closing:
+            try:
+                self._client.connect(self.url, transports=["websocket"])
+                return True
+            except Exception as error:
+                if not warned:
+                    print(f"Gesture channel: cannot reach {self.url} ({error}), retrying")
+                    warned = True
+                with self._cond:
+                    self._cond.wait(self.reconnect_delay)
+        return False
+
+    def _next_batch(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._closing)
+            batch = []
+            while self._queue and len(batch) < self.max_batch:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _requeue(self, batch):
+        with self._cond:
+            for event in reversed(batch):
+                if len(self._queue) >= self._max_queue:
+                    self.dropped += 1
+                    continue
+                self._queue.appendleft(event)
+
+    def _run(self):
+        if not self._connect():
+            return
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break  # closing and drained
+            sent_time = time.time() * 1000.0
+            for event in batch:
+                event["sentTime"] = sent_time
+            try:
+                self._client.emit("gesture-data", {"source": self.source, "events": batch})
+                self.sent += len(batch)
+            except Exception:
+                # Disconnected: python-socketio reconnects on its own, keep the events
+                self._requeue(batch)
+                with self._cond:
+                    self._cond.wait(self.reconnect_delay)
+                if not self._client.connected and not self._connect():
+                    return
+
+    def close(self, timeout=1.0):
+        """Flush what is queued (up to timeout) and disconnect"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        try:
+            self._client.disconnect()
+        except Exception:
+            pass
+
+
+class GestureEventLog:
+    """Writes gesture events to a JSON-lines file, optionally forwarding them too
+
+    forward is another publisher (a GestureEventPublisher) that still receives every
+    event. Call frame() with each frame's capture time; the first one is written as the
+    run's start, which charts.judge takes as the moment the song started. The file holds
+    one run: it is truncated when the first log on it opens, and further logs on the
+    same path in this process (one per instrument) share the open file.
+    """
+
+    _open_files = {}  # absolute path -> [file, number of logs using it]
+    _files_lock = threading.Lock()
+
+    def __init__(self, path, source, forward=None):
+        self.source = source
+        self.forward = forward
+        self._path = os.path.abspath(path)
+        with GestureEventLog._files_lock:
+            entry = GestureEventLog._open_files.get(self._path)
+            if entry is None:
+                entry = GestureEventLog._open_files[self._path] = [
+                    open(self._path, "w", buffering=1, encoding="utf-8"), 0]
+            entry[1] += 1
+        self._file = entry[0]
+        self._seq = itertools.count(1)
+        self._started = False
+        self._closed = False
+
+    def frame(self, capture_time):
+        if not self._started:
+            self._write({"source": self.source, "start": capture_time * 1000.0})
+
+    def publish(self, gesture, capture_time=None, **fields):
+        if self.forward is not None:
+            event = dict(self.forward.publish(gesture, capture_time, **fields))
+        else:
+            event = {
+                "seq": next(self._seq),
+                "gesture": gesture,
+                **fields,
+                "captureTime": (capture_time if capture_time is not None else time.time()) * 1000.0,
+            }
+        event["source"] = self.source
+        self._write(event)
+        return event
+
+    def _write(self, record):
+        with GestureEventLog._files_lock:
+            if self._closed:
+                return
+            if "start" in record:
+                if self._started:
+                    return
+                self._started = True
+            self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        if self.forward is not None:
+            self.forward.close()
+        with GestureEventLog._files_lock:
+            if self._closed:
+                return
+            self._closed = True
+            entry = GestureEventLog._open_files[self._path]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del GestureEventLog._open_files[self._path]
+                entry[0].close()
+
+
+def _make_client():
+    try:
+        import socketio
+    except ImportError as error:
+        raise ImportError(
+            "Sending gestures over Socket.IO needs python-socketio: "
+            "pip install \"python-socketio[client]\""
+        ) from error
+    return socketio.Client(reconnection=True)
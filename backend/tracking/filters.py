@@ -0,0 +1,60 @@
+"""Landmark smoothing with velocity estimates
+
+OneEuroFilter (Casiez et al., CHI 2012) is a low-pass filter whose cutoff rises with
+speed: jitter is smoothed hard while the hand is still, and fast strokes pass with
+little lag. It also keeps the filtered velocity, which the drum gesture uses to
+predict when a wrist will cross its hit threshold.
+"""
+
+import math
+
+import numpy as np
+
+
+def _alpha(cutoff, dt):
+    """Smoothing factor of a first-order low-pass at `cutoff` Hz sampled every dt seconds"""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One-Euro filter over a scalar or a vector of joints, filtered independently
+
+    min_cutoff (Hz) sets the smoothing at rest, beta how fast the cutoff rises with
+    speed (per value-unit/s), d_cutoff (Hz) the smoothing of the velocity estimate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=8.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = None
+        self.time = None
+
+    def __call__(self, value, t):
+        """Filter one sample taken at time t (seconds); returns the smoothed value"""
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value = value.copy()
+            self.velocity = np.zeros_like(value)
+            self.time = t
+            return self.value
+
+        dt = t - self.time
+        if dt <= 0:
+            return self.value
+
+        raw_velocity = (value - self.value) / dt
+        a_d = _alpha(self.d_cutoff, dt)
+        self.velocity = a_d * raw_velocity + (1.0 - a_d) * self.velocity
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.velocity)
+        tau = 1.0 / (2.0 * np.pi * cutoff)
+        a = 1.0 / (1.0 + tau / dt)
+        self.value = a * value + (1.0 - a) * self.value
+        self.time = t
+        return self.value
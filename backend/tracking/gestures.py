@@ -0,0 +1,176 @@
+"""Gesture state machines shared by the trackers, one instance per player"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# MediaPipe Pose landmark indices
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+
+FINGER_TIPS = [4, 8, 12, 16, 20]  # Thumb, Index, Middle, Ring, Pinky tips
+
+
+def count_fingers_above_shoulders(hand_landmarks, pose_landmarks, frame_height=None, frame_width=None):
+    """Count fingers that are above the shoulder level"""
+    if not pose_landmarks or not hand_landmarks:
+        return 0
+
+    # Average shoulder height (y is smaller when higher)
+    left_shoulder = pose_landmarks.landmark[LEFT_SHOULDER]
+    right_shoulder = pose_landmarks.landmark[RIGHT_SHOULDER]
+    shoulder_y = (left_shoulder.y + right_shoulder.y) / 2
+
+    return sum(1 for tip_idx in FINGER_TIPS if hand_landmarks.landmark[tip_idx].y < shoulder_y)
+
+
+class StrumGesture:
+    """Guitar strum: enough fingertips above the shoulders holds the strum key down
+
+    The state is re-evaluated at most once per cooldown, like the original spacebar loop.
+    """
+
+    def __init__(self, min_fingers=4, cooldown=0.1):
+        self.min_fingers = min_fingers  # 4 = at least 2 fingers per hand
+        self.cooldown = cooldown
+        self.pressed = False
+        self.active = False
+        self.fingers = 0
+        self._last_check = 0.0
+
+    def update(self, hands, pose_landmarks, now):
+        """Feed the player's hands for one frame; returns "press", "release" or None"""
+        self.fingers = sum(count_fingers_above_shoulders(hand, pose_landmarks) for hand in hands)
+        self.active = self.fingers >= self.min_fingers
+
+        if now - self._last_check <= self.cooldown:
+            return None
+        self._last_check = now
+        if self.active and not self.pressed:
+            self.pressed = True
+            return "press"
+        if not self.active and self.pressed:
+            self.pressed = False
+            return "release"
+        return None
+
+
+class DrumHit(NamedTuple):
+    hand: str  # "left" or "right", from the player's point of view
+    time: float  # time.time() the wrist crossed (or is predicted to cross) the threshold
+    predicted: bool  # fired ahead of the crossing from the wrist's velocity
+
+
+class DrumGesture:
+    """Drum hits: a wrist dropping HIT_THRESHOLD px below its shoulder, re-armed above RESET
+
+    Hands are named from the player's point of view. On a mirrored (flipped) frame,
+    as drums.py uses, MediaPipe's left wrist is the player's "right" stick; pass
+    mirrored=False when the frame is not flipped.
+
+    With a smoother (a OneEuroFilter over the wrist and shoulder heights) jitter around
+    the threshold no longer double-fires. With lead_time > 0 a hit fires as soon as the
+    wrist, moving down faster than min_velocity px/s, is due to cross the threshold
+    within lead_time seconds. Each hit carries the sub-frame time of the crossing:
+    interpolated between frames, or extrapolated when predicted.
+    """
+
+    def __init__(self, hit_threshold=40, reset_threshold=20, mirrored=True,
+                 smoother=None, lead_time=0.0, min_velocity=300.0):
+        self.hit_threshold = hit_threshold
+        self.reset_threshold = reset_threshold
+        self.left_hand, self.right_hand = ("right", "left") if mirrored else ("left", "right")
+        self.smoother = smoother
+        self.lead_time = lead_time
+        self.min_velocity = min_velocity
+        self.left_down = False
+        self.right_down = False
+        self.rel_left = 0.0
+        self.rel_right = 0.0
+        self._previous = None  # (time, rel_left, rel_right) of the last frame
+        self._previous_velocity = None  # (vel_left, vel_right) of the last frame
+
+    def update(self, pose_landmarks, frame_height, now=None):
+        """Feed one frame's pose; returns a DrumHit per hand that hit
+
+        now is the capture time of the frame (defaults to time.time()).
+        """
+        if now is None:
+            now = time.time()
+        if not pose_landmarks:
+            self.rel_left = self.rel_right = 0.0
+            self._previous = self._previous_velocity = None
+            if self.smoother is not None:
+                self.smoother.reset()
+            return []
+
+        lm = pose_landmarks.landmark
+        heights = np.array([lm[LEFT_WRIST].y, lm[LEFT_SHOULDER].y,
+                            lm[RIGHT_WRIST].y, lm[RIGHT_SHOULDER].y]) * frame_height
+        if self.smoother is not None:
+            heights = self.smoother(heights, now)
+        self.rel_left = float(heights[0] - heights[1])
+        self.rel_right = float(heights[2] - heights[3])
+
+        # Downward speed of each wrist relative to its shoulder, px/s
+        previous = self._previous
+        previous_time, previous_left, previous_right = previous or (None, None, None)
+        if self.smoother is not None:
+            velocity = self.smoother.velocity
+            vel_left = velocity[0] - velocity[1]
+            vel_right = velocity[2] - velocity[3]
+        elif previous is not None and now > previous_time:
+            vel_left = (self.rel_left - previous_left) / (now - previous_time)
+            vel_right = (self.rel_right - previous_right) / (now - previous_time)
+        else:
+            vel_left = vel_right = 0.0
+        # ... and its acceleration, so strokes already braking are not predicted to land
+        acc_left = acc_right = 0.0
+        if self._previous_velocity is not None and previous is not None and now > previous_time:
+            acc_left = (vel_left - self._previous_velocity[0]) / (now - previous_time)
+            acc_right = (vel_right - self._previous_velocity[1]) / (now - previous_time)
+        self._previous = (now, self.rel_left, self.rel_right)
+        self._previous_velocity = (vel_left, vel_right)
+
+        hits = []
+        self.left_down, hit_time, predicted = self._update_stick(
+            self.left_down, self.rel_left, vel_left, acc_left, previous_left, previous_time, now)
+        if hit_time is not None:
+            hits.append(DrumHit(self.left_hand, hit_time, predicted))
+        self.right_down, hit_time, predicted = self._update_stick(
+            self.right_down, self.rel_right, vel_right, acc_right, previous_right, previous_time,
+            now)
+        if hit_time is not None:
+            hits.append(DrumHit(self.right_hand, hit_time, predicted))
+        return hits
+
+    def _update_stick(self, down, rel, velocity, acceleration, previous_rel, previous_time, now):
+        """Returns (down, hit_time or None, predicted) for one wrist"""
+        if down:
+            return rel >= self.reset_threshold, None, False
+
+        if rel > self.hit_threshold:
+            # Interpolate when, between the two frames, the wrist crossed the threshold
+            hit_time = now
+            if previous_rel is not None and previous_rel < self.hit_threshold < rel:
+                fraction = (self.hit_threshold - previous_rel) / (rel - previous_rel)
+                hit_time = previous_time + fraction * (now - previous_time)
+            return True, hit_time, False
+
+        if (self.lead_time > 0 and velocity > self.min_velocity
+                and rel > self.reset_threshold):
+            time_to_hit = _time_to_reach(self.hit_threshold - rel, velocity, acceleration)
+            if time_to_hit is not None and time_to_hit <= self.lead_time:
+                return True, now + time_to_hit, True
+        return False, None, False
+
+
+def _time_to_reach(distance, velocity, acceleration):
+    """Seconds until `distance` is covered under constant acceleration, None if never"""
+    if abs(acceleration) < 1e-6:
+        return distance / velocity
+    discriminant = velocity * velocity + 2.0 * acceleration * distance
+    if discriminant < 0:
+        return None  # braking hard enough to stop short
+    return (-velocity + np.sqrt(discriminant)) / acceleration
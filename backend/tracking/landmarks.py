@@ -0,0 +1,158 @@
+"""Compact columnar recordings of tracked landmarks, for offline gesture tuning
+
+A landmark session is a directory (conventionally named *.lmk) holding one raw binary
+file per column plus meta.json describing them:
+
+    time.bin       float64 (N,)          capture time, time.time() seconds
+    pose.bin       float16 (N, 33, 4)    x, y, z, visibility; NaN when nobody was found
+    hands.bin      float16 (N, 2, 21, 3) owned hands, x, y, z; NaN for missing hands
+    mask_box.bin   int16   (N, 4)        person bounding box x0, y0, x1, y1; -1 if none
+
+That is about 0.5 KB per frame, roughly 1/10 of a compressed 640x480 video. Rows are
+appended in chunks, so a crash loses at most one chunk, and the columns open as
+read-only memory maps. Hand-labelled ground truth for tracking.tune_gestures goes
+in labels.json next to the columns:
+
+    {"drum": [{"time": 1718000000.12, "hand": "left"}, ...],
+     "strum": [{"time": 1718000003.40, "action": "press"}, ...]}
+"""
+
+import json
+import os
+
+import numpy as np
+
+from tracking.roi import mask_bounds
+
+MAX_HANDS = 2
+
+COLUMNS = {
+    "time": (np.float64, ()),
+    "pose": (np.float16, (33, 4)),
+    "hands": (np.float16, (MAX_HANDS, 21, 3)),
+    "mask_box": (np.int16, (4,)),
+}
+
+SESSION_EXTENSION = ".lmk"
+
+
+class LandmarkRecorder:
+    """Appends one row per tracked frame to a landmark session directory"""
+
+    def __init__(self, path, mirrored=False, chunk=256, **meta):
+        self.path = path
+        self.chunk = chunk
+        self.meta = {"version": 1, "mirrored": mirrored, **meta,
+                     "columns": {name: [np.dtype(dtype).str, list(shape)]
+                                 for name, (dtype, shape) in COLUMNS.items()}}
+        os.makedirs(path, exist_ok=True)
+        self._buffers = {name: np.empty((chunk,) + shape, dtype)
+                         for name, (dtype, shape) in COLUMNS.items()}
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "ab") for name in COLUMNS}
+        self._rows = 0
+        self.frames = 0
+
+    def append(self, capture_time, frame_shape, pose_landmarks=None, hands=(), body_mask=None):
+        """Record one frame; hands are the player's hand landmark lists"""
+        if self.frames == 0:
+            self.meta.update(height=int(frame_shape[0]), width=int(frame_shape[1]))
+            self._write_meta()
+        row = self._rows
+        self._buffers["time"][row] = capture_time
+
+        pose = self._buffers["pose"][row]
+        if pose_landmarks:
+            pose[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark]
+        else:
+            pose[:] = np.nan
+
+        hand_rows = self._buffers["hands"][row]
+        hand_rows[:] = np.nan
+        for slot, hand_landmarks in enumerate(list(hands)[:MAX_HANDS]):
+            hand_rows[slot] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+
+        box = mask_bounds(body_mask) if body_mask is not None else None
+        self._buffers["mask_box"][row] = box if box is not None else (-1, -1, -1, -1)
+
+        self._rows += 1
+        self.frames += 1
+        if self._rows == self.chunk:
+            self.flush()
+
+    def flush(self):
+        for name, f in self._files.items():
+            f.write(self._buffers[name][:self._rows].tobytes())
+            f.flush()
+        self._rows = 0
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self.meta["frames"] = self.frames
+        self._write_meta()
+
+
+class LandmarkSession:
+    """Read-only, memory-mapped view of a recorded landmark session"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        columns = {}
+        for name, (dtype, shape) in self.meta["columns"].items():
+            dtype = np.dtype(dtype)
+            row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            file_path = os.path.join(path, f"{name}.bin")
+            rows = os.path.getsize(file_path) // row_bytes
+            if rows:
+                columns[name] = np.memmap(file_path, dtype, mode="r", shape=(rows, *shape))
+            else:
+                columns[name] = np.empty((0, *shape), dtype)
+        # A crash can leave the columns a partial chunk apart
+        self.frames = min(len(column) for column in columns.values())
+        self.columns = {name: column[:self.frames] for name, column in columns.items()}
+
+        labels_path = os.path.join(path, "labels.json")
+        self.labels = None
+        if os.path.exists(labels_path):
+            with open(labels_path) as f:
+                self.labels = json.load(f)
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @property
+    def height(self):
+        return self.meta["height"]
+
+    @property
+    def width(self):
+        return self.meta["width"]
+
+    @property
+    def mirrored(self):
+        return self.meta.get("mirrored", False)
+
+
+def find_landmark_sessions(paths):
+    """Expand paths into landmark session directories, searching directories recursively"""
+    sessions = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, "meta.json")):
+            sessions.append(path)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                if "meta.json" in files:
+                    sessions.append(root)
+                    dirs[:] = []
+    return sessions
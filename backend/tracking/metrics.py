@@ -0,0 +1,274 @@
+"""Process-wide metrics: stage histograms, counters, a Prometheus endpoint and a JSON log
+
+Everything the trackers time through StageStats also lands in METRICS, at the cost of a
+bisect and a lock per sample. Nothing is exported unless asked for:
+
+    python GuitarSuperPower.py --metrics-port 9108          # GET /metrics, Prometheus text
+    python drums.py --metrics-log metrics.jsonl             # one JSON snapshot every 10 s
+    python tracker.py --profile profile.txt                 # sampled stacks, flamegraph input
+
+Metric names:
+    tracker_stage_seconds{stage}              histogram (capture, model_pose, masks, render, ...)
+    tracker_dropped_frames_total{queue}       frames discarded by the capture/render queues
+                                              (render drops are frames the display skipped)
+    tracker_gesture_events_total{gesture,action}
+    tracker_gesture_events_dropped_total      events the Socket.IO publisher had to discard
+"""
+
+import bisect
+import collections
+import http.server
+import json
+import sys
+import threading
+import time
+import traceback
+
+# Seconds; dense around one 30 fps frame where the trackers live
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.025, 0.033,
+                   0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0..1)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Thread-safe registry of histograms, counters and scrape-time callbacks"""
+
+    def __init__(self, prefix="tracker_"):
+        self.prefix = prefix
+        self._histograms = collections.defaultdict(dict)  # name -> {labels: Histogram}
+        self._counters = collections.defaultdict(dict)  # name -> {labels: value}
+        self._callbacks = []  # (name, labels, fn) read when exported
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0) + amount
+
+    def counter_func(self, name, fn, **labels):
+        """Export fn() as a counter, e.g. a queue's running drop count"""
+        with self._lock:
+            self._callbacks.append((name, _label_key(labels), fn))
+
+    def _counter_values(self):
+        counters = {name: dict(values) for name, values in self._counters.items()}
+        for name, key, fn in self._callbacks:
+            counters.setdefault(name, {})[key] = counters.get(name, {}).get(key, 0) + fn()
+        return counters
+
+    def prometheus(self):
+        """Text exposition format, version 0.0.4"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(key, [('le', bound)])} "
+                                     f"{cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} "
+                                 f"{histogram.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counter_values().items()):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """JSON-friendly summary: per-histogram count, mean and p50/p95/p99 in ms, counters"""
+        with self._lock:
+            histograms = {}
+            for name, series in self._histograms.items():
+                for key, histogram in series.items():
+                    histograms[name + _format_labels(key)] = {
+                        "count": histogram.count,
+                        "mean_ms": histogram.sum / histogram.count * 1000.0,
+                        **{f"p{q}_ms": histogram.quantile(q / 100.0) * 1000.0
+                           for q in (50, 95, 99)},
+                    }
+            counters = {
+                name + _format_labels(key): value
+                for name, series in self._counter_values().items()
+                for key, value in series.items()
+            }
+        return {"time": time.time(), "histograms": histograms, "counters": counters}
+
+
+METRICS = Metrics()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    metrics = METRICS
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.metrics.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the tracker's console
+
+
+class MetricsServer:
+    """Serves /metrics on a daemon thread; binds to localhost unless told otherwise"""
+
+    def __init__(self, port, host="127.0.0.1", metrics=METRICS):
+        handler = type("Handler", (_Handler,), {"metrics": metrics})
+        self.server = http.server.ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http",
+                                       daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JsonLogger:
+    """Appends a metrics snapshot as one JSON line every interval seconds"""
+
+    def __init__(self, path, interval=10.0, metrics=METRICS, **extra):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self.extra = extra
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-log", daemon=True)
+        self.thread.start()
+
+    def _write(self):
+        with open(self.path, "a") as f:
+            f.write(json.dumps({**self.extra, **self.metrics.snapshot()}) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def close(self):
+        self._stop.set()
+        self.thread.join(timeout=1.0)
+        self._write()
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval; writes collapsed stacks on close
+
+    The output (one "thread;outer;...;inner count" line per stack) feeds flamegraph.pl
+    or speedscope. Only the profiler thread does work, so the cost to the trackers is a
+    brief GIL hand-off per sample.
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = [f"{entry.name} ({entry.filename.rsplit('/', 1)[-1]}:{entry.lineno})"
+                         for entry in traceback.extract_stack(frame)]
+                self.samples[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+
+    def close(self):
+        self._stop.set()
+        self.thread.join(timeout=1.0)
+        with open(self.path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def add_arguments(parser):
+    """The --metrics-* and --profile flags shared by the tracker scripts"""
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-log", metavar="PATH",
+                        help="append a JSON metrics snapshot to PATH every --metrics-interval")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, metavar="SECONDS",
+                        help="seconds between --metrics-log snapshots")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="sample all thread stacks while running and write collapsed "
+                             "stacks to PATH on exit")
+
+
+class MetricsExporters:
+    """Starts whichever exporters the command line asked for; close() stops them"""
+
+    def __init__(self, args, **extra):
+        self.exporters = []
+        if args.metrics_port:
+            self.exporters.append(MetricsServer(args.metrics_port))
+            print(f"Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+        if args.metrics_log:
+            self.exporters.append(JsonLogger(args.metrics_log, args.metrics_interval, **extra))
+        if args.profile:
+            self.exporters.append(SamplingProfiler(args.profile))
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
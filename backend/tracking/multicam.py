@@ -0,0 +1,334 @@
+"""Several cameras, one fused player: synchronized readers, per-camera worker processes
+and confidence-weighted landmark fusion
+
+A hand hidden behind the guitar neck from one side is usually visible from another.
+Each camera gets a reader thread and a worker process that owns its MediaPipe models,
+so inference runs on as many cores as there are cameras and each model keeps its own
+temporal tracking state. The per-camera landmarks are then fused into one pose and one
+set of hands that the unchanged gesture recognizers consume.
+
+Cameras need no calibration, only to see the player from roughly the same direction
+(e.g. left, centre and right of the screen). Every view is expressed in a body frame
+(origin between the shoulders, unit = shoulder width), averaged with the landmarks'
+confidences as weights, and mapped back into the primary camera's image.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from tracking.engine import Observation, TrackerEngine, required_factories
+from tracking.gestures import LEFT_SHOULDER, RIGHT_SHOULDER
+from tracking.pipeline import DropOldestQueue, FramePacket
+from tracking.render import FrameBuffers
+
+# Minimum shoulder visibility for a view to define a body frame
+MIN_SHOULDER_VISIBILITY = 0.5
+
+
+class SyncedCameras:
+    """Reads several sources on their own threads and hands out one frame from each
+
+    In latest mode (live cameras) every read() returns the newest frame of each camera,
+    dropping stale ones so a slow camera never delays the others. In lockstep mode
+    (recordings replayed unthrottled) every frame of every source is returned in order,
+    so the files stay aligned. read() returns (ok, frames) like cv2.VideoCapture; the
+    spread of the frames' capture times is recorded as the "camera_skew" stage.
+    """
+
+    def __init__(self, sources, lockstep=False, stats=None):
+        self.sources = sources
+        self.lockstep = lockstep
+        self.stats = stats
+        self._stop = threading.Event()
+        self._ended = False
+        self._queues = []
+        self._threads = []
+        for index, source in enumerate(sources):
+            out = queue.Queue(maxsize=1) if lockstep else DropOldestQueue(maxsize=1)
+            thread = threading.Thread(target=self._read, args=(source, out),
+                                      name=f"camera-{index}", daemon=True)
+            self._queues.append(out)
+            self._threads.append(thread)
+            thread.start()
+
+    def _read(self, source, out):
+        frame_id = 0
+        try:
+            while not self._stop.is_set():
+                ret, frame = source.read()
+                if not ret:
+                    break
+                packet = FramePacket(frame_id, time.perf_counter(), frame, time.time())
+                frame_id += 1
+                if self.lockstep:
+                    while not self._stop.is_set():
+                        try:
+                            out.put(packet, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                else:
+                    out.put(packet)
+        finally:
+            if self.lockstep:
+                # The end marker must not be lost while the consumer holds the queue full
+                while not self._stop.is_set():
+                    try:
+                        out.put(None, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+            else:
+                out.close()
+
+    def isOpened(self):
+        # The readers run ahead of the consumer, so a finished source can still have
+        # frames queued; the end shows up as a failed read() instead
+        return not self._ended
+
+    def read(self):
+        packets = []
+        for out in self._queues:
+            packet = None
+            if self.lockstep:
+                while not self._stop.is_set():
+                    try:
+                        packet = out.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        pass
+            while not self.lockstep and packet is None and not out.closed:
+                packet = out.get(timeout=0.1)
+            if packet is None:
+                self._ended = True
+                return False, None
+            packets.append(packet)
+        if self.stats is not None:
+            times = [packet.capture_time for packet in packets]
+            self.stats.add("camera_skew", max(times) - min(times))
+        return True, tuple(packet.frame for packet in packets)
+
+    def release(self):
+        self._stop.set()
+        for out in self._queues:
+            # Unblock a lockstep reader waiting to hand over a frame
+            if self.lockstep:
+                try:
+                    out.get_nowait()
+                except queue.Empty:
+                    pass
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        for source in self.sources:
+            source.release()
+
+
+def _landmark_array(landmark_list, fields):
+    return np.array([[getattr(lm, field) for field in fields] for lm in landmark_list.landmark],
+                    dtype=np.float32)
+
+
+def _camera_worker(conn, model_names, model_options, mirror):
+    """Owns one camera's models; answers each frame with plain arrays"""
+    from tracking.autotune import configure
+    from tracking.engine import MODEL_FACTORIES
+    from tracking.ownership import PlayerOwnership, largest_component
+    from tracking.parallel import SerialModels
+
+    factories = configure({name: MODEL_FACTORIES[name] for name in model_names}, model_options)
+    models = SerialModels(factories)
+    buffers = FrameBuffers()
+    conn.send("ready")
+    try:
+        while True:
+            frame = conn.recv()
+            if frame is None:
+                break
+            if mirror:
+                frame = cv2.flip(frame, 1, dst=buffers.get("flipped", frame.shape))
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffers.get("rgb", frame.shape))
+            results = models.process(rgb)
+            h, w = frame.shape[:2]
+
+            view = {"size": (w, h), "pose": None, "hands": []}
+            if "pose" in results and results["pose"].pose_landmarks:
+                view["pose"] = _landmark_array(results["pose"].pose_landmarks,
+                                               ("x", "y", "z", "visibility"))
+            if "hands" in results and results["hands"].multi_hand_landmarks:
+                hand_results = results["hands"]
+                body_mask = largest_component(results["segmentation"].segmentation_mask > 0.5)
+                wrists = [(int(hand.landmark[0].x * w), int(hand.landmark[0].y * h))
+                          for hand in hand_results.multi_hand_landmarks]
+                owned = PlayerOwnership(body_mask, buffer_size=50).owns(wrists)
+                for hand, handedness, is_owned in zip(hand_results.multi_hand_landmarks,
+                                                      hand_results.multi_handedness, owned):
+                    if is_owned:
+                        label = handedness.classification[0]
+                        view["hands"].append((_landmark_array(hand, ("x", "y", "z")),
+                                              label.label, label.score))
+            conn.send(view)
+    finally:
+        models.close()
+
+
+class CameraWorkers:
+    """One worker process per camera, each with its own instance of every model
+
+    A process per camera rather than a shared pool keeps every model's tracking state
+    with the camera it follows. Frames go out to all workers before any reply is read,
+    so the cameras are processed concurrently.
+    """
+
+    def __init__(self, count, model_names, model_options=None, mirror=False):
+        self.names = list(model_names)
+        context = multiprocessing.get_context("spawn")  # no MediaPipe state forked
+        self._conns = []
+        self._processes = []
+        for index in range(count):
+            parent, child = context.Pipe()
+            process = context.Process(target=_camera_worker, name=f"camera-worker-{index}",
+                                      args=(child, self.names, model_options or {}, mirror),
+                                      daemon=True)
+            process.start()
+            self._conns.append(parent)
+            self._processes.append(process)
+        # Model start-up takes seconds; keep it out of the first frames' latency
+        for conn in self._conns:
+            conn.recv()
+
+    def process(self, frames):
+        """Return one view dict per camera for a tuple of frames"""
+        for conn, frame in zip(self._conns, frames):
+            conn.send(frame)
+        return [conn.recv() for conn in self._conns]
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+
+
+def _body_frame(view):
+    """(origin px, scale px) from a view's shoulders, or None when they are not visible"""
+    pose = view["pose"]
+    if pose is None:
+        return None
+    shoulders = pose[[LEFT_SHOULDER, RIGHT_SHOULDER]]
+    if shoulders[:, 3].min() < MIN_SHOULDER_VISIBILITY:
+        return None
+    size = np.array(view["size"], dtype=np.float32)
+    points = shoulders[:, :2] * size
+    scale = float(np.linalg.norm(points[0] - points[1]))
+    if scale < 1.0:
+        return None
+    return points.mean(axis=0), scale
+
+
+def fuse_views(views, primary=0):
+    """Fuse per-camera views into (pose array or None, [(hand array, label)], (w, h))
+
+    Pose landmarks are averaged weighted by visibility, hands by handedness score, with
+    hands matched across cameras by their left/right label. The result lives in the
+    image of the primary camera, or of the best-placed camera when the primary cannot
+    see the shoulders.
+    """
+    frames = [_body_frame(view) for view in views]
+    usable = [index for index, frame in enumerate(frames) if frame is not None]
+    if not usable:
+        view = views[primary]
+        return view["pose"], [(hand, label) for hand, label, _ in view["hands"]], view["size"]
+
+    reference = primary if frames[primary] is not None else max(
+        usable, key=lambda index: views[index]["pose"][[LEFT_SHOULDER, RIGHT_SHOULDER], 3].sum()
+    )
+    ref_origin, ref_scale = frames[reference]
+    ref_size = np.array(views[reference]["size"], dtype=np.float32)
+
+    def to_body(points, index):
+        origin, scale = frames[index]
+        size = np.array(views[index]["size"], dtype=np.float32)
+        return (points[:, :2] * size - origin) / scale
+
+    def to_reference(body_points):
+        return (body_points * ref_scale + ref_origin) / ref_size
+
+    # Pose: per-landmark visibility-weighted average
+    weights = np.stack([views[index]["pose"][:, 3] for index in usable])  # (cameras, 33)
+    body = np.stack([to_body(views[index]["pose"], index) for index in usable])
+    depth = np.stack([views[index]["pose"][:, 2] for index in usable])
+    total = np.maximum(weights.sum(axis=0), 1e-6)
+    pose = np.empty((weights.shape[1], 4), dtype=np.float32)
+    pose[:, :2] = to_reference((weights[..., None] * body).sum(axis=0) / total[:, None])
+    pose[:, 2] = (weights * depth).sum(axis=0) / total
+    pose[:, 3] = weights.max(axis=0)
+
+    # Hands: one fused hand per handedness label
+    hands = []
+    for label in ("Left", "Right"):
+        matches = [(hand, score, index) for index in usable
+                   for hand, hand_label, score in views[index]["hands"] if hand_label == label]
+        if not matches:
+            continue
+        scores = np.array([score for _, score, _ in matches], dtype=np.float32)
+        body = np.stack([to_body(hand, index) for hand, _, index in matches])
+        fused = np.empty(matches[0][0].shape, dtype=np.float32)
+        fused[:, :2] = to_reference(np.tensordot(scores, body, axes=1) / scores.sum())
+        fused[:, 2] = np.tensordot(scores, np.stack([hand[:, 2] for hand, _, _ in matches]),
+                                   axes=1) / scores.sum()
+        hands.append((fused, label))
+    return pose, hands, tuple(int(v) for v in ref_size)
+
+
+def to_landmark_list(points):
+    """NormalizedLandmarkList from an (N, 3) or (N, 4) array, for the gesture code"""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for point in points:
+        landmark = landmark_list.landmark.add()
+        landmark.x, landmark.y, landmark.z = float(point[0]), float(point[1]), float(point[2])
+        if len(point) > 3:
+            landmark.visibility = float(point[3])
+    return landmark_list
+
+
+class MultiCameraEngine(TrackerEngine):
+    """TrackerEngine fed by several cameras: frames are tuples, one per camera"""
+
+    def __init__(self, recognizers, camera_count, mirror=True, model_options=None, stats=None,
+                 recorder=None):
+        self.recognizers = recognizers
+        self.mirror = mirror
+        self.stats = stats
+        self.recorder = recorder
+        self.models = CameraWorkers(camera_count, required_factories(recognizers),
+                                    model_options, mirror)
+        self.track_buffers = FrameBuffers()
+        self.render_buffers = FrameBuffers()
+
+    def observe(self, frames, capture_time):
+        start = time.perf_counter()
+        views = self.models.process(frames)
+        fused = time.perf_counter()
+        pose, hands, (w, h) = fuse_views(views)
+        observation = Observation(capture_time=capture_time, width=w, height=h)
+        if pose is not None:
+            observation.pose_landmarks = to_landmark_list(pose)
+        observation.hands = [to_landmark_list(hand) for hand, _ in hands]
+        if self.stats is not None:
+            self.stats.add("cameras", fused - start)
+            self.stats.add("fusion", time.perf_counter() - fused)
+        return observation
+
+    def draw_frame(self, frames, observation):
+        return super().draw_frame(frames[0], observation)
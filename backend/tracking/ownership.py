@@ -0,0 +1,62 @@
+"""Decide which detected hands belong to the tracked player"""
+
+import cv2
+import numpy as np
+
+
+def largest_component(full_body_mask):
+    """Keep only the largest connected component (closest/most prominent person)"""
+    if not full_body_mask.any():
+        return np.zeros_like(full_body_mask, dtype=bool)
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+        full_body_mask.astype(np.uint8), connectivity=8
+    )
+    if num_labels <= 2:
+        # Background plus at most one person: nothing to choose between
+        return full_body_mask
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    return labels == largest
+
+
+class PlayerOwnership:
+    """Answers "is this wrist on the player?" with one distance-transform lookup per wrist
+
+    A wrist belongs to the player when any body pixel lies inside the square window of
+    +/- buffer_size pixels around it, the same test the old 11x11 sample grid approximated.
+    The chessboard distance transform is built lazily, once per frame, and only when
+    there is a hand to classify.
+    """
+
+    def __init__(self, body_mask, buffer_size=50):
+        self.body_mask = body_mask
+        self.buffer_size = buffer_size
+        self._distance = None
+
+    def _distance_to_body(self):
+        if self._distance is None:
+            # distanceTransform measures the distance to the nearest zero pixel,
+            # so invert the mask: body pixels become zeros
+            background = np.where(self.body_mask, 0, 255).astype(np.uint8)
+            self._distance = cv2.distanceTransform(background, cv2.DIST_C, 3)
+        return self._distance
+
+    def owns(self, points):
+        """Boolean array telling which (x, y) pixel points belong to the player"""
+        points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        if len(points) == 0 or not self.body_mask.any():
+            return np.zeros(len(points), dtype=bool)
+        h, w = self.body_mask.shape[:2]
+        xs = np.clip(points[:, 0], 0, w - 1)
+        ys = np.clip(points[:, 1], 0, h - 1)
+        return self._distance_to_body()[ys, xs] <= self.buffer_size
+
+    def owned_hands(self, multi_hand_landmarks, w, h):
+        """Filter MediaPipe hands down to the ones whose wrist is on the player"""
+        if not multi_hand_landmarks:
+            return []
+        wrists = [
+            (int(hand.landmark[0].x * w), int(hand.landmark[0].y * h))
+            for hand in multi_hand_landmarks
+        ]
+        owned = self.owns(wrists)
+        return [hand for hand, is_owned in zip(multi_hand_landmarks, owned) if is_owned]
@@ -0,0 +1,123 @@
+"""Run several MediaPipe models on the same frame, serially or concurrently"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def _timed_process(model, image, stats, name):
+    if stats is None:
+        return model.process(image)
+    start = time.perf_counter()
+    result = model.process(image)
+    stats.add(f"model_{name}", time.perf_counter() - start)
+    return result
+
+
+class SerialModels:
+    """Runs each model in turn on the calling thread (the original behaviour)
+
+    With a StageStats, each model's process() time is recorded as "model_<name>".
+    """
+
+    def __init__(self, factories, stats=None):
+        self.models = {name: factory() for name, factory in factories.items()}
+        self.names = list(self.models)
+        self.stats = stats
+
+    def process(self, rgb_frame, frame_id=None, names=None, inputs=None):
+        """Return {model name: results} for one frame, optionally for a subset of models
+
+        inputs maps a model name to an image that replaces rgb_frame for that model.
+        """
+        if names is None:
+            names = self.models
+        inputs = inputs or {}
+        return {
+            name: _timed_process(self.models[name], inputs.get(name, rgb_frame), self.stats, name)
+            for name in names
+        }
+
+    def close(self):
+        for model in self.models.values():
+            model.close()
+
+
+class ParallelModels:
+    """Runs every model at the same time, each on its own worker with its own instance
+
+    MediaPipe graphs are not safe to share between threads, so each model gets a
+    single-thread executor that builds and owns its instance. MediaPipe releases the
+    GIL while a graph runs, so per-frame time approaches that of the slowest model.
+    Results are merged by frame ID, which lets callers keep several frames in flight.
+    """
+
+    def __init__(self, factories, stats=None):
+        self._factories = dict(factories)
+        self.stats = stats
+        self.names = list(self._factories)
+        self._executors = {}
+        self._instances = {}
+        for name, factory in self._factories.items():
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"model-{name}")
+            # Build the instance on its worker thread so it never crosses threads
+            self._instances[name] = executor.submit(factory).result()
+            self._executors[name] = executor
+
+        self._frame_ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, rgb_frame, frame_id=None, names=None, inputs=None):
+        """Queue a frame on the models; the returned Future resolves to the merged dict"""
+        if frame_id is None:
+            frame_id = next(self._frame_ids)
+        if names is None:
+            names = list(self._executors)
+        merged = Future()
+        if not names:
+            merged.set_result({})
+            return merged
+        with self._lock:
+            self._pending[frame_id] = ({}, len(names), merged)
+
+        inputs = inputs or {}
+        for name in names:
+            model = self._instances[name]
+            future = self._executors[name].submit(
+                _timed_process, model, inputs.get(name, rgb_frame), self.stats, name
+            )
+            future.add_done_callback(
+                lambda done, name=name: self._collect(frame_id, name, done)
+            )
+        return merged
+
+    def _collect(self, frame_id, name, done):
+        with self._lock:
+            entry = self._pending.get(frame_id)
+            if entry is None:
+                return
+            results, expected, merged = entry
+            error = done.exception()
+            if error is not None:
+                del self._pending[frame_id]
+            else:
+                results[name] = done.result()
+                if len(results) < expected:
+                    return
+                del self._pending[frame_id]
+
+        if error is not None:
+            merged.set_exception(error)
+        else:
+            merged.set_result(results)
+
+    def process(self, rgb_frame, frame_id=None, names=None, inputs=None):
+        """Return {model name: results} for one frame, running the models concurrently"""
+        return self.submit(rgb_frame, frame_id, names, inputs).result()
+
+    def close(self):
+        for name, executor in self._executors.items():
+            executor.submit(self._instances[name].close).result()
+            executor.shutdown()
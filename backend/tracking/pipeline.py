@@ -0,0 +1,331 @@
+"""Pipelined capture -> inference -> render stages joined by drop-oldest queues"""
+
+import collections
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class FramePacket:
+    """A captured frame travelling through the pipeline"""
+    frame_id: int
+    capture_time: float  # time.perf_counter() right after cap.read() returned
+    frame: object
+    capture_wall_time: float = 0.0  # time.time() at the same moment, for event timestamps
+    result: object = None
+    inference_done: float = 0.0
+
+
+class DropOldestQueue:
+    """Bounded queue that discards the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=1):
+        self._items = collections.deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None on timeout or once closed and drained"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed and not self._items
+
+
+class StageStats:
+    """Rolling per-stage latency samples, reported in milliseconds
+
+    window=None keeps every sample, which benchmarks need for percentiles. With a
+    tracking.metrics.Metrics registry every sample also feeds its stage histogram.
+    """
+
+    def __init__(self, window=120, metrics=None):
+        self._window = window
+        self.metrics = metrics
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = collections.deque(maxlen=self._window)
+            samples.append(seconds * 1000.0)
+        if self.metrics is not None:
+            self.metrics.observe("stage_seconds", seconds, stage=stage)
+
+    def summary(self):
+        """Return {stage: (mean_ms, max_ms)} over the current window"""
+        with self._lock:
+            return {
+                stage: (sum(samples) / len(samples), max(samples))
+                for stage, samples in self._samples.items() if samples
+            }
+
+    def samples(self):
+        """Return {stage: [ms, ...]} copies of the current samples"""
+        with self._lock:
+            return {stage: list(samples) for stage, samples in self._samples.items()}
+
+    def format(self):
+        return "  ".join(
+            f"{stage}={mean:.1f}/{peak:.1f}ms" for stage, (mean, peak) in self.summary().items()
+        )
+
+    def dump(self, path, **extra):
+        """Write every sample plus extra run information as JSON"""
+        with open(path, "w") as f:
+            json.dump({"stages": self.samples(), **extra}, f)
+
+
+def percentiles(samples, qs=(50, 95, 99)):
+    """Return {"count", "mean", "p50", ...} for a list of millisecond samples"""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples, dtype=np.float64)
+    report = {"count": len(values), "mean": float(values.mean())}
+    for q, value in zip(qs, np.percentile(values, qs)):
+        report[f"p{q}"] = float(value)
+    return report
+
+
+class CaptureThread(threading.Thread):
+    """Reads the camera continuously so the consumer always sees the newest frame"""
+
+    def __init__(self, cap, out_queue, stats):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.stats = stats
+        self.stop_event = threading.Event()
+
+    def run(self):
+        frame_id = 0
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                now = time.perf_counter()
+                if not ret:
+                    break
+                self.stats.add("capture", now - start)
+                self.out_queue.put(FramePacket(frame_id, now, frame, time.time()))
+                frame_id += 1
+        finally:
+            self.out_queue.close()
+
+
+class InferenceThread(threading.Thread):
+    """Runs the model/gesture step on the newest captured frame"""
+
+    def __init__(self, infer, in_queue, out_queue, stats):
+        super().__init__(name="inference", daemon=True)
+        self.infer = infer
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = stats
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                packet = self.in_queue.get(timeout=0.1)
+                if packet is None:
+                    if self.in_queue.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                self.stats.add("queue", start - packet.capture_time)
+                packet.result = self.infer(packet.frame, packet.capture_wall_time)
+                packet.inference_done = time.perf_counter()
+                self.stats.add("inference", packet.inference_done - start)
+                self.stats.add("frame_to_event", packet.inference_done - packet.capture_time)
+                self.out_queue.put(packet)
+        finally:
+            self.out_queue.close()
+
+
+class TrackingThread(threading.Thread):
+    """Captures and infers each frame in turn, handing results to the display
+
+    run() may also be called directly on the calling thread, for headless tracking.
+    """
+
+    def __init__(self, cap, infer, out_queue, stats, report_every=0.0):
+        super().__init__(name="tracking", daemon=True)
+        self.cap = cap
+        self.infer = infer
+        self.out_queue = out_queue
+        self.stats = stats
+        self.report_every = report_every
+        self.stop_event = threading.Event()
+
+    def run(self):
+        frame_id = 0
+        last_report = time.perf_counter()
+        try:
+            while self.cap.isOpened() and not self.stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                captured = time.perf_counter()
+                if not ret:
+                    break
+                self.stats.add("capture", captured - start)
+
+                packet = FramePacket(frame_id, captured, frame, time.time())
+                packet.result = self.infer(frame, packet.capture_wall_time)
+                packet.inference_done = time.perf_counter()
+                self.stats.add("inference", packet.inference_done - captured)
+                self.stats.add("frame_to_event", packet.inference_done - captured)
+                if self.out_queue is not None:
+                    self.out_queue.put(packet)
+                frame_id += 1
+
+                if self.report_every and packet.inference_done - last_report >= self.report_every:
+                    print(f"[serial] {self.stats.format()}")
+                    last_report = packet.inference_done
+        finally:
+            if self.out_queue is not None:
+                self.out_queue.close()
+
+
+def display_latest(packets, render, window_name, stats, display_fps=30.0, on_idle=None):
+    """Draw and show the newest packet at most display_fps times a second
+
+    packets is a DropOldestQueue(maxsize=1) fed by the tracking side, so frames that
+    arrive between two redraws are skipped rather than queued. Only this loop touches
+    cv2.imshow/waitKey. on_idle(now) is called about every 0.1 s, drawn or not.
+    Returns once 'q' is pressed or packets is closed and drained.
+    """
+    interval = 1.0 / display_fps if display_fps and display_fps > 0 else 0.0
+    next_due = time.perf_counter()
+    while True:
+        wait = next_due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        packet = packets.get(timeout=0.1)
+        start = time.perf_counter()
+        if on_idle is not None:
+            on_idle(start)
+        if packet is None:
+            if packets.closed:
+                return
+            continue
+
+        next_due = start + interval
+        output_frame = render(packet.frame, packet.result)
+        drawn = time.perf_counter()
+        cv2.imshow(window_name, output_frame)
+        key = cv2.waitKey(1) & 0xFF
+        shown = time.perf_counter()
+        stats.add("render", drawn - start)
+        stats.add("display", shown - drawn)
+        stats.add("frame_to_display", shown - packet.capture_time)
+        if key == ord('q'):
+            return
+
+
+def run_serial(cap, infer, render, window_name, stats=None, show=True, report_every=0.0,
+               display_fps=30.0):
+    """Capture and infer each frame in turn; draw the newest result at display_fps
+
+    Capture and inference run on a tracking thread, so gestures and key events never
+    wait on the window. The calling thread redraws the newest result at most
+    display_fps times a second and skips the frames in between. With show=False
+    nothing is drawn or displayed (headless tracking) and everything runs on the
+    calling thread. Returns the StageStats collected during the run.
+    """
+    stats = stats or StageStats()
+    if not show:
+        TrackingThread(cap, infer, None, stats, report_every).run()
+        return stats
+
+    packets = DropOldestQueue(maxsize=1)
+    tracking = TrackingThread(cap, infer, packets, stats, report_every)
+    if stats.metrics is not None:
+        stats.metrics.counter_func("dropped_frames_total", lambda: packets.dropped,
+                                   queue="render")
+    tracking.start()
+    try:
+        display_latest(packets, render, window_name, stats, display_fps)
+    finally:
+        tracking.stop_event.set()
+        tracking.join(timeout=1.0)
+
+    return stats
+
+
+def run_pipelined(cap, infer, render, window_name, report_every=5.0, stats=None, show=True,
+                  display_fps=30.0):
+    """Run capture, inference and display on separate stages until 'q' or end of stream
+
+    infer(frame, capture_time) -> result runs on the inference thread (gesture and key
+    events live there so they are never held up by drawing); capture_time is the
+    time.time() at which the frame was read. render(frame, result) -> image runs
+    on the calling thread for the newest result only, at most display_fps times a
+    second, and that thread also owns cv2.imshow/waitKey. With show=False nothing is
+    drawn or displayed (headless tracking).
+    Returns the StageStats collected during the run.
+    """
+    stats = stats or StageStats()
+    capture_queue = DropOldestQueue(maxsize=1)
+    render_queue = DropOldestQueue(maxsize=1)
+    capture = CaptureThread(cap, capture_queue, stats)
+    inference = InferenceThread(infer, capture_queue, render_queue, stats)
+    if stats.metrics is not None:
+        stats.metrics.counter_func("dropped_frames_total", lambda: capture_queue.dropped,
+                                   queue="capture")
+        stats.metrics.counter_func("dropped_frames_total", lambda: render_queue.dropped,
+                                   queue="render")
+    capture.start()
+    inference.start()
+
+    last_report = time.perf_counter()
+
+    def report(now):
+        nonlocal last_report
+        if report_every and now - last_report >= report_every:
+            print(f"[pipeline] {stats.format()}  "
+                  f"dropped capture={capture_queue.dropped} render={render_queue.dropped}")
+            last_report = now
+
+    try:
+        if show:
+            display_latest(render_queue, render, window_name, stats, display_fps, on_idle=report)
+        else:
+            # Nothing to draw: just drain the results until the stream ends
+            while not render_queue.closed:
+                render_queue.get(timeout=0.1)
+                report(time.perf_counter())
+    finally:
+        capture.stop_event.set()
+        inference.stop_event.set()
+        capture.join(timeout=1.0)
+        inference.join(timeout=1.0)
+
+    return stats
@@ -0,0 +1,129 @@
+"""Split one camera frame into per-player regions with IDs that stay stable over time"""
+
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from tracking.roi import pad_box
+
+
+@dataclass
+class PlayerRegion:
+    """One person found in the body mask"""
+    player_id: int
+    mask: np.ndarray  # bool, full frame: this person's connected component
+    bounds: tuple  # tight (x0, y0, x1, y1) pixel box around the mask
+    box: tuple  # padded crop box handed to the per-player models
+    centroid: tuple
+
+
+def find_person_components(full_body_mask, max_players, min_area_fraction=0.02):
+    """The largest connected components of the body mask, biggest first
+
+    Returns (mask, bounds, centroid) tuples. Components smaller than min_area_fraction
+    of the frame are treated as noise. People who touch in the image merge into one
+    component; they separate again as soon as there is a gap between them.
+    """
+    if not full_body_mask.any():
+        return []
+    h, w = full_body_mask.shape[:2]
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
+        full_body_mask.astype(np.uint8), connectivity=8
+    )
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    order = np.argsort(areas)[::-1][:max_players]
+    min_area = min_area_fraction * h * w
+
+    components = []
+    for index in order:
+        if areas[index] < min_area:
+            break
+        label = index + 1
+        x, y, bw, bh = stats[label, :4]
+        components.append((
+            labels == label,
+            (int(x), int(y), int(x + bw), int(y + bh)),
+            (float(centroids[label][0]), float(centroids[label][1])),
+        ))
+    return components
+
+
+class PlayerTracker:
+    """Assigns each person a player slot 0..max_players-1 and keeps it across frames
+
+    Components are matched to the previous frame's players by nearest centroid. A slot
+    stays reserved for max_missing frames after its player disappears, so a brief
+    occlusion does not swap players. New players take the free slots left to right.
+    """
+
+    def __init__(self, max_players=2, max_jump=0.25, max_missing=15, padding=0.3):
+        self.max_players = max_players
+        self.max_jump = max_jump  # largest centroid move per frame, as a fraction of width
+        self.max_missing = max_missing
+        self.padding = padding
+        self._centroids = {}  # slot -> last centroid
+        self._boxes = {}  # slot -> last padded crop box
+        self._missing = {}  # slot -> frames since last seen
+
+    def crop_boxes(self):
+        """{slot: padded box} for every known player, including briefly missing ones"""
+        return dict(self._boxes)
+
+    def update(self, full_body_mask):
+        """Split the mask into players; returns PlayerRegions sorted by player_id"""
+        h, w = full_body_mask.shape[:2]
+        components = find_person_components(full_body_mask, self.max_players)
+
+        # Greedy nearest-centroid matching against the players we already know
+        pairs = []
+        for index, (_, _, centroid) in enumerate(components):
+            for slot, previous in self._centroids.items():
+                distance = np.hypot(centroid[0] - previous[0], centroid[1] - previous[1])
+                if distance <= self.max_jump * w:
+                    pairs.append((distance, index, slot))
+        pairs.sort()
+
+        assigned = {}
+        used_slots = set()
+        for _, index, slot in pairs:
+            if index in assigned or slot in used_slots:
+                continue
+            assigned[index] = slot
+            used_slots.add(slot)
+
+        free_slots = [
+            slot for slot in range(self.max_players)
+            if slot not in used_slots and slot not in self._centroids
+        ]
+        unmatched = sorted(
+            (index for index in range(len(components)) if index not in assigned),
+            key=lambda index: components[index][2][0],
+        )
+        for index, slot in zip(unmatched, free_slots):
+            assigned[index] = slot
+            used_slots.add(slot)
+
+        for slot in list(self._centroids):
+            if slot not in used_slots:
+                self._missing[slot] = self._missing.get(slot, 0) + 1
+                if self._missing[slot] > self.max_missing:
+                    del self._centroids[slot]
+                    del self._boxes[slot]
+                    del self._missing[slot]
+
+        regions = []
+        for index, slot in assigned.items():
+            mask, bounds, centroid = components[index]
+            box = pad_box(bounds, w, h, self.padding)
+            self._centroids[slot] = centroid
+            self._boxes[slot] = box
+            self._missing[slot] = 0
+            regions.append(PlayerRegion(
+                player_id=slot,
+                mask=mask,
+                bounds=bounds,
+                box=box,
+                centroid=centroid,
+            ))
+        return sorted(regions, key=lambda region: region.player_id)
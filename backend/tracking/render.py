@@ -0,0 +1,45 @@
+"""Allocation-free drawing helpers built on reusable, preallocated frame buffers"""
+
+import cv2
+import numpy as np
+
+
+class FrameBuffers:
+    """Named scratch images that are allocated once and reused every frame
+
+    A buffer is reallocated only when the requested shape or dtype changes (e.g. a
+    different camera resolution), so steady-state frames allocate nothing. Each thread
+    that draws should own its own FrameBuffers.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def zeros(self, name, shape, dtype=np.uint8):
+        """Like np.zeros, but clears and returns the reused buffer"""
+        buffer = self.get(name, shape, dtype)
+        buffer.fill(0)
+        return buffer
+
+
+def blend_trail(frame, previous, keep=0.7):
+    """Motion trail: frame = keep * frame + (1 - keep) * previous, then remember frame"""
+    cv2.addWeighted(frame, keep, previous, 1.0 - keep, 0, dst=frame)
+    np.copyto(previous, frame)
+
+
+def flash_white(frame, alpha):
+    """Blend frame toward white by alpha in place (no white overlay image needed)"""
+    cv2.addWeighted(frame, 1.0 - alpha, frame, 0.0, 255.0 * alpha, dst=frame)
+
+
+def binary_mask(mask, threshold, out):
+    """Threshold a float mask into a preallocated uint8 0/1 image"""
+    np.greater(mask, threshold, out=out.view(bool))
+    return out
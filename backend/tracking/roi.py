@@ -0,0 +1,179 @@
+"""Region-of-interest cropping so hands/pose only see the pixels around the player"""
+
+import cv2
+import numpy as np
+
+
+class RoiTracker:
+    """Padded crop box that follows the player and falls back to the full frame when lost
+
+    The box is built from the last landmarks (or body mask) in full-frame pixels and
+    only moves when the player leaves it or it becomes much larger than needed, so the
+    models see a stable crop from frame to frame.
+    """
+
+    def __init__(self, padding=0.3, min_size=160, max_shrink=2.0):
+        self.padding = padding
+        self.min_size = min_size
+        self.max_shrink = max_shrink
+        self.box = None  # (x0, y0, x1, y1) in pixels, None means full frame
+
+    def reset(self):
+        self.box = None
+
+    def update(self, bounds, w, h):
+        """Move the box to cover bounds=(x0, y0, x1, y1) in pixels, or reset if None"""
+        if bounds is None:
+            self.box = None
+            return
+
+        target = pad_box(bounds, w, h, self.padding, self.min_size)
+        if self.box is not None:
+            bx0, by0, bx1, by1 = self.box
+            inside = bx0 <= bounds[0] and by0 <= bounds[1] and bx1 >= bounds[2] and by1 >= bounds[3]
+            box_area = (bx1 - bx0) * (by1 - by0)
+            target_area = max(1, (target[2] - target[0]) * (target[3] - target[1]))
+            if inside and box_area <= self.max_shrink * target_area:
+                return
+
+        if target[2] - target[0] >= w and target[3] - target[1] >= h:
+            self.box = None
+        else:
+            self.box = target
+
+    def crop(self, frame):
+        """Return (crop, box) for the current box, or (frame, None) for the full frame"""
+        if self.box is None:
+            return frame, None
+        x0, y0, x1, y1 = self.box
+        # MediaPipe needs a contiguous image
+        return np.ascontiguousarray(frame[y0:y1, x0:x1]), self.box
+
+
+def pad_box(bounds, w, h, padding=0.3, min_size=160):
+    """Grow pixel bounds (x0, y0, x1, y1) by padding * their longest side, clipped to the frame"""
+    x0, y0, x1, y1 = bounds
+    pad = padding * max(x1 - x0, y1 - y0)
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    half_w = max((x1 - x0) / 2 + pad, min_size / 2)
+    half_h = max((y1 - y0) / 2 + pad, min_size / 2)
+    return (
+        int(max(0, cx - half_w)), int(max(0, cy - half_h)),
+        int(min(w, cx + half_w)), int(min(h, cy + half_h)),
+    )
+
+
+def map_landmarks_to_frame(landmark_list, box, w, h):
+    """Convert normalized landmarks of a crop to normalized full-frame coordinates, in place"""
+    x0, y0, x1, y1 = box
+    crop_w, crop_h = x1 - x0, y1 - y0
+    for landmark in landmark_list.landmark:
+        landmark.x = (x0 + landmark.x * crop_w) / w
+        landmark.y = (y0 + landmark.y * crop_h) / h
+        landmark.z = landmark.z * crop_w / w
+
+
+def landmark_bounds(landmark_lists, w, h, min_visibility=0.5):
+    """Pixel bounding box of all confidently visible landmarks, or None"""
+    xs, ys = [], []
+    for landmark_list in landmark_lists:
+        for landmark in landmark_list.landmark:
+            # Hand landmarks carry no visibility and report 0
+            if landmark.HasField("visibility") and landmark.visibility < min_visibility:
+                continue
+            xs.append(landmark.x)
+            ys.append(landmark.y)
+    if not xs:
+        return None
+    return (
+        max(0.0, min(xs) * w), max(0.0, min(ys) * h),
+        min(float(w), max(xs) * w), min(float(h), max(ys) * h),
+    )
+
+
+def mask_bounds(segmentation_mask, threshold=0.5):
+    """Pixel bounding box of the segmented person, or None"""
+    binary = (segmentation_mask > threshold).astype(np.uint8)
+    x, y, bw, bh = cv2.boundingRect(binary)
+    if bw == 0 or bh == 0:
+        return None
+    return (x, y, x + bw, y + bh)
+
+
+class RoiModels:
+    """Wraps a model runner so the ROI models run on a crop around the player
+
+    Landmarks from the crop are mapped back to full-frame coordinates before they are
+    returned, so callers never see crop coordinates. When the pose model finds nobody
+    in the crop the tracker falls back to the full frame on the next frame.
+    """
+
+    def __init__(self, runner, roi=None, roi_names=("hands", "pose")):
+        self.runner = runner
+        self.names = runner.names
+        self.roi = roi or RoiTracker()
+        self.roi_names = tuple(name for name in roi_names if name in runner.names)
+
+    def process(self, rgb_frame, frame_id=None, names=None, inputs=None):
+        if names is None:
+            names = self.names
+        h, w = rgb_frame.shape[:2]
+        crop, box = self.roi.crop(rgb_frame)
+        inputs = dict(inputs or {})
+        if box is not None:
+            for name in names:
+                if name in self.roi_names:
+                    inputs[name] = crop
+
+        results = self.runner.process(rgb_frame, frame_id, names, inputs=inputs)
+
+        if box is not None:
+            for name in self.roi_names:
+                if name in results:
+                    for landmark_list in _result_landmarks(results[name]):
+                        map_landmarks_to_frame(landmark_list, box, w, h)
+
+        self._track(results, box, w, h)
+        return results
+
+    def _track(self, results, box, w, h):
+        # Only a frame on which the body model ran may move, shrink or reset the box.
+        # When a scheduler skipped it, the hands alone would shrink the box around
+        # them and the next pose run would find no body in the crop.
+        if "pose" in self.roi_names:
+            if "pose" not in results:
+                return
+        elif "segmentation" in self.names and "segmentation" not in results:
+            return
+
+        pose_results = results.get("pose")
+        if box is not None and pose_results is not None and pose_results.pose_landmarks is None:
+            # Lost the player inside the crop: search the full frame next time
+            self.roi.reset()
+            return
+
+        landmark_lists = []
+        for name in self.roi_names:
+            if name in results:
+                landmark_lists.extend(_result_landmarks(results[name]))
+        bounds = landmark_bounds(landmark_lists, w, h)
+
+        if bounds is None and results.get("segmentation") is not None:
+            mask = results["segmentation"].segmentation_mask
+            if mask is not None:
+                bounds = mask_bounds(mask)
+
+        if bounds is not None or pose_results is not None:
+            self.roi.update(bounds, w, h)
+
+    def close(self):
+        self.runner.close()
+
+
+def _result_landmarks(result):
+    """The NormalizedLandmarkLists in a Hands or Pose result"""
+    pose_landmarks = getattr(result, "pose_landmarks", None)
+    if pose_landmarks is not None:
+        yield pose_landmarks
+    for hand_landmarks in getattr(result, "multi_hand_landmarks", None) or ():
+        yield hand_landmarks
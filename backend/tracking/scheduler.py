@@ -0,0 +1,133 @@
+"""Run each model at its own cadence and reuse or extrapolate its results in between"""
+
+import time
+from dataclasses import dataclass
+
+import cv2
+
+
+@dataclass
+class ModelRate:
+    """How often a model must run: every Nth frame, or at most `hz` times per second"""
+    every: int = 1
+    hz: float = 0.0  # 0 means use the frame-based cadence
+
+    def due(self, frames_since, seconds_since):
+        if self.hz > 0:
+            return seconds_since >= 1.0 / self.hz
+        return frames_since >= self.every
+
+
+@dataclass
+class _ModelHistory:
+    latest: object = None
+    latest_time: float = 0.0
+    previous: object = None
+    previous_time: float = 0.0
+    frames_since: int = 0
+
+
+class MotionEstimator:
+    """Mean absolute difference (0-255) between consecutive downscaled grey frames"""
+
+    def __init__(self, size=(64, 48)):
+        self.size = size
+        self._previous = None
+
+    def update(self, rgb_frame):
+        small = cv2.resize(rgb_frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return 0.0
+        return float(cv2.absdiff(gray, previous).mean())
+
+
+def extrapolate_landmarks(previous, latest, ratio):
+    """Return latest + ratio * (latest - previous) for a NormalizedLandmarkList"""
+    extrapolated = type(latest)()
+    extrapolated.CopyFrom(latest)
+    for out, before, after in zip(extrapolated.landmark, previous.landmark, latest.landmark):
+        out.x = after.x + ratio * (after.x - before.x)
+        out.y = after.y + ratio * (after.y - before.y)
+        out.z = after.z + ratio * (after.z - before.z)
+    return extrapolated
+
+
+def extrapolate_pose(previous, latest, ratio):
+    """Motion-extrapolate the pose landmarks of a Pose result, keeping everything else"""
+    if previous is None or previous.pose_landmarks is None or latest.pose_landmarks is None:
+        return latest
+    return latest._replace(
+        pose_landmarks=extrapolate_landmarks(previous.pose_landmarks, latest.pose_landmarks, ratio)
+    )
+
+
+class ScheduledModels:
+    """Wraps a SerialModels/ParallelModels runner and skips models that are not due
+
+    Models without a rate run on every frame. Skipped models return their last result,
+    or an extrapolated one when an extrapolator is registered for them. When the frame
+    difference exceeds motion_threshold every model runs for the next boost_frames frames.
+    """
+
+    # Never extrapolate further ahead than one full interval between real runs
+    MAX_EXTRAPOLATION = 1.0
+
+    def __init__(self, runner, rates, extrapolators=None, motion_threshold=None, boost_frames=5):
+        self.runner = runner
+        self.names = runner.names
+        self.rates = rates
+        self.extrapolators = extrapolators or {}
+        self.motion_threshold = motion_threshold
+        self.boost_frames = boost_frames
+        self.last_motion = 0.0
+        self.last_ran = []
+        self._motion = MotionEstimator() if motion_threshold is not None else None
+        self._boost_left = 0
+        self._history = {name: _ModelHistory() for name in self.names}
+
+    def _is_due(self, name, now, boosted):
+        history = self._history[name]
+        rate = self.rates.get(name)
+        if rate is None or history.latest is None or boosted:
+            return True
+        return rate.due(history.frames_since + 1, now - history.latest_time)
+
+    def process(self, rgb_frame, frame_id=None):
+        """Return {model name: results}, running only the models that are due"""
+        now = time.perf_counter()
+        if self._motion is not None:
+            self.last_motion = self._motion.update(rgb_frame)
+            if self.last_motion > self.motion_threshold:
+                self._boost_left = self.boost_frames
+        boosted = self._boost_left > 0
+        if boosted:
+            self._boost_left -= 1
+
+        due = [name for name in self.names if self._is_due(name, now, boosted)]
+        fresh = self.runner.process(rgb_frame, frame_id, names=due)
+        self.last_ran = due
+
+        results = {}
+        for name in self.names:
+            history = self._history[name]
+            if name in fresh:
+                history.previous, history.previous_time = history.latest, history.latest_time
+                history.latest, history.latest_time = fresh[name], now
+                history.frames_since = 0
+                results[name] = fresh[name]
+                continue
+
+            history.frames_since += 1
+            extrapolate = self.extrapolators.get(name)
+            interval = history.latest_time - history.previous_time
+            if extrapolate is not None and history.previous is not None and interval > 0:
+                ratio = min((now - history.latest_time) / interval, self.MAX_EXTRAPOLATION)
+                results[name] = extrapolate(history.previous, history.latest, ratio)
+            else:
+                results[name] = history.latest
+        return results
+
+    def close(self):
+        self.runner.close()
@@ -0,0 +1,530 @@
+"""Tracker service: capture, inference and render in separate processes around shared memory
+
+In one process MediaPipe, the NumPy/OpenCV mask work and the GIL-bound drawing code all
+compete for one core. The service splits them up:
+
+    capture process  --frames-->  FrameRing (shared memory)  <--zero-copy--  model workers
+                                                                            render process
+    model workers  --results-->  SharedBoard (shared memory)  -->  coordinator (gestures)
+    coordinator    --state---->  SharedBoard "state" record   -->  render process
+
+Each model (segmentation, hands, pose) runs in its own worker process with its own
+instance, so the models run concurrently and keep their temporal tracking state. The
+coordinator, in the calling process, hands every worker the newest frame's sequence
+number, waits for all of them, builds the Observation and runs the recognizers; key
+presses and Socket.IO events leave from there. The render process draws the newest
+state at its own pace and never holds up a gesture.
+
+Nothing is pickled per frame: workers and the renderer read frames straight out of the
+ring, and results are fixed-size arrays in a shared block. Both structures have a single
+writer and are read without locks (seqlocks: a slot's sequence number is cleared while
+it is written and re-checked by the reader afterwards). Semaphores only wake sleepers.
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from tracking.engine import SKELETON_CONNECTIONS, Observation, required_factories
+from tracking.multicam import to_landmark_list
+from tracking.ownership import PlayerOwnership, largest_component
+from tracking.render import FrameBuffers
+
+# Frames kept in the ring; a reader is only overrun when it falls this many frames behind
+RING_SLOTS = 8
+MAX_HANDS = 2
+STATUS_LINES, STATUS_BYTES = 4, 96
+
+
+def _attach(name, size=0):
+    """Create (name=None) or attach to a shared memory block"""
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=size)
+    # Spawned children share the parent's resource tracker, so a block is registered
+    # once and only removed by unlink() (or the tracker, should the service crash)
+    return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    """Single-writer ring of BGR frames in shared memory
+
+    Layout: the newest sequence number, then per slot its sequence number and capture
+    time, then the frames. write() clears a slot's sequence number, copies the frame
+    in and publishes the new number; view() returns the slot itself (no copy) and
+    valid() tells a reader whether the slot still holds its frame.
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        header = 8 * (1 + 2 * slots)
+        frame_bytes = int(np.prod(self.shape))
+        self.block = _attach(name, header + slots * frame_bytes)
+        self.name = self.block.name
+        buf = self.block.buf
+        self._latest = np.ndarray((1,), np.int64, buf, 0)
+        self._seq = np.ndarray((slots,), np.int64, buf, 8)
+        self._times = np.ndarray((slots,), np.float64, buf, 8 + 8 * slots)
+        self._frames = np.ndarray((slots,) + self.shape, np.uint8, buf, header)
+        if name is None:
+            self._latest[0] = -1
+            self._seq[:] = -1
+
+    def write(self, frame, capture_time):
+        seq = int(self._latest[0]) + 1
+        slot = seq % self.slots
+        self._seq[slot] = -1
+        self._frames[slot] = frame
+        self._times[slot] = capture_time
+        self._seq[slot] = seq
+        self._latest[0] = seq
+        return seq
+
+    def latest(self):
+        """Sequence number of the newest frame, -1 before the first"""
+        return int(self._latest[0])
+
+    def view(self, seq):
+        """(frame, capture_time) of frame seq without copying, or (None, None) if overrun"""
+        slot = seq % self.slots
+        if seq < 0 or self._seq[slot] != seq:
+            return None, None
+        return self._frames[slot], float(self._times[slot])
+
+    def valid(self, seq):
+        return seq >= 0 and self._seq[seq % self.slots] == seq
+
+    def close(self, unlink=False):
+        # The views must go before the mapping can be closed
+        del self._latest, self._seq, self._times, self._frames
+        self.block.close()
+        if unlink:
+            self.block.unlink()
+
+
+class SharedRecord:
+    """Fixed-size fields plus a sequence number, inside a SharedBoard
+
+    The owner writes with write(); fields are also writable in place between begin()
+    and publish(). snapshot() copies a consistent record for readers that run
+    unsynchronized with the writer.
+    """
+
+    def __init__(self, buf, offset, spec):
+        self._seq = np.ndarray((1,), np.int64, buf, offset)
+        offset += 8
+        self.fields = {}
+        for field, shape, dtype in spec:
+            array = np.ndarray(shape, dtype, buf, offset)
+            self.fields[field] = array
+            offset += -(-array.nbytes // 8) * 8  # keep every field 8-byte aligned
+
+    @staticmethod
+    def size(spec):
+        return 8 + sum(-(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+                       for _, shape, dtype in spec)
+
+    @property
+    def seq(self):
+        return int(self._seq[0])
+
+    def begin(self):
+        self._seq[0] = -1
+
+    def publish(self, seq):
+        self._seq[0] = seq
+
+    def write(self, seq, **values):
+        self.begin()
+        for field, value in values.items():
+            self.fields[field][...] = value
+        self.publish(seq)
+
+    def snapshot(self, attempts=3):
+        """(seq, {field: copy}) of a completely written record, or (-1, None)"""
+        for _ in range(attempts):
+            seq = self.seq
+            if seq < 0:
+                continue
+            values = {field: array.copy() for field, array in self.fields.items()}
+            if self.seq == seq:
+                return seq, values
+        return -1, None
+
+
+class SharedBoard:
+    """Named SharedRecords in one shared memory block, e.g. one per model worker"""
+
+    def __init__(self, specs, name=None):
+        self.specs = specs
+        self.block = _attach(name, sum(SharedRecord.size(spec) for spec in specs.values()))
+        self.name = self.block.name
+        self.records = {}
+        offset = 0
+        for record, spec in specs.items():
+            self.records[record] = SharedRecord(self.block.buf, offset, spec)
+            offset += SharedRecord.size(spec)
+        if name is None:
+            for record in self.records.values():
+                record.publish(-1)
+
+    def __getitem__(self, record):
+        return self.records[record]
+
+    def close(self, unlink=False):
+        self.records.clear()
+        self.block.close()
+        if unlink:
+            self.block.unlink()
+
+
+def board_specs(model_names, shape):
+    """Record layouts: a job slot, one record per model and the render state"""
+    h, w = shape[:2]
+    specs = {"job": []}
+    if "segmentation" in model_names:
+        specs["segmentation"] = [("ok", (), np.int32), ("seconds", (), np.float64),
+                                 ("mask", (h, w), np.uint8)]
+    if "hands" in model_names:
+        specs["hands"] = [("ok", (), np.int32), ("seconds", (), np.float64),
+                          ("count", (), np.int32),
+                          ("landmarks", (MAX_HANDS, 21, 3), np.float32)]
+    if "pose" in model_names:
+        specs["pose"] = [("ok", (), np.int32), ("seconds", (), np.float64),
+                         ("present", (), np.int32), ("landmarks", (33, 4), np.float32)]
+    specs["state"] = [("pose_present", (), np.int32), ("pose", (33, 4), np.float32),
+                      ("hand_count", (), np.int32),
+                      ("hands", (MAX_HANDS, 21, 3), np.float32),
+                      ("status", (STATUS_LINES, STATUS_BYTES), np.uint8)]
+    return specs
+
+
+def _capture_main(spec, realtime, lockstep, ring_name, shape, frame_ready, credits, ended,
+                  stop):
+    """Reads the source into the FrameRing until it ends or the service stops"""
+    from tracking.sources import open_source
+
+    ring = FrameRing(shape, name=ring_name)
+    cap = open_source(spec, realtime=realtime)
+    try:
+        while cap.isOpened() and not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if lockstep:
+                # Recordings replayed unthrottled: wait until the last frame was tracked
+                while not credits.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+            ring.write(frame, time.time())
+            frame_ready.release()
+    finally:
+        ended.set()
+        frame_ready.release()
+        cap.release()
+        ring.close()
+
+
+def _model_main(name, model_options, mirror, ring_name, shape, board_name, specs, job, done,
+                ready, stop):
+    """One model's worker: runs it on the frame named by the "job" record"""
+    from tracking.autotune import configure
+    from tracking.engine import MODEL_FACTORIES
+
+    model = configure({name: MODEL_FACTORIES[name]}, model_options)[name]()
+    ring = FrameRing(shape, name=ring_name)
+    board = SharedBoard(specs, name=board_name)
+    record = board[name]
+    buffers = FrameBuffers()
+    fields = record.fields
+    model.process(np.zeros(shape, np.uint8))  # the first inference is several times slower
+    ready.release()
+    try:
+        while not stop.is_set():
+            if not job.acquire(timeout=0.1):
+                continue
+            seq = board["job"].seq
+            start = time.perf_counter()
+            record.begin()
+            frame, _ = ring.view(seq)
+            ok = frame is not None
+            if ok:
+                # Reading the slot is the only copy of the frame this process makes
+                if mirror:
+                    frame = cv2.flip(frame, 1, dst=buffers.get("flipped", shape))
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffers.get("rgb", shape))
+                ok = ring.valid(seq)  # not overwritten while it was read
+            if ok:
+                results = model.process(rgb)
+                if name == "segmentation":
+                    np.greater(results.segmentation_mask, 0.5, out=fields["mask"],
+                               casting="unsafe")
+                elif name == "hands":
+                    hands = (results.multi_hand_landmarks or [])[:MAX_HANDS]
+                    fields["count"][...] = len(hands)
+                    for index, hand in enumerate(hands):
+                        fields["landmarks"][index] = [(lm.x, lm.y, lm.z) for lm in hand.landmark]
+                elif name == "pose":
+                    fields["present"][...] = results.pose_landmarks is not None
+                    if results.pose_landmarks:
+                        fields["landmarks"][...] = [(lm.x, lm.y, lm.z, lm.visibility)
+                                                    for lm in results.pose_landmarks.landmark]
+            fields["ok"][...] = ok
+            fields["seconds"][...] = time.perf_counter() - start
+            record.publish(seq)
+            done.release()
+    finally:
+        model.close()
+        record = fields = None  # drop the views so the block can be unmapped
+        board.close()
+        ring.close()
+
+
+def _render_main(ring_name, shape, board_name, specs, mirror, fps, window_name, stop):
+    """Draws the newest published state, at most fps times a second, until 'q'"""
+    ring = FrameRing(shape, name=ring_name)
+    board = SharedBoard(specs, name=board_name)
+    state = board["state"]
+    buffers = FrameBuffers()
+    h, w = shape[:2]
+    thumb_w, thumb_h = w // 4, h // 4
+    interval = 1.0 / fps if fps > 0 else 0.0
+    last_seq = -1
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            seq, values = state.snapshot()
+            if seq >= 0 and seq != last_seq:
+                last_seq = seq
+                output = buffers.zeros("output", shape)
+                if values["pose_present"]:
+                    points = (values["pose"][:, :2] * (w, h)).astype(np.int32)
+                    for a, b in SKELETON_CONNECTIONS:
+                        cv2.line(output, tuple(points[a]), tuple(points[b]), (0, 255, 255), 6)
+                for hand in values["hands"][:values["hand_count"]]:
+                    for tip in (4, 8, 12, 16, 20):
+                        cv2.circle(output, (int(hand[tip, 0] * w), int(hand[tip, 1] * h)), 4,
+                                   (0, 255, 0), -1)
+                for row, line in enumerate(values["status"]):
+                    text = bytes(line).rstrip(b"\0").decode("utf-8", "replace")
+                    if text:
+                        cv2.putText(output, text, (10, 30 + 30 * row), cv2.FONT_HERSHEY_SIMPLEX,
+                                    0.7, (255, 255, 255), 2)
+
+                # Camera preview in the corner, scaled straight out of the ring
+                frame, _ = ring.view(seq)
+                if frame is not None:
+                    thumb = cv2.resize(frame, (thumb_w, thumb_h),
+                                       dst=buffers.get("thumb", (thumb_h, thumb_w, 3)),
+                                       interpolation=cv2.INTER_AREA)
+                    if ring.valid(seq):
+                        if mirror:
+                            thumb = cv2.flip(thumb, 1,
+                                             dst=buffers.get("thumb_flipped", thumb.shape))
+                        output[h - thumb_h:, w - thumb_w:] = thumb
+                cv2.imshow(window_name, output)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                stop.set()
+                break
+            remaining = interval - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+    finally:
+        cv2.destroyAllWindows()
+        del state
+        board.close()
+        ring.close()
+
+
+class TrackerService:
+    """Runs recognizers on a capture process, one worker process per model and a renderer
+
+    recognizers, outputs and key injection stay in the calling process (the
+    coordinator). model_options are per-model factory options, e.g. from
+    tracking.autotune. With show=False no render process is started. lockstep makes
+    the capture process wait for each frame to be tracked, for replaying recordings
+    unthrottled without dropping frames.
+    """
+
+    def __init__(self, recognizers, source, mirror=True, model_options=None, stats=None,
+                 recorder=None, realtime=True, lockstep=False, show=True, render_fps=30.0,
+                 window_name="Gesture Tracker"):
+        self.recognizers = recognizers
+        self.mirror = mirror
+        self.stats = stats
+        self.recorder = recorder
+        self.names = list(required_factories(recognizers))
+        self.dropped = 0
+        context = multiprocessing.get_context("spawn")  # no MediaPipe state forked
+        self._stop = context.Event()
+        self._ended = context.Event()
+        self._frame_ready = context.Semaphore(0)
+        self._credits = context.Semaphore(1)
+        self._done = context.Semaphore(0)
+        self._jobs = {name: context.Semaphore(0) for name in self.names}
+        self.lockstep = lockstep
+        self._processes = []
+
+        # The ring is sized from one probe frame; the capture process reopens the source
+        # once the models are loaded, so recordings are not replayed during start-up
+        from tracking.sources import open_source
+        probe = open_source(source, realtime=False)
+        try:
+            ret, frame = probe.read()
+        finally:
+            probe.release()
+        if not ret:
+            raise RuntimeError(f"could not read a frame from {source!r}")
+        self.shape = frame.shape
+        self.ring = FrameRing(self.shape)
+        self.specs = board_specs(self.names, self.shape)
+        self.board = SharedBoard(self.specs)
+
+        ready = context.Semaphore(0)
+        for name in self.names:
+            self._start(context, f"model-{name}", _model_main,
+                        (name, model_options or {}, mirror, self.ring.name, self.shape,
+                         self.board.name, self.specs, self._jobs[name], self._done, ready,
+                         self._stop))
+        # Model start-up takes seconds; keep it out of the first frames' latency
+        try:
+            for _ in self.names:
+                while not ready.acquire(timeout=0.5):
+                    self._check_alive()
+        except BaseException:
+            self.close()
+            raise
+        if show:
+            self._start(context, "render", _render_main,
+                        (self.ring.name, self.shape, self.board.name, self.specs, mirror,
+                         render_fps, window_name, self._stop))
+        self._start(context, "capture", _capture_main,
+                    (source, realtime, lockstep, self.ring.name, self.shape, self._frame_ready,
+                     self._credits, self._ended, self._stop))
+
+    def _start(self, context, name, target, args):
+        process = context.Process(target=target, name=f"tracker-{name}", args=args, daemon=True)
+        process.start()
+        self._processes.append(process)
+
+    def _check_alive(self):
+        for process in self._processes:
+            if process.exitcode not in (None, 0):
+                raise RuntimeError(f"{process.name} exited with code {process.exitcode}")
+
+    def run(self, report_every=5.0):
+        """Track the newest frame until the source ends or the window is closed"""
+        last = -1
+        last_report = time.perf_counter()
+        while not self._stop.is_set():
+            self._check_alive()
+            if not self._frame_ready.acquire(timeout=0.1):
+                if self._ended.is_set() and self.ring.latest() == last:
+                    break
+                continue
+            while self._frame_ready.acquire(block=False):
+                pass  # several frames arrived; only the newest is tracked
+            seq = self.ring.latest()
+            if seq == last:
+                if self._ended.is_set():
+                    break
+                continue
+            if last >= 0:
+                self.dropped += seq - last - 1
+            last = seq
+            self.track(seq)
+            if self.lockstep:
+                self._credits.release()
+
+            now = time.perf_counter()
+            if self.stats is not None and report_every and now - last_report >= report_every:
+                print(f"[service] {self.stats.format()}  dropped={self.dropped}")
+                last_report = now
+
+    def track(self, seq):
+        """Run every model on frame seq, update the recognizers and publish the state"""
+        _, capture_time = self.ring.view(seq)
+        if capture_time is None:
+            self.dropped += 1
+            return None
+        start = time.perf_counter()
+        if self.stats is not None:
+            self.stats.add("queue", time.time() - capture_time)
+        self.board["job"].publish(seq)
+        for name in self.names:
+            self._jobs[name].release()
+        for _ in self.names:
+            while not self._done.acquire(timeout=0.1):
+                if self._stop.is_set():
+                    # A worker may have left its loop without taking this job
+                    return None
+                self._check_alive()
+        inferred = time.perf_counter()
+
+        # Workers are idle until the next job, so their records are read in place
+        records = {name: self.board[name].fields for name in self.names}
+        if not all(fields["ok"] for fields in records.values()):
+            self.dropped += 1  # overrun while a worker was reading it
+            return None
+        h, w = self.shape[:2]
+        observation = Observation(capture_time=capture_time, width=w, height=h)
+        if "pose" in records and records["pose"]["present"]:
+            observation.pose_landmarks = to_landmark_list(records["pose"]["landmarks"])
+        if "segmentation" in records:
+            observation.body_mask = largest_component(records["segmentation"]["mask"] > 0)
+        if "hands" in records:
+            hands = records["hands"]
+            detected = [to_landmark_list(hand) for hand in hands["landmarks"][:hands["count"]]]
+            ownership = PlayerOwnership(observation.body_mask, buffer_size=50)
+            observation.hands = ownership.owned_hands(detected, w, h)
+        if self.stats is not None:
+            for name, fields in records.items():
+                self.stats.add(f"model_{name}", float(fields["seconds"]))
+            self.stats.add("masks", time.perf_counter() - inferred)
+
+        if self.recorder is not None:
+            self.recorder.append(capture_time, (h, w), observation.pose_landmarks,
+                                 observation.hands, observation.body_mask)
+        for recognizer in self.recognizers:
+            recognizer.update(observation)
+        self._publish_state(seq, observation)
+        if self.stats is not None:
+            done = time.perf_counter()
+            self.stats.add("inference", done - start)
+            self.stats.add("frame_to_event", time.time() - capture_time)
+        return observation
+
+    def _publish_state(self, seq, observation):
+        state = self.board["state"]
+        fields = state.fields
+        state.begin()
+        fields["pose_present"][...] = observation.pose_landmarks is not None
+        if observation.pose_landmarks is not None:
+            fields["pose"][...] = [(lm.x, lm.y, lm.z, lm.visibility)
+                                   for lm in observation.pose_landmarks.landmark]
+        hands = observation.hands[:MAX_HANDS]
+        fields["hand_count"][...] = len(hands)
+        for index, hand in enumerate(hands):
+            fields["hands"][index] = [(lm.x, lm.y, lm.z) for lm in hand.landmark]
+        fields["status"][...] = 0
+        for row, recognizer in enumerate(self.recognizers[:STATUS_LINES]):
+            text = recognizer.status().encode("utf-8")[:STATUS_BYTES]
+            fields["status"][row, :len(text)] = np.frombuffer(text, np.uint8)
+        state.publish(seq)
+
+    def close(self):
+        self._stop.set()
+        for recognizer in self.recognizers:
+            recognizer.close()
+            recognizer.output.close()
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self.board.close(unlink=True)
+        self.ring.close(unlink=True)
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,191 @@
+"""Frame sources: the live camera, recorded video files and .npy frame dumps
+
+Every source follows the cv2.VideoCapture calls the trackers use (isOpened, read,
+release), so a recording can stand in for the camera anywhere. Recorded sources
+replay at their native frame rate by default, or as fast as they can be read with
+realtime=False.
+
+Record a session for benchmarking from the backend directory with:
+
+    python -m tracking.sources record sessions/strum.mp4 --seconds 30
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+class _Pacer:
+    """Sleeps so frame i is released no earlier than i / fps after the first read"""
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._start = None
+
+    def wait(self, index):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+            return
+        delay = self._start + index * self.interval - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CameraSource:
+    """Live webcam with the trackers' capture settings"""
+
+    def __init__(self, index=0, width=640, height=480, fps=30):
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps = fps
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    """Recorded video file, paced to its native frame rate unless realtime=False"""
+
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._pacer = _Pacer(self.fps if realtime else 0)
+        self._index = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        self._pacer.wait(self._index)
+        ret, frame = self.cap.read()
+        self._index += 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class NpyFrameSource:
+    """Memory-mapped (N, H, W, 3) BGR uint8 frame dump, e.g. from `record ... .npy`"""
+
+    def __init__(self, path, fps=30.0, realtime=True):
+        self.path = path
+        self.frames = np.load(path, mmap_mode="r")
+        if self.frames.ndim != 4 or self.frames.shape[-1] != 3:
+            raise ValueError(f"{path}: expected (N, H, W, 3) frames, got {self.frames.shape}")
+        self.fps = fps
+        self._pacer = _Pacer(fps if realtime else 0)
+        self._index = 0
+        self._open = True
+
+    def isOpened(self):
+        return self._open and self._index < len(self.frames)
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        self._pacer.wait(self._index)
+        # Copy out of the mmap so every frame is a fresh, writable image like a camera's
+        frame = np.array(self.frames[self._index])
+        self._index += 1
+        return True, frame
+
+    def release(self):
+        self._open = False
+
+
+def open_source(spec, realtime=True, fps=30.0):
+    """Open a camera index ("0"), a .npy frame dump or a video file"""
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec.endswith(".npy"):
+        return NpyFrameSource(spec, fps=fps, realtime=realtime)
+    return VideoFileSource(spec, realtime=realtime)
+
+
+def find_sessions(paths):
+    """Expand files and directories into a sorted list of recorded session files"""
+    sessions = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(VIDEO_EXTENSIONS + (".npy",)):
+                    sessions.append(os.path.join(path, name))
+        else:
+            sessions.append(path)
+    return sessions
+
+
+def record(source, path, max_frames):
+    """Save up to max_frames frames from source to a video file or a .npy dump"""
+    ret, frame = source.read()
+    if not ret:
+        raise RuntimeError("Source produced no frames")
+    h, w = frame.shape[:2]
+
+    if path.endswith(".npy"):
+        frames = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(max_frames, h, w, 3))
+        count = 0
+        while ret and count < max_frames:
+            frames[count] = frame
+            count += 1
+            ret, frame = source.read()
+        frames.flush()
+        del frames
+        if count < max_frames:
+            # Trim the unused tail so the dump holds exactly the recorded frames
+            trimmed = path[:-len(".npy")] + ".part.npy"
+            np.save(trimmed, np.load(path, mmap_mode="r")[:count])
+            os.replace(trimmed, path)
+        return count
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), source.fps, (w, h))
+    count = 0
+    while ret and count < max_frames:
+        writer.write(frame)
+        count += 1
+        ret, frame = source.read()
+    writer.release()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a tracker session for replay")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="record frames to .mp4/.avi or .npy")
+    record_parser.add_argument("output")
+    record_parser.add_argument("--source", default="0", help="camera index or a recording")
+    record_parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    source = open_source(args.source)
+    try:
+        count = record(source, args.output, int(args.seconds * source.fps))
+    finally:
+        source.release()
+    print(f"Recorded {count} frames to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
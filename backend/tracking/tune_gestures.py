@@ -0,0 +1,288 @@
+"""Offline gesture tuning: replay recorded landmark sessions against a grid of settings
+
+Record sessions with --record-landmarks on any tracker, add labels.json with the true
+hits (see tracking.landmarks), then from the backend directory:
+
+    python -m tracking.tune_gestures sessions/ --gesture drum --hit 30:60:5 --reset 10:30:5
+    python -m tracking.tune_gestures sessions/ --gesture strum --min-fingers 2:8:1 --cooldown 0,0.1,0.2
+
+Every setting of the grid is evaluated at once with array operations over the whole
+session, rather than frame by frame. Each setting is reported with hit precision,
+recall and F1, plus its latency: the capture time of the frame that fired minus the
+labelled time (negative means early).
+"""
+
+import argparse
+import itertools
+import json
+
+import numpy as np
+
+from tracking.filters import OneEuroFilter
+from tracking.gestures import (FINGER_TIPS, LEFT_SHOULDER, LEFT_WRIST, RIGHT_SHOULDER,
+                               RIGHT_WRIST)
+from tracking.landmarks import LandmarkSession, find_landmark_sessions
+
+
+def parse_values(spec, cast=float):
+    """"30:60:5" (inclusive range) or "0,25,33" -> list of values"""
+    if ":" in spec:
+        start, stop, step = (float(part) for part in spec.split(":"))
+        values = np.arange(start, stop + step / 2, step)
+        return [cast(value) for value in values]
+    return [cast(value) for value in spec.split(",") if value]
+
+
+def hysteresis_fires(on, off):
+    """Frames where a latch turns on, for every setting at once
+
+    on and off are (settings, frames) booleans, never both true in one cell: on sets
+    the latch, off clears it, other frames keep it. The latch starts cleared.
+    """
+    settings, frames = on.shape
+    mark = np.where(on, 1, np.where(off, -1, 0)).astype(np.int8)
+    # Carry the last non-zero mark forward; column 0 is the cleared initial state
+    mark = np.concatenate([np.full((settings, 1), -1, np.int8), mark], axis=1)
+    index = np.where(mark != 0, np.arange(frames + 1), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    state = np.take_along_axis(mark, index, axis=1)
+    return (state[:, 1:] == 1) & (state[:, :-1] != 1)
+
+
+def match_events(detected, truth, tolerance):
+    """(true positives, false positives, false negatives, latencies) for sorted times"""
+    if len(truth) == 0 or len(detected) == 0:
+        return 0, len(detected), len(truth), np.empty(0)
+    position = np.searchsorted(truth, detected)
+    before = np.maximum(position - 1, 0)
+    after = np.minimum(position, len(truth) - 1)
+    nearest = np.where(np.abs(detected - truth[before]) <= np.abs(detected - truth[after]),
+                       before, after)
+    within = np.abs(detected - truth[nearest]) <= tolerance
+    matched, first = np.unique(nearest[within], return_index=True)
+    latencies = detected[within][first] - truth[matched]
+    tp = len(matched)
+    return tp, len(detected) - tp, len(truth) - tp, latencies
+
+
+# --- Drums ---
+
+def drum_signals(session, smooth=False):
+    """Per-frame wrist-below-shoulder distance, velocity and acceleration in pixels
+
+    Returns {mediapipe side: (rel, vel, acc)} plus frame times and a valid-pose mask.
+    """
+    times = np.asarray(session.time, dtype=np.float64)
+    pose = np.asarray(session.pose, dtype=np.float64)
+    heights = pose[:, [LEFT_WRIST, LEFT_SHOULDER, RIGHT_WRIST, RIGHT_SHOULDER], 1]
+    heights = heights * session.height
+    valid = ~np.isnan(heights).any(axis=1)
+
+    velocity = np.zeros_like(heights)
+    if smooth:
+        smoother = OneEuroFilter()
+        for i in range(len(times)):
+            if not valid[i]:
+                smoother.reset()
+                continue
+            heights[i] = smoother(heights[i], times[i])
+            velocity[i] = smoother.velocity
+    rel = np.stack([heights[:, 0] - heights[:, 1], heights[:, 2] - heights[:, 3]])
+    if smooth:
+        vel = np.stack([velocity[:, 0] - velocity[:, 1], velocity[:, 2] - velocity[:, 3]])
+    else:
+        vel = np.zeros_like(rel)
+        dt = np.diff(times)
+        both = valid[1:] & valid[:-1] & (dt > 0)
+        vel[:, 1:][:, both] = (np.diff(rel, axis=1)[:, both]) / dt[both]
+    acc = np.zeros_like(vel)
+    dt = np.diff(times)
+    both = valid[1:] & valid[:-1] & (dt > 0)
+    acc[:, 1:][:, both] = (np.diff(vel, axis=1)[:, both]) / dt[both]
+    return times, valid, {"left": (rel[0], vel[0], acc[0]), "right": (rel[1], vel[1], acc[1])}
+
+
+def time_to_reach(distance, velocity, acceleration):
+    """Vectorized tracking.gestures._time_to_reach; inf where never reached"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        linear = distance / velocity
+        discriminant = velocity * velocity + 2.0 * acceleration * distance
+        quadratic = (-velocity + np.sqrt(np.maximum(discriminant, 0.0))) / acceleration
+        result = np.where(np.abs(acceleration) < 1e-6, linear, quadratic)
+        return np.where((np.abs(acceleration) >= 1e-6) & (discriminant < 0), np.inf, result)
+
+
+def drum_detections(times, valid, rel, vel, acc, hit, reset, lead, min_velocity):
+    """Fire times for every (hit, reset, lead) setting, as a list of arrays"""
+    hit = hit[:, None]
+    reset = reset[:, None]
+    lead = lead[:, None]
+    rel_valid = np.where(valid, rel, np.nan)
+    above = rel_valid > hit
+    below = rel_valid < reset
+    # Only fast downward frames can predict a hit; they are a small share of the session
+    fast = np.flatnonzero(valid & (vel > min_velocity))
+    predicted = np.zeros_like(above)
+    ttr = time_to_reach(hit - rel[fast], vel[fast], acc[fast])
+    predicted[:, fast] = ((lead > 0) & (rel[fast] > reset) & ~above[:, fast] & (ttr <= lead))
+    fires = hysteresis_fires(above | predicted, below)
+    return [times[row] for row in fires]
+
+
+def tune_drums(sessions, hits, resets, leads, min_velocity=300.0, smooth=False,
+               tolerance=0.1):
+    grid = [(h, r, l) for h, r, l in itertools.product(hits, resets, leads) if r < h]
+    hit = np.array([g[0] for g in grid], dtype=np.float64)
+    reset = np.array([g[1] for g in grid], dtype=np.float64)
+    lead = np.array([g[2] for g in grid], dtype=np.float64)
+    totals = np.zeros((len(grid), 3), dtype=np.int64)
+    latencies = [[] for _ in grid]
+
+    for session in sessions:
+        times, valid, sides = drum_signals(session, smooth)
+        for side, (rel, vel, acc) in sides.items():
+            # MediaPipe's left wrist is the player's right stick on mirrored frames
+            hand = {"left": "right", "right": "left"}[side] if session.mirrored else side
+            truth = np.sort([label["time"] for label in session.labels.get("drum", [])
+                             if label["hand"] == hand])
+            detections = drum_detections(times, valid, rel, vel, acc, hit, reset, lead,
+                                         min_velocity)
+            for g, detected in enumerate(detections):
+                tp, fp, fn, lat = match_events(detected, truth, tolerance)
+                totals[g] += (tp, fp, fn)
+                latencies[g].append(lat)
+
+    return [
+        _report({"hit_threshold": h, "reset_threshold": r, "lead_ms": l * 1000.0},
+                totals[g], latencies[g])
+        for g, (h, r, l) in enumerate(grid)
+    ]
+
+
+# --- Guitar strum ---
+
+def strum_fingers(session):
+    """Fingertips above the shoulder line per frame, summed over the player's hands"""
+    pose = np.asarray(session.pose, dtype=np.float64)
+    hands = np.asarray(session.hands, dtype=np.float64)
+    shoulder_y = (pose[:, LEFT_SHOULDER, 1] + pose[:, RIGHT_SHOULDER, 1]) / 2
+    tips_y = hands[:, :, FINGER_TIPS, 1]
+    with np.errstate(invalid="ignore"):
+        above = tips_y < shoulder_y[:, None, None]  # NaN compares False
+    return above.sum(axis=(1, 2))
+
+
+def check_frames(times, cooldown):
+    """Frames where StrumGesture re-evaluates, given its cooldown"""
+    next_index = np.searchsorted(times, times + cooldown, side="right")
+    frames = []
+    i = int(np.searchsorted(times, cooldown, side="right"))  # _last_check starts at 0
+    while i < len(times):
+        frames.append(i)
+        i = int(next_index[i])
+    return np.asarray(frames, dtype=np.int64)
+
+
+def tune_strum(sessions, min_fingers, cooldowns, tolerance=0.1):
+    grid = list(itertools.product(min_fingers, cooldowns))
+    totals = np.zeros((len(grid), 3), dtype=np.int64)
+    latencies = [[] for _ in grid]
+    thresholds = np.asarray(min_fingers)[:, None]
+
+    for session in sessions:
+        times = np.asarray(session.time, dtype=np.float64)
+        fingers = strum_fingers(session)
+        labels = session.labels.get("strum", [])
+        truth = {action: np.sort([label["time"] for label in labels if label["action"] == action])
+                 for action in ("press", "release")}
+        for c, cooldown in enumerate(cooldowns):
+            frames = check_frames(times, cooldown)
+            active = fingers[frames][None, :] >= thresholds
+            previous = np.concatenate([np.zeros((len(min_fingers), 1), bool), active[:, :-1]],
+                                      axis=1)
+            events = {"press": active & ~previous, "release": ~active & previous}
+            for m in range(len(min_fingers)):
+                g = m * len(cooldowns) + c
+                for action, fired in events.items():
+                    tp, fp, fn, lat = match_events(times[frames[fired[m]]], truth[action],
+                                                   tolerance)
+                    totals[g] += (tp, fp, fn)
+                    latencies[g].append(lat)
+
+    return [
+        _report({"min_fingers": m, "cooldown": c}, totals[g], latencies[g])
+        for g, (m, c) in enumerate(grid)
+    ]
+
+
+def _report(setting, totals, latencies):
+    tp, fp, fn = (int(value) for value in totals)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    lat = np.concatenate(latencies) * 1000.0 if latencies else np.empty(0)
+    return {
+        **setting, "tp": tp, "fp": fp, "fn": fn,
+        "precision": precision, "recall": recall, "f1": f1,
+        "latency_mean_ms": float(lat.mean()) if len(lat) else None,
+        "latency_p95_ms": float(np.percentile(lat, 95)) if len(lat) else None,
+    }
+
+
+def _format_row(row):
+    setting = "  ".join(f"{key}={value:g}" for key, value in row.items()
+                        if key in ("hit_threshold", "reset_threshold", "lead_ms",
+                                   "min_fingers", "cooldown"))
+    latency = "-"
+    if row["latency_mean_ms"] is not None:
+        latency = f"{row['latency_mean_ms']:+.1f}/{row['latency_p95_ms']:+.1f}ms"
+    return (f"{setting:48s} P={row['precision']:.3f} R={row['recall']:.3f} "
+            f"F1={row['f1']:.3f}  latency mean/p95 {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune gesture thresholds on recorded landmarks")
+    parser.add_argument("sessions", nargs="+", help="landmark sessions or directories of them")
+    parser.add_argument("--gesture", choices=("drum", "strum"), default="drum")
+    parser.add_argument("--hit", default="30:60:5", help="drum hit thresholds, px")
+    parser.add_argument("--reset", default="10:30:5", help="drum reset thresholds, px")
+    parser.add_argument("--lead-ms", default="0,25", help="drum prediction lead times")
+    parser.add_argument("--min-velocity", type=float, default=300.0,
+                        help="drum prediction minimum wrist speed, px/s")
+    parser.add_argument("--smooth", action="store_true",
+                        help="One-Euro filter the drum landmarks first, like drums.py")
+    parser.add_argument("--min-fingers", default="1:10:1", help="strum finger counts")
+    parser.add_argument("--cooldown", default="0,0.05,0.1,0.2", help="strum cooldowns, s")
+    parser.add_argument("--tolerance-ms", type=float, default=100.0,
+                        help="a detection within this of a label counts as a hit")
+    parser.add_argument("--top", type=int, default=10, help="settings to print")
+    parser.add_argument("--json", metavar="PATH", help="also write every setting's report")
+    args = parser.parse_args()
+
+    sessions = [LandmarkSession(path) for path in find_landmark_sessions(args.sessions)]
+    labelled = [session for session in sessions if session.labels is not None]
+    if not labelled:
+        parser.error("no landmark sessions with labels.json found")
+    frames = sum(session.frames for session in labelled)
+    print(f"{len(labelled)} labelled sessions ({len(sessions) - len(labelled)} unlabelled "
+          f"skipped), {frames} frames")
+
+    tolerance = args.tolerance_ms / 1000.0
+    if args.gesture == "drum":
+        rows = tune_drums(labelled, parse_values(args.hit), parse_values(args.reset),
+                          [ms / 1000.0 for ms in parse_values(args.lead_ms)],
+                          args.min_velocity, args.smooth, tolerance)
+    else:
+        rows = tune_strum(labelled, parse_values(args.min_fingers, int),
+                          parse_values(args.cooldown), tolerance)
+
+    rows.sort(key=lambda row: (-row["f1"], abs(row["latency_mean_ms"] or 0.0)))
+    for row in rows[:args.top]:
+        print(_format_row(row))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()